@@ -22,9 +22,23 @@ from datetime import datetime, timedelta
 from enum import IntEnum
 import json
 import os
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Monotonic clock for refills, 429 windows and timeouts: immune to wall-clock
+# jumps (NTP) and as cheap as time.time() (vDSO)
+_now = time.monotonic
+
+# Numba (optional) compiles the try-consume kernel; without numba it is plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 
 class Priority(IntEnum):
     """Request priority levels"""
@@ -34,6 +48,18 @@ class Priority(IntEnum):
     LOW = 4        # Historical data, analytics
 
 
+# Token cost per request: priority is expressed as weight in the shared bucket
+# (1:2:4:8), so a CRITICAL request refills 8x sooner than a LOW one. The cheapest
+# costs one token, so no priority can exceed the API's real limit; costs above
+# a bucket's capacity are capped at it (see _consume/plan).
+PRIORITY_COSTS = {
+    Priority.CRITICAL: 1,
+    Priority.HIGH: 2,
+    Priority.MEDIUM: 4,
+    Priority.LOW: 8,
+}
+
+
 @dataclass
 class RateLimitConfig:
     """Rate limit configuration for an API"""
@@ -65,11 +91,11 @@ class RequestMetrics:
     success_streak: int = 0
     recent_response_times: deque = field(default_factory=lambda: deque(maxlen=100))
     
-    def add_request(self, allowed: bool, wait_time: float = 0):
-        self.total_requests += 1
+    def add_request(self, allowed: bool, wait_time: float = 0, count: int = 1):
+        self.total_requests += count
         if allowed:
-            self.allowed_requests += 1
-            self.success_streak += 1
+            self.allowed_requests += count
+            self.success_streak += count
         else:
             self.blocked_requests += 1
         
@@ -79,7 +105,7 @@ class RequestMetrics:
     
     def record_429(self):
         self.rate_limit_hits += 1
-        self.last_429_time = time.time()
+        self.last_429_time = _now()
         self.success_streak = 0
     
     def record_response_time(self, response_time: float):
@@ -91,45 +117,137 @@ class RequestMetrics:
         return sum(self.recent_response_times) / len(self.recent_response_times)
 
 
+@njit(cache=True, nogil=True)
+def _try_consume(tokens, last_refill, rate, capacity, slot, now, cost):
+    """Refill + decrement one BucketStore slot in place. Returns (success, wait_time)"""
+    available = min(capacity[slot], tokens[slot] + (now - last_refill[slot]) * rate[slot])
+    last_refill[slot] = now
+    
+    if available >= cost:
+        tokens[slot] = available - cost
+        return True, 0.0
+    
+    tokens[slot] = available
+    return False, (cost - available) / rate[slot]
+
+
+class BucketStore:
+    """Structure-of-arrays state for token buckets, one slot per bucket
+    
+    tokens/last_refill/rate/capacity live in float64 arrays indexed by slot,
+    so the state of every bucket of a limiter can be refilled or inspected
+    in one vectorized pass (available()).
+    """
+    
+    def __init__(self, size: int = 16):
+        self.tokens = np.zeros(size)
+        self.last_refill = np.zeros(size)
+        self.rate = np.zeros(size)
+        self.capacity = np.zeros(size)
+        self.count = 0
+        self.lock = threading.Lock()
+        self._bucket_locks: List[threading.Lock] = []  # per-slot locks, see add()
+    
+    def add(self, capacity: float, rate: float, bucket_lock: threading.Lock) -> int:
+        """Allocate a full bucket slot guarded by `bucket_lock` (arrays double when full)"""
+        with self.lock:
+            if self.count == len(self.tokens):
+                # Hold every bucket lock while swapping arrays: a concurrent
+                # consume() must not write into the array being replaced
+                for lock in self._bucket_locks:
+                    lock.acquire()
+                try:
+                    for name in ('tokens', 'last_refill', 'rate', 'capacity'):
+                        array = getattr(self, name)
+                        setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+                finally:
+                    for lock in self._bucket_locks:
+                        lock.release()
+            
+            slot = self.count
+            self.tokens[slot] = self.capacity[slot] = capacity
+            self.rate[slot] = rate
+            self.last_refill[slot] = _now()
+            self._bucket_locks.append(bucket_lock)
+            self.count += 1
+            return slot
+    
+    def available(self, now: Optional[float] = None) -> np.ndarray:
+        """Tokens available at `now` for every slot (vectorized, no state change)"""
+        n = self.count
+        now = _now() if now is None else now
+        return np.minimum(self.capacity[:n],
+                          self.tokens[:n] + (now - self.last_refill[:n]) * self.rate[:n])
+
+
 class TokenBucket:
-    """Token bucket algorithm for rate limiting"""
+    """Token bucket algorithm for rate limiting
     
-    def __init__(self, capacity: int, refill_rate: float):
-        self.capacity = capacity
-        self.refill_rate = refill_rate
-        self.tokens = float(capacity)
-        self.last_refill = time.time()
+    A view on one slot of a BucketStore (its own single-slot store when none
+    is given); the per-bucket lock guards that slot.
+    """
+    
+    def __init__(self, capacity: int, refill_rate: float, store: Optional[BucketStore] = None):
+        self.store = store or BucketStore(1)
         self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)  # waiters of wait_if_needed
+        self.slot = self.store.add(capacity, refill_rate, self.lock)
+    
+    @property
+    def tokens(self) -> float:
+        return float(self.store.tokens[self.slot])
+    
+    @property
+    def last_refill(self) -> float:
+        return float(self.store.last_refill[self.slot])
+    
+    @property
+    def capacity(self) -> float:
+        return float(self.store.capacity[self.slot])
+    
+    @property
+    def refill_rate(self) -> float:
+        return float(self.store.rate[self.slot])
+    
+    def _refilled(self, now: float) -> float:
+        """Tokens available at `now` (pure, no state change)"""
+        s, i = self.store, self.slot
+        return float(min(s.capacity[i], s.tokens[i] + (now - s.last_refill[i]) * s.rate[i]))
     
     def _refill(self):
         """Refill tokens based on elapsed time"""
-        now = time.time()
-        elapsed = now - self.last_refill
-        new_tokens = elapsed * self.refill_rate
-        
-        self.tokens = min(self.capacity, self.tokens + new_tokens)
-        self.last_refill = now
+        now = _now()
+        self.store.tokens[self.slot] = self._refilled(now)
+        self.store.last_refill[self.slot] = now
     
-    def consume(self, tokens: int = 1) -> tuple[bool, float]:
+    def consume(self, tokens: float = 1) -> tuple[bool, float]:
         """Try to consume tokens. Returns (success, wait_time)"""
+        s = self.store
         with self.lock:
-            self._refill()
-            
-            if self.tokens >= tokens:
-                self.tokens -= tokens
-                return True, 0.0
-            
-            # Calculate wait time
-            tokens_needed = tokens - self.tokens
-            wait_time = tokens_needed / self.refill_rate
-            return False, wait_time
+            success, wait_time = _try_consume(s.tokens, s.last_refill, s.rate, s.capacity,
+                                              self.slot, _now(), float(tokens))
+        return success, float(wait_time)
     
     def adjust_capacity(self, new_capacity: int):
         """Adjust bucket capacity"""
+        s, i = self.store, self.slot
         with self.lock:
-            ratio = new_capacity / self.capacity
-            self.capacity = new_capacity
-            self.tokens = min(new_capacity, self.tokens * ratio)
+            ratio = new_capacity / s.capacity[i]
+            s.capacity[i] = new_capacity
+            s.tokens[i] = min(new_capacity, s.tokens[i] * ratio)
+            self.cond.notify(int(s.tokens[i]))
+    
+    def wait(self, timeout: float):
+        """Block until woken by notify_available() or `timeout` elapses"""
+        with self.cond:
+            self.cond.wait(timeout)
+    
+    def notify_available(self):
+        """Wake one waiter per whole token left in the bucket"""
+        with self.cond:
+            available = int(self._refilled(_now()))
+            if available:
+                self.cond.notify(available)
 
 
 class AdaptiveRateLimiter:
@@ -140,9 +258,10 @@ class AdaptiveRateLimiter:
         self.configs: Dict[str, RateLimitConfig] = {}
         self.metrics: Dict[str, RequestMetrics] = defaultdict(RequestMetrics)
         self.endpoint_limits: Dict[str, Dict[str, TokenBucket]] = defaultdict(dict)
-        self.priority_queues: Dict[Priority, deque] = {
-            p: deque() for p in Priority
-        }
+        self.store = BucketStore()  # SoA state of every API/endpoint bucket
+        # Pre-resolved (api, endpoint) -> (api_name, endpoint, bucket, endpoint_bucket)
+        self._slots: List[tuple] = []
+        self._slot_index: Dict[tuple[str, str], int] = {}
         self.save_state = save_state
         self.state_file = 'data/rate_limiter_state.json'
         self.lock = threading.Lock()
@@ -157,11 +276,13 @@ class AdaptiveRateLimiter:
         """Register a new API with rate limits"""
         bucket = TokenBucket(
             capacity=config.burst_size,
-            refill_rate=config.refill_rate
+            refill_rate=config.refill_rate,
+            store=self.store
         )
         
         self.limiters[config.name] = bucket
         self.configs[config.name] = config
+        self._rebind_slots(config.name)
         
         logger.info(f"Registered API '{config.name}': "
                    f"{config.max_requests} req/{config.window_seconds}s, "
@@ -170,21 +291,182 @@ class AdaptiveRateLimiter:
     def acquire(self, api_name: str, endpoint: str = "default", 
                 priority: Priority = Priority.MEDIUM, 
                 tokens: int = 1) -> tuple[bool, float]:
-        """Acquire permission to make request"""
+        """Acquire permission to make request (costs tokens * PRIORITY_COSTS[priority])"""
+        return self._acquire(api_name, endpoint, priority,
+                             tokens * PRIORITY_COSTS[priority], requests=1)
+    
+    def acquire_batch(self, api_name: str, n: int,
+                      endpoint: Optional[str] = None,
+                      priority: Priority = Priority.MEDIUM) -> tuple[bool, float]:
+        """Acquire permission for n requests with a single refill + decrement
+        
+        Each request costs the same as in acquire() (PRIORITY_COSTS[priority],
+        capped at the bucket capacity). Returns (True, 0.0) if all n * cost
+        tokens were taken, otherwise (False, wait) with the time until the
+        shortfall is refilled. The total cannot exceed the bucket capacity
+        (burst_size): split larger bursts with batch_size().
+        """
+        cost = PRIORITY_COSTS[priority]
+        bucket = self.limiters.get(api_name)
+        if bucket is not None:
+            cost = min(cost, bucket.capacity)
+            if n * cost > bucket.capacity:
+                raise ValueError(f"Batch of {n} x {cost} tokens exceeds '{api_name}' "
+                                 f"burst capacity ({bucket.capacity})")
+        
+        return self._acquire(api_name, endpoint or "default", priority, n * cost, requests=n)
+    
+    def batch_size(self, api_name: str, priority: Priority = Priority.MEDIUM) -> int:
+        """Largest n accepted by acquire_batch() for this API and priority"""
+        capacity = self.limiters[api_name].capacity
+        return int(capacity // min(PRIORITY_COSTS[priority], capacity))
+    
+    def resolve_slot(self, api_name: str, endpoint: str = "default") -> int:
+        """Resolve (api, endpoint) to a slot once; use it with acquire_by_slot()/wait_by_slot()"""
+        key = (api_name, endpoint)
+        slot = self._slot_index.get(key)
+        if slot is None:
+            if api_name not in self.limiters:
+                raise ValueError(f"API '{api_name}' not registered")
+            slot = self._slot_index[key] = len(self._slots)
+            self._slots.append((api_name, endpoint, None, None))
+            self._bind_slot(slot)
+        return slot
+    
+    def _bind_slot(self, slot: int):
+        """Point a slot at the current API and endpoint buckets"""
+        api_name, endpoint = self._slots[slot][:2]
+        endpoint_bucket = self.endpoint_limits.get(api_name, {}).get(f"{api_name}:{endpoint}")
+        self._slots[slot] = (api_name, endpoint, self.limiters[api_name], endpoint_bucket)
+    
+    def _rebind_slots(self, api_name: str):
+        """Refresh slots after register_api()/set_endpoint_limit() replaced a bucket"""
+        for (name, _), slot in self._slot_index.items():
+            if name == api_name:
+                self._bind_slot(slot)
+    
+    def acquire_by_slot(self, slot: int, priority: Priority = Priority.MEDIUM,
+                        tokens: int = 1) -> tuple[bool, float]:
+        """acquire() for a pre-resolved slot: one list index instead of key building + dict lookups"""
+        api_name, endpoint, bucket, endpoint_bucket = self._slots[slot]
+        return self._consume(api_name, endpoint, bucket, endpoint_bucket, priority,
+                             tokens * PRIORITY_COSTS[priority], requests=1)
+    
+    def plan(self, slot_ids: np.ndarray,
+             priority: Priority = Priority.MEDIUM) -> tuple[np.ndarray, np.ndarray]:
+        """Acquire a whole sequence of requests (slots from resolve_slot()) in one numpy pass
+        
+        Each request is checked against the running debit of its endpoint
+        bucket, then of its API bucket counting only the requests that passed
+        their endpoint, in plan order. Returns (allowed_mask, waits): allowed
+        requests are debited, denied ones get the wait until their debit is
+        refilled (re-plan them after sleeping).
+        """
+        slot_ids = np.asarray(slot_ids, dtype=np.intp)
+        cost = PRIORITY_COSTS[priority]
+        entries = self._slots
+        api_idx = np.array([entry[2].slot for entry in entries], dtype=np.intp)[slot_ids]
+        ep_idx = np.array([entry[3].slot if entry[3] else -1 for entry in entries],
+                          dtype=np.intp)[slot_ids]
+        
+        # Bucket objects involved, locked in slot order (consume() takes one lock at a time)
+        buckets = {}
+        for slot in np.unique(slot_ids):
+            _, _, bucket, endpoint_bucket = entries[slot]
+            buckets[bucket.slot] = bucket
+            if endpoint_bucket is not None:
+                buckets[endpoint_bucket.slot] = endpoint_bucket
+        locked = [buckets[i] for i in sorted(buckets)]
+        for bucket in locked:
+            bucket.lock.acquire()
+        
+        try:
+            store, now = self.store, _now()
+            available = store.available(now)
+            
+            # Running debit of each request within its bucket, in plan order
+            def debits(idx, costs):
+                if len(idx) == 0:
+                    return np.zeros(0)
+                order = np.argsort(idx, kind='stable')
+                sorted_costs = costs[order]
+                running = np.cumsum(sorted_costs)
+                starts = np.r_[0, np.flatnonzero(np.diff(idx[order])) + 1]
+                sizes = np.diff(np.r_[starts, len(idx)])
+                out = np.empty(len(idx))
+                out[order] = running - np.repeat(running[starts] - sorted_costs[starts], sizes)
+                return out
+            
+            # Cost capped at each bucket's capacity, as in _consume()
+            api_cost = np.minimum(cost, store.capacity[api_idx])
+            ep_cost = np.minimum(cost, store.capacity[ep_idx])
+            
+            allowed = np.ones(len(slot_ids), dtype=bool)
+            waits = np.zeros(len(slot_ids))
+            
+            # Pass 1: endpoint buckets
+            has_ep = ep_idx >= 0
+            if has_ep.any():
+                ep = ep_idx[has_ep]
+                ep_deficit = debits(ep, ep_cost[has_ep]) - available[ep]
+                allowed[has_ep] = ep_deficit <= 0
+                waits[has_ep] = np.maximum(ep_deficit, 0) / store.rate[ep]
+            
+            # Pass 2: API buckets, debited only by requests their endpoint let through
+            candidates = np.flatnonzero(allowed)
+            api = api_idx[candidates]
+            deficit = debits(api, api_cost[candidates]) - available[api]
+            allowed[candidates] = deficit <= 0
+            waits[candidates] = np.maximum(waits[candidates], np.maximum(deficit, 0) / store.rate[api])
+            
+            debited = np.bincount(api_idx[allowed], weights=api_cost[allowed],
+                                  minlength=store.count)
+            ep_allowed = allowed & has_ep
+            debited += np.bincount(ep_idx[ep_allowed], weights=ep_cost[ep_allowed],
+                                   minlength=store.count)
+            involved = np.fromiter(buckets, dtype=np.intp)
+            store.tokens[involved] = available[involved] - debited[involved]
+            store.last_refill[involved] = now
+        finally:
+            for bucket in locked:
+                bucket.lock.release()
+        
+        # Metrics per API
+        for slot in np.unique(slot_ids):
+            api_name = entries[slot][0]
+            mask = slot_ids == slot
+            granted = int(allowed[mask].sum())
+            if granted:
+                self.metrics[api_name].add_request(True, 0.0, count=granted)
+            for wait_time in waits[mask & ~allowed]:
+                self.metrics[api_name].add_request(False, float(wait_time))
+        
+        return allowed, waits
+    
+    def _acquire(self, api_name: str, endpoint: str, priority: Priority,
+                 tokens: float, requests: int) -> tuple[bool, float]:
+        """Resolve the API (and endpoint) buckets by name and consume from them"""
         
         if api_name not in self.limiters:
             logger.warning(f"API '{api_name}' not registered, allowing request")
             return True, 0.0
         
-        # Check global API limit
-        bucket = self.limiters[api_name]
-        success, wait_time = bucket.consume(tokens)
+        endpoint_bucket = self.endpoint_limits.get(api_name, {}).get(f"{api_name}:{endpoint}")
+        return self._consume(api_name, endpoint, self.limiters[api_name], endpoint_bucket,
+                             priority, tokens, requests)
+    
+    def _consume(self, api_name: str, endpoint: str, bucket: TokenBucket,
+                 endpoint_bucket: Optional[TokenBucket], priority: Priority,
+                 tokens: float, requests: int) -> tuple[bool, float]:
+        """Consume tokens from the API (and endpoint) buckets; `requests` feeds the metrics"""
+        
+        # Check global API limit (a request never needs more than a full bucket)
+        success, wait_time = bucket.consume(min(tokens, bucket.capacity))
         
         # Check endpoint-specific limit if exists
-        endpoint_key = f"{api_name}:{endpoint}"
-        if endpoint_key in self.endpoint_limits.get(api_name, {}):
-            endpoint_bucket = self.endpoint_limits[api_name][endpoint_key]
-            endpoint_success, endpoint_wait = endpoint_bucket.consume(tokens)
+        if endpoint_bucket is not None:
+            endpoint_success, endpoint_wait = endpoint_bucket.consume(
+                min(tokens, endpoint_bucket.capacity))
             
             if not endpoint_success:
                 success = False
@@ -192,7 +474,7 @@ class AdaptiveRateLimiter:
         
         # Record metrics
         metrics = self.metrics[api_name]
-        metrics.add_request(success, wait_time)
+        metrics.add_request(success, wait_time, count=requests if success else 1)
         
         if not success:
             logger.debug(f"Rate limit: {api_name}/{endpoint} - "
@@ -203,27 +485,42 @@ class AdaptiveRateLimiter:
     def wait_if_needed(self, api_name: str, endpoint: str = "default",
                       priority: Priority = Priority.MEDIUM, 
                       tokens: int = 1, timeout: float = 60.0) -> bool:
-        """Wait for rate limit availability"""
-        start_time = time.time()
+        """Wait for rate limit availability
+        
+        The wait returned by acquire() already reflects the priority cost,
+        so every priority waits at most until its tokens are refilled.
+        """
+        return self._wait(lambda: self.acquire(api_name, endpoint, priority, tokens),
+                          self.limiters.get(api_name), api_name, endpoint, timeout)
+    
+    def wait_by_slot(self, slot: int, priority: Priority = Priority.MEDIUM,
+                     tokens: int = 1, timeout: float = 60.0) -> bool:
+        """wait_if_needed() for a slot from resolve_slot()"""
+        api_name, endpoint, bucket, _ = self._slots[slot]
+        return self._wait(lambda: self.acquire_by_slot(slot, priority, tokens),
+                          bucket, api_name, endpoint, timeout)
+    
+    def _wait(self, acquire: Callable[[], tuple[bool, float]],
+              bucket: Optional[TokenBucket], api_name: str, endpoint: str,
+              timeout: float) -> bool:
+        """Retry `acquire` until it succeeds or `timeout` expires"""
+        deadline = _now() + timeout
         
         while True:
-            success, wait_time = self.acquire(api_name, endpoint, priority, tokens)
+            success, wait_time = acquire()
             
             if success:
+                if bucket is not None:
+                    bucket.notify_available()  # hand leftover tokens to other waiters
                 return True
             
-            elapsed = time.time() - start_time
-            if elapsed + wait_time > timeout:
+            if wait_time > deadline - _now():
                 logger.warning(f"Rate limit timeout: {api_name}/{endpoint}")
                 return False
             
-            # Priority-based waiting
-            if priority <= Priority.HIGH:
-                # High priority: minimal wait
-                time.sleep(min(wait_time, 1.0))
-            else:
-                # Lower priority: full wait
-                time.sleep(wait_time)
+            # Sleep on the bucket: woken early when another caller leaves tokens,
+            # at the latest when our own cost has refilled
+            bucket.wait(wait_time)
     
     def record_response(self, api_name: str, status_code: int, 
                        response_time: float, endpoint: str = "default"):
@@ -282,7 +579,7 @@ class AdaptiveRateLimiter:
         
         if (metrics.success_streak > 100 and
             (not metrics.last_429_time or 
-             time.time() - metrics.last_429_time > 300) and
+             _now() - metrics.last_429_time > 300) and
             bucket.capacity < config.max_requests_cap):
             
             new_capacity = int(bucket.capacity * config.recovery_multiplier)
@@ -311,7 +608,7 @@ class AdaptiveRateLimiter:
         endpoint_key = f"{api_name}:{endpoint}"
         refill_rate = max_requests / window_seconds
         
-        bucket = TokenBucket(capacity=max_requests, refill_rate=refill_rate)
+        bucket = TokenBucket(capacity=max_requests, refill_rate=refill_rate, store=self.store)
         
         if api_name not in self.endpoint_limits:
             self.endpoint_limits[api_name] = {}
@@ -320,6 +617,7 @@ class AdaptiveRateLimiter:
         
         logger.info(f"Set endpoint limit: {endpoint_key} = "
                    f"{max_requests} req/{window_seconds}s")
+        self._rebind_slots(api_name)
     
     def get_stats(self, api_name: Optional[str] = None) -> Dict[str, Any]:
         """Get rate limiter statistics"""
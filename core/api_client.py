@@ -1,18 +1,23 @@
-""""""Advanced API Client for Polymarket with caching, rate limiting and retry logic"""
+"""Advanced API Client for Polymarket with caching, rate limiting and retry logic"""
 
 import os
 import time
+import random
 import logging
 import json
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from functools import wraps
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import importlib.util
+import threading
+from collections import deque
+import httpx
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 only if the h2 extra is installed (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
 
 class RateLimiter:
     """Simple rate limiter"""
@@ -65,15 +70,58 @@ class Cache:
         return len(self.cache)
 
 
+class LatencyWindow:
+    """Sliding window of request latencies for adaptive timeouts"""
+    RESORT_EVERY = 50  # re-sort the window every N new samples, not on every request
+    
+    def __init__(self, size: int = 1000):
+        self.samples = deque(maxlen=size)
+        self._sorted: List[float] = []
+        self._stale = 0
+    
+    def record(self, elapsed: float):
+        self.samples.append(elapsed)
+        self._stale += 1
+    
+    def percentile(self, pct: float) -> float:
+        if self._stale >= self.RESORT_EVERY or not self._sorted:
+            self._sorted = sorted(self.samples)
+            self._stale = 0
+        ordered = self._sorted
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    
+    def __len__(self) -> int:
+        return len(self.samples)
+
+
 class PolymarketClient:
     """Enhanced Polymarket API client"""
     
     BASE_URL = 'https://data-api.polymarket.com'
+    RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+    MAX_RETRIES = 5
+    BACKOFF_FACTOR = 0.5
+    BACKOFF_MAX = 8.0
+    
+    # Adaptive timeout: clamp(safety * p99.99 * 2^attempt, min, max)
+    REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', '15'))
+    TIMEOUT_MIN = 2.0
+    TIMEOUT_MAX = 30.0
+    TIMEOUT_SAFETY = 2.0
+    TIMEOUT_MIN_SAMPLES = 20
     
-    def __init__(self, api_key: Optional[str] = None, enable_cache: bool = True):
+    def __init__(self, api_key: Optional[str] = None, enable_cache: bool = True,
+                 keepalive_interval: Optional[float] = None):
         self.api_key = api_key or os.getenv('POLYMARKET_API_KEY')
         self.session = self._create_session()
+        
+        # Keep the pooled TLS connection warm between polls
+        self.keepalive_interval = keepalive_interval or float(os.getenv('POLLING_INTERVAL', '60')) * 0.8
+        self._last_request = time.monotonic()
+        self._keepalive_timer: Optional[threading.Timer] = None
+        self._schedule_keepalive()
         self.cache = Cache(default_ttl=60) if enable_cache else None
+        self.latencies: Dict[str, LatencyWindow] = {}
         self.rate_limiter = RateLimiter(max_calls=30, period=60)
         
         self.request_count = 0
@@ -82,30 +130,97 @@ class PolymarketClient:
         
         logger.info(f"PolymarketClient initialized (cache={'ON' if enable_cache else 'OFF'})")
     
-    def _create_session(self) -> requests.Session:
-        """Create session with retry strategy"""
-        session = requests.Session()
+    def _create_session(self) -> httpx.Client:
+        """Create pooled HTTP client (keep-alive, HTTP/2 when available)"""
+        headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else None
         
-        retry_strategy = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            raise_on_status=False
+        return httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            headers=headers,
+            timeout=self.REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
         )
+    
+    def _timeout(self, endpoint: str, attempt: int) -> float:
+        """Timeout from the endpoint's p99.99 latency, doubled per retry"""
+        window = self.latencies.get(endpoint)
+        if window is None or len(window) < self.TIMEOUT_MIN_SAMPLES:
+            return self.REQUEST_TIMEOUT  # cold start
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        timeout = self.TIMEOUT_SAFETY * window.percentile(99.99) * 2 ** attempt
+        return min(self.TIMEOUT_MAX, max(self.TIMEOUT_MIN, timeout))
+    
+    def _send(self, method: str, url: str, params: Optional[Dict],
+              endpoint: str) -> httpx.Response:
+        """Send request retrying 429/5xx and transport errors with exponential backoff
+        
+        `endpoint` is the path template (e.g. '/markets/{id}') latencies are kept under.
+        """
+        for attempt in range(self.MAX_RETRIES + 1):
+            timeout = self._timeout(endpoint, attempt)
+            response = None
+            start = time.monotonic()
+            try:
+                if method == 'GET':
+                    response = self.session.get(url, params=params, timeout=timeout)
+                else:
+                    response = self.session.post(url, json=params, timeout=timeout)
+            except httpx.TransportError:
+                if attempt == self.MAX_RETRIES:
+                    raise
+            else:
+                if response.is_success:
+                    self.latencies.setdefault(endpoint, LatencyWindow()).record(time.monotonic() - start)
+                if response.status_code not in self.RETRY_STATUS or attempt == self.MAX_RETRIES:
+                    return response
+            
+            time.sleep(self._backoff(attempt, response))
+    
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Delay before the next attempt: the server's Retry-After, else exponential with jitter"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                # Clamped: a huge hint (e.g. 3600) must not block the polling thread
+                return min(max(0.0, float(retry_after)), self.BACKOFF_MAX * 4)
+            except ValueError:
+                pass  # HTTP-date form: fall back to our own backoff
         
-        if self.api_key:
-            session.headers.update({'Authorization': f'Bearer {self.api_key}'})
+        # Jitter spreads out retries of several bots hitting the same 429/5xx
+        delay = min(self.BACKOFF_MAX, self.BACKOFF_FACTOR * (2 ** attempt))
+        return delay + random.uniform(0, self.BACKOFF_FACTOR)
+    
+    def _schedule_keepalive(self):
+        """Arm the idle keep-alive timer"""
+        self._keepalive_timer = threading.Timer(self.keepalive_interval, self._keepalive)
+        self._keepalive_timer.daemon = True
+        self._keepalive_timer.start()
+    
+    def _keepalive(self):
+        """HEAD the API if idle so the next poll skips the TLS handshake"""
+        if time.monotonic() - self._last_request >= self.keepalive_interval:
+            try:
+                self.session.head(self.BASE_URL)
+            except httpx.HTTPError as e:
+                logger.debug(f"Keep-alive ping failed: {e}")
         
-        return session
+        if not self.session.is_closed:
+            self._schedule_keepalive()
+    
+    def close(self):
+        """Stop the keep-alive timer and close pooled connections"""
+        if self._keepalive_timer:
+            self._keepalive_timer.cancel()
+        self.session.close()
     
     def _make_request(self, endpoint: str, params: Optional[Dict] = None, 
-                     method: str = 'GET', use_cache: bool = True) -> Optional[Dict]:
-        """Make HTTP request with caching and rate limiting"""
+                     method: str = 'GET', use_cache: bool = True,
+                     template: Optional[str] = None) -> Optional[Dict]:
+        """Make HTTP request with caching and rate limiting
+        
+        `template` is the unformatted path ('/markets/{id}') for endpoints with ids,
+        so they share one latency window.
+        """
         url = f"{self.BASE_URL}{endpoint}"
         cache_key = f"{method}:{url}:{json.dumps(params or {}, sort_keys=True)}"
         
@@ -124,13 +239,11 @@ class PolymarketClient:
         try:
             self.request_count += 1
             
-            if method == 'GET':
-                response = self.session.get(url, params=params, timeout=15)
-            elif method == 'POST':
-                response = self.session.post(url, json=params, timeout=15)
-            else:
+            if method not in ('GET', 'POST'):
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
+            response = self._send(method, url, params, template or endpoint)
+            self._last_request = time.monotonic()
             response.raise_for_status()
             data = response.json()
             
@@ -141,11 +254,11 @@ class PolymarketClient:
             logger.debug(f"API Request: {method} {endpoint} - Status: {response.status_code}")
             return data
         
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout: {endpoint}")
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             logger.error(f"HTTP Error {e.response.status_code}: {endpoint}")
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request failed: {endpoint} - {e}")
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON response: {endpoint}")
@@ -168,7 +281,7 @@ class PolymarketClient:
     
     def get_market(self, market_id: str) -> Optional[Dict]:
         """Get specific market details"""
-        return self._make_request(f'/markets/{market_id}')
+        return self._make_request(f'/markets/{market_id}', template='/markets/{id}')
     
     def get_positions(self, user_address: str, size_threshold: int = 100, 
                      limit: int = 50) -> Optional[List[Dict]]:
@@ -182,16 +295,19 @@ class PolymarketClient:
     
     def get_orderbook(self, market_id: str) -> Optional[Dict]:
         """Get orderbook for a market"""
-        return self._make_request(f'/markets/{market_id}/orderbook', use_cache=False)
+        return self._make_request(f'/markets/{market_id}/orderbook', use_cache=False,
+                                  template='/markets/{id}/orderbook')
     
     def get_trades(self, market_id: str, limit: int = 100) -> Optional[List[Dict]]:
         """Get recent trades for a market"""
         params = {'limit': limit}
-        return self._make_request(f'/markets/{market_id}/trades', params=params, use_cache=False)
+        return self._make_request(f'/markets/{market_id}/trades', params=params, use_cache=False,
+                                  template='/markets/{id}/trades')
     
     def get_market_prices(self, market_id: str) -> Optional[Dict]:
         """Get current prices for a market"""
-        return self._make_request(f'/markets/{market_id}/prices', use_cache=False)
+        return self._make_request(f'/markets/{market_id}/prices', use_cache=False,
+                                  template='/markets/{id}/prices')
     
     def search_markets(self, query: str, limit: int = 20) -> Optional[List[Dict]]:
         """Search markets by keyword"""
@@ -217,7 +333,7 @@ class PolymarketClient:
         """Print client statistics"""
         stats = self.get_stats()
         logger.info(f"API Client Stats: {stats['total_requests']} requests | "
-                   f"Cache: {stats['cache_hit_rate']} hit rate ({stats['cache_size']} entries})")
+                   f"Cache: {stats['cache_hit_rate']} hit rate ({stats['cache_size']} entries)")
     
     def clear_cache(self):
         """Clear cache"""
@@ -407,11 +407,11 @@ async def run_phase1_mode(self):
     from core.multi_market_scanner import MultiMarketScanner
     
     # Callback para eventos WebSocket
-    async def on_market_event(event_data):
-        logger.info(f"📊 Evento detectado: {event_data['event_type']}")
+    async def on_market_event(event):
+        logger.info(f"📊 Evento detectado: {event.event_type}")
         
-        # Analizar con estrategias GAP
-        signal = self.gap_engine.get_best_signal(event_data)
+        # Analizar con estrategias GAP (esperan market_data como dict)
+        signal = self.gap_engine.get_best_signal(event.to_dict())
         
         if signal and signal.confidence >= 65:
             logger.info(f"✅ SEÑAL FUERTE: {signal.strategy_name} ({signal.confidence}%)")
@@ -5,9 +5,9 @@ Maneja persistencia de trades, métricas y precios históricos
 
 import os
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, func, case, Column, Integer, String, Float, DateTime, Date, Text, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
@@ -52,6 +52,16 @@ class DailyMetric(Base):
     capital_deployed = Column(Float)
 
 
+class PnlDaily(Base):
+    """Rollup diario de PnL (se actualiza al cerrar cada trade)"""
+    __tablename__ = 'pnl_daily'
+    
+    date = Column(Date, primary_key=True)
+    daily_pnl = Column(Float, default=0.0, nullable=False)
+    cumulative_pnl = Column(Float, default=0.0, nullable=False)
+    num_trades = Column(Integer, default=0, nullable=False)
+
+
 class PriceHistory(Base):
     """Histórico de precios de mercados"""
     __tablename__ = 'price_history'
@@ -90,6 +100,7 @@ class Database:
     def create_tables(self):
         """Crea todas las tablas si no existen"""
         Base.metadata.create_all(self.engine)
+        self._backfill_pnl_daily()
         logger.info("Database tables created/verified")
     
     @contextmanager
@@ -145,6 +156,7 @@ class Database:
                 trade.closed_at = datetime.utcnow()
                 trade.pnl = pnl
                 trade.pnl_pct = pnl_pct
+                self._upsert_pnl_daily(session, pnl, trade.closed_at.date())
                 logger.info(f"Trade closed: {trade_id} | PnL: ${pnl:.2f} ({pnl_pct:.2f}%)")
     
     # ==================== MÉTRICAS ====================
@@ -165,6 +177,154 @@ class Database:
                 .order_by(DailyMetric.date)\
                 .all()
     
+    # ==================== PNL DIARIO ====================
+    
+    def _backfill_pnl_daily(self):
+        """Rellena pnl_daily una sola vez desde los trades CLOSED históricos (tabla vacía)"""
+        with self.get_session() as session:
+            if session.query(PnlDaily.date).first() is not None:
+                return
+            day = func.date(Trade.closed_at)
+            rows = session.query(day, func.sum(Trade.pnl), func.count(Trade.id))\
+                .filter(Trade.status == 'CLOSED', Trade.closed_at.isnot(None))\
+                .group_by(day)\
+                .order_by(day)\
+                .all()
+            cumulative = 0.0
+            for d, pnl, n in rows:
+                # sqlite devuelve date() como texto
+                if isinstance(d, str):
+                    d = date.fromisoformat(d)
+                cumulative += pnl or 0.0
+                session.add(PnlDaily(date=d, daily_pnl=pnl or 0.0, cumulative_pnl=cumulative, num_trades=n))
+            if rows:
+                logger.info(f"pnl_daily backfilled with {len(rows)} days")
+    
+    def _upsert_pnl_daily(self, session: Session, pnl: float, day: date):
+        """UPSERT incremental de la fila del día; los días posteriores (backfill) arrastran el acumulado"""
+        prev = session.query(PnlDaily.cumulative_pnl)\
+            .filter(PnlDaily.date < day)\
+            .order_by(PnlDaily.date.desc())\
+            .limit(1)\
+            .scalar() or 0.0
+        
+        dialect = self.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(PnlDaily).values(
+                date=day, daily_pnl=pnl, cumulative_pnl=prev + pnl, num_trades=1
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['date'],
+                set_={
+                    'daily_pnl': PnlDaily.daily_pnl + stmt.excluded.daily_pnl,
+                    'cumulative_pnl': PnlDaily.cumulative_pnl + stmt.excluded.daily_pnl,
+                    'num_trades': PnlDaily.num_trades + 1,
+                }
+            )
+            session.execute(stmt)
+        else:
+            row = session.get(PnlDaily, day)
+            if row:
+                row.daily_pnl += pnl
+                row.cumulative_pnl += pnl
+                row.num_trades += 1
+            else:
+                session.add(PnlDaily(date=day, daily_pnl=pnl, cumulative_pnl=prev + pnl, num_trades=1))
+        
+        session.query(PnlDaily)\
+            .filter(PnlDaily.date > day)\
+            .update({PnlDaily.cumulative_pnl: PnlDaily.cumulative_pnl + pnl}, synchronize_session=False)
+    
+    def get_pnl_history(self, days: int = 30) -> List[tuple]:
+        """Obtiene (date, daily_pnl, cumulative_pnl) de los últimos días desde el rollup"""
+        since = datetime.utcnow().date() - timedelta(days=days)
+        with self.get_session() as session:
+            return session.query(PnlDaily.date, PnlDaily.daily_pnl, PnlDaily.cumulative_pnl)\
+                .filter(PnlDaily.date >= since)\
+                .order_by(PnlDaily.date)\
+                .all()
+    
+    # ==================== DASHBOARD ====================
+    
+    def get_dashboard_snapshot(self, initial_capital: float) -> Dict:
+        """Portfolio, riesgo y posiciones abiertas: una sesión, dos SELECT (agregados y posiciones)
+        
+        current_price es el último precio de price_history del mercado, o None
+        si no hay ninguno registrado.
+        """
+        is_open = Trade.status == 'OPEN'
+        is_closed = Trade.status == 'CLOSED'
+
+        with self.get_session() as session:
+            latest = session.query(DailyMetric.id).order_by(DailyMetric.date.desc()).limit(1).scalar_subquery()
+            today = datetime.utcnow().date()
+            
+            # Un único SELECT de agregados + escalares de las tablas de rollup
+            agg = session.query(
+                func.coalesce(func.sum(case((is_open, 1), else_=0)), 0).label('open_count'),
+                func.coalesce(func.sum(case((is_open, Trade.value), else_=0.0)), 0.0).label('exposure'),
+                func.coalesce(func.sum(case((is_open, Trade.pnl), else_=0.0)), 0.0).label('unrealized_pnl'),
+                func.coalesce(func.sum(case((is_closed, Trade.pnl), else_=0.0)), 0.0).label('realized_pnl'),
+                func.coalesce(func.sum(case((is_closed & (Trade.pnl > 0), 1), else_=0)), 0).label('wins'),
+                func.coalesce(func.sum(case((is_closed, 1), else_=0)), 0).label('closed_count'),
+                session.query(DailyMetric.sharpe_ratio).filter(DailyMetric.id == latest)
+                    .scalar_subquery().label('sharpe_ratio'),
+                session.query(DailyMetric.max_drawdown).filter(DailyMetric.id == latest)
+                    .scalar_subquery().label('max_drawdown'),
+                session.query(PnlDaily.daily_pnl).filter(PnlDaily.date == today)
+                    .scalar_subquery().label('today_pnl'),
+            ).one()
+            
+            # Precio de marca: último PriceHistory del mercado (subconsulta correlacionada)
+            mark_price = session.query(PriceHistory.price)\
+                .filter(PriceHistory.market_id == Trade.market_id)\
+                .order_by(PriceHistory.timestamp.desc())\
+                .limit(1)\
+                .correlate(Trade)\
+                .scalar_subquery()
+            positions = [
+                {
+                    'market': market,
+                    'side': side,
+                    'entry_price': price,
+                    'current_price': current,
+                    'size': value,
+                    'pnl': pnl or 0.0,
+                }
+                for market, side, price, current, value, pnl in session.query(
+                    Trade.market_title, Trade.side, Trade.price, mark_price, Trade.value, Trade.pnl
+                ).filter(is_open).order_by(Trade.timestamp.desc())
+            ]
+        
+        total_pnl = agg.realized_pnl + agg.unrealized_pnl
+        total_value = initial_capital + total_pnl
+        cash = total_value - agg.exposure
+        today_pnl = agg.today_pnl or 0.0
+        start_value = total_value - today_pnl
+        
+        return {
+            'portfolio': {
+                'total_value': total_value,
+                'daily_change': today_pnl / start_value * 100 if start_value else 0.0,
+                'cash': cash,
+                'cash_pct': cash / total_value * 100 if total_value else 0.0,
+                'total_pnl': total_pnl,
+                'roi': total_pnl / initial_capital * 100 if initial_capital else 0.0,
+                'active_positions': agg.open_count,
+                'exposure': agg.exposure,
+            },
+            'risk': {
+                'sharpe_ratio': agg.sharpe_ratio or 0.0,
+                'max_drawdown': agg.max_drawdown or 0.0,
+                'win_rate': agg.wins / agg.closed_count if agg.closed_count else 0.0,
+            },
+            'positions': positions,
+        }
+    
     # ==================== PRECIOS ====================
     
     def save_price(self, market_id: str, price: float, volume: float = None, liquidity: float = None):
@@ -13,6 +13,7 @@ import os
 import logging
 import asyncio
 import json
+import heapq
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import aiohttp
@@ -26,6 +27,13 @@ except ImportError:
     print("⚠️ py-clob-client not installed. Run: pip install py-clob-client")
     ClobClient = None
 
+# orjson (C) para decodificar los bytes de la respuesta sin pasar por str
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,6 +43,7 @@ class PolymarketClient:
     # API Endpoints
     CLOB_API = "https://clob.polymarket.com"
     GAMMA_API = "https://gamma-api.polymarket.com"
+    DATA_API = "https://data-api.polymarket.com"
     WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
     
     def __init__(self, api_key: str = None, private_key: str = None, chain_id: int = 137):
@@ -422,6 +431,79 @@ class PolymarketClient:
                     return results[:limit]
                 return []
     
+    async def get_positions(self,
+                            user_address: str,
+                            size_threshold: int = 100,
+                            limit: int = 50,
+                            session: Optional[aiohttp.ClientSession] = None) -> Optional[List[Dict]]:
+        """Get open positions of a wallet (copy trading)
+        
+        Returns None on HTTP errors, so callers can tell a failed poll from a
+        wallet with no positions.
+        
+        Args:
+            user_address: Wallet to follow
+            size_threshold: Minimum position size
+            limit: Max positions returned
+            session: Reusable session (keep-alive between polls); one is created if omitted
+        """
+        url = f"{self.DATA_API}/positions"
+        params = {
+            'user': user_address,
+            'sizeThreshold': size_threshold,
+            'limit': limit
+        }
+        
+        if session is None:
+            async with aiohttp.ClientSession() as session:
+                return await self.get_positions(user_address, size_threshold, limit, session)
+        
+        async with session.get(url, params=params) as response:
+            if response.status == 200:
+                body = await response.read()
+                try:
+                    return json_loads(body)
+                except ValueError:  # orjson.JSONDecodeError es ValueError; UTF-8 raro
+                    return json.loads(body.decode(response.get_encoding(), errors='replace'))
+            logger.error(f"Error fetching positions: {response.status}")
+            return None
+    
+    async def watch_positions(self,
+                              user_address: str,
+                              interval: float,
+                              size_threshold: int = 100,
+                              limit: int = 50):
+        """Poll a wallet's positions every `interval` seconds (async generator)
+        
+        One ClientSession for the whole loop: the connection stays alive and
+        the event loop is free while waiting on the network or the sleep.
+        Failed polls are skipped, never yielded as an empty wallet.
+        """
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    positions = await self.get_positions(user_address, size_threshold, limit, session)
+                    if positions is not None:
+                        yield positions
+                except aiohttp.ClientError as e:
+                    logger.error(f"❌ Error polling positions: {e}")
+                await asyncio.sleep(interval)
+    
+    @staticmethod
+    def index_positions(positions: List[Dict]) -> Dict[str, Dict]:
+        """Index positions by "{conditionId}_{outcome}" (key built once per position)"""
+        return {f"{p.get('conditionId')}_{p.get('outcome')}": p for p in positions}
+    
+    @staticmethod
+    def new_positions(indexed: Dict[str, Dict], previous_keys: set) -> List[Dict]:
+        """Positions whose key was not in the previous poll (hash lookups, no rescans)"""
+        return [p for key, p in indexed.items() if key not in previous_keys]
+    
+    @staticmethod
+    def top_positions(positions: List[Dict], limit: int = 5) -> List[Dict]:
+        """Largest `limit` positions by currentValue (heap selection, no full sort)"""
+        return heapq.nlargest(limit, positions, key=lambda x: x.get('currentValue', 0))
+    
     def close_all_connections(self):
         """Close all WebSocket connections"""
         for token_id in list(self.ws_connections.keys()):
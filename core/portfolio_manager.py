@@ -210,12 +210,13 @@ class PortfolioManager:
                                         data1: Dict,
                                         data2: Dict,
                                         dir1: str,
-                                        dir2: str) -> float:
+                                        dir2: str,
+                                        price_corr: Optional[float] = None) -> float:
         """
         Calculate correlation from market data.
         
         Considers:
-        - Price correlation
+        - Price correlation (precomputed via price_corr when batching)
         - Token/asset similarity
         - Direction alignment
         - Strategy type
@@ -223,15 +224,18 @@ class PortfolioManager:
         correlation = 0.0
         
         # 1. Price correlation (if historical data available)
-        if 'candles' in data1 and 'candles' in data2:
+        if price_corr is not None:
+            if not np.isnan(price_corr):
+                correlation += price_corr * 0.5  # 50% weight
+        elif 'candles' in data1 and 'candles' in data2:
             candles1 = data1['candles'][-20:]  # Last 20 candles
             candles2 = data2['candles'][-20:]
             
             if len(candles1) >= 10 and len(candles2) >= 10:
                 # Extract prices
                 min_len = min(len(candles1), len(candles2))
-                prices1 = np.array([c['close'] for c in candles1[-min_len:]])
-                prices2 = np.array([c['close'] for c in candles2[-min_len:]])
+                prices1 = self._close_prices(candles1[-min_len:])
+                prices2 = self._close_prices(candles2[-min_len:])
                 
                 # Calculate correlation
                 if len(prices1) > 1 and len(prices2) > 1:
@@ -264,6 +268,13 @@ class PortfolioManager:
         
         return correlation
     
+    @staticmethod
+    def _close_prices(candles) -> np.ndarray:
+        """Close prices from an ndarray of closes or a list of {'close': ...} candles"""
+        if isinstance(candles, np.ndarray):
+            return candles.astype(float, copy=False)
+        return np.array([c['close'] for c in candles])
+    
     def _tokens_related(self, token1: str, token2: str) -> bool:
         """Check if tokens are related (e.g., BTC and crypto market)"""
         crypto_tokens = {'btc', 'bitcoin', 'crypto', 'ethereum', 'eth'}
@@ -421,26 +432,129 @@ class PortfolioManager:
             market_data=new_position_data
         )
         
-        # Calculate correlation with existing positions
+        # Calculate correlation with existing positions ("temp" must not be cached:
+        # the key would be reused by the next signal)
+        correlations = [
+            (self.calculate_correlation(temp_position, existing_position, use_cache=False),
+             existing_position.position_id,
+             existing_position.strategy_name,
+             existing_position.size_usd)
+            for existing_position in self.positions.values()
+        ]
+        current_total_exposure = sum(p.size_usd for p in self.positions.values())
+        
+        return self._size_from_correlations(
+            base_kelly_size, strategy_name, correlations, current_total_exposure
+        )
+    
+    def calculate_correlation_adjusted_size_batch(self, signals: List[Dict]) -> List[Tuple[float, Dict]]:
+        """
+        Adjust several signals at once, greedily in order.
+        
+        Each signal holds the arguments of calculate_correlation_adjusted_size
+        (base_kelly_size, new_position_data, direction, strategy_name). Price
+        correlations between existing positions and all signals are computed
+        together in _price_correlation_matrix; each accepted signal counts as exposure for the
+        following ones, as if it had been added with its adjusted size.
+        
+        Returns:
+            List of (adjusted_size, adjustment_details), one per signal
+        """
+        existing = list(self.positions.values())
+        entries = [(p.market_data, p.direction) for p in existing] + \
+                  [(sig['new_position_data'], sig['direction']) for sig in signals]
+        price_corr = self._price_correlation_matrix([data for data, _ in entries])
+        
+        # (correlation row index, position_id, strategy, size) of the exposure taken so far
+        book = [(i, p.position_id, p.strategy_name, p.size_usd) for i, p in enumerate(existing)]
+        current_total_exposure = sum(p.size_usd for p in existing)
+        results = []
+        
+        for k, sig in enumerate(signals):
+            i = len(existing) + k
+            data, direction = entries[i]
+            
+            if not book:
+                adjusted = sig['base_kelly_size']
+                details = {'adjustment_factor': 1.0, 'reason': 'first_position'}
+            else:
+                correlations = [
+                    (self._calculate_correlation_from_data(
+                        data, entries[j][0], direction, entries[j][1], price_corr=price_corr[i, j]),
+                     position_id, strategy, size)
+                    for j, position_id, strategy, size in book
+                ]
+                adjusted, details = self._size_from_correlations(
+                    sig['base_kelly_size'], sig['strategy_name'], correlations, current_total_exposure
+                )
+            
+            results.append((adjusted, details))
+            if adjusted > 0:
+                book.append((i, f"batch_{k}", sig['strategy_name'], adjusted))
+                current_total_exposure += adjusted
+        
+        return results
+    
+    def _price_correlation_matrix(self, market_data: List[Dict]) -> np.ndarray:
+        """
+        Pairwise price correlations of the last candles, one np.corrcoef per
+        distinct series length.
+        
+        Each pair is correlated over its own overlap (the last min(len_i, len_j)
+        closes), exactly like _calculate_correlation_from_data. Entries without
+        at least 10 candles stay NaN (no price contribution).
+        """
+        n = len(market_data)
+        matrix = np.full((n, n), np.nan)
+        series = {}
+        for i, data in enumerate(market_data):
+            candles = data.get('candles')
+            if candles is not None and len(candles[-20:]) >= 10:
+                series[i] = self._close_prices(candles[-20:])
+        
+        if len(series) > 1:
+            idx = np.array(list(series))
+            lengths = np.array([len(series[i]) for i in idx])
+            for length in np.unique(lengths):
+                # Series at least this long, trimmed to it; only pairs whose
+                # shorter member has exactly this length are taken from here
+                members = idx[lengths >= length]
+                if len(members) < 2:
+                    continue
+                prices = np.vstack([series[i][-length:] for i in members])
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    corr = np.corrcoef(prices)
+                short = lengths[lengths >= length] == length
+                pair_mask = short[:, None] | short[None, :]
+                block = matrix[np.ix_(members, members)]
+                block[pair_mask] = corr[pair_mask]
+                matrix[np.ix_(members, members)] = block
+        
+        return matrix
+    
+    def _size_from_correlations(self,
+                                base_kelly_size: float,
+                                strategy_name: str,
+                                correlations: List[Tuple[float, str, str, float]],
+                                current_total_exposure: float) -> Tuple[float, Dict]:
+        """Apply cluster, exposure and single-position limits given (corr, id, strategy, size) rows"""
         correlation_exposures = []
         max_correlation = 0.0
-        most_correlated_position = None
+        most_correlated_strategy = None
         
-        for existing_position in self.positions.values():
-            corr = self.calculate_correlation(temp_position, existing_position)
-            
+        for corr, position_id, strategy, size in correlations:
             if abs(corr) > abs(max_correlation):
                 max_correlation = corr
-                most_correlated_position = existing_position
+                most_correlated_strategy = strategy
             
             if abs(corr) >= self.config.correlation_threshold:
                 # Calculate correlation-weighted exposure
-                weighted_exposure = existing_position.size_usd * abs(corr)
+                weighted_exposure = size * abs(corr)
                 correlation_exposures.append({
-                    'position_id': existing_position.position_id,
-                    'strategy': existing_position.strategy_name,
+                    'position_id': position_id,
+                    'strategy': strategy,
                     'correlation': corr,
-                    'size': existing_position.size_usd,
+                    'size': size,
                     'weighted_exposure': weighted_exposure
                 })
         
@@ -470,7 +584,6 @@ class PortfolioManager:
                     adjustment_reason = "correlation_penalty"
         
         # Check if adding this position would exceed total exposure limit
-        current_total_exposure = sum(p.size_usd for p in self.positions.values())
         max_total_exposure = self.bankroll * self.config.max_total_exposure_pct
         remaining_exposure = max_total_exposure - current_total_exposure
         
@@ -498,7 +611,7 @@ class PortfolioManager:
             'correlated_positions': len(correlation_exposures),
             'correlation_exposure': total_correlation_exposure,
             'remaining_capacity': remaining_exposure,
-            'most_correlated': most_correlated_position.strategy_name if most_correlated_position else None
+            'most_correlated': most_correlated_strategy
         }
         
         # Log significant adjustments
@@ -4,18 +4,27 @@ Alertas en tiempo real de gaps detectados, trades ejecutados y ROI tracking.
 """
 
 import asyncio
+import functools
+import hashlib
+import itertools
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Coroutine, Dict, List, Optional, Set, Tuple
+import numpy as np
 from telegram import Bot, Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.request import HTTPXRequest
 import os
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class TradeAlert:
     """Alerta de trade"""
     timestamp: datetime
@@ -28,7 +37,7 @@ class TradeAlert:
     status: str  # 'pending', 'executed', 'filled', 'closed'
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ROIStats:
     """Estadísticas de ROI"""
     initial_capital: float
@@ -45,6 +54,30 @@ class ROIStats:
     avg_gap_accuracy: float
 
 
+# Caracteres reservados del modo Markdown (legacy) de Telegram
+_MD_ESCAPE = str.maketrans({c: '\\' + c for c in '_*`['})
+
+
+@functools.lru_cache(maxsize=1024)
+def _escape_markdown(text: str) -> str:
+    """Escapar texto libre (p.ej. nombres de mercado) para parse_mode='Markdown'"""
+    return text.translate(_MD_ESCAPE)
+
+
+@functools.lru_cache(maxsize=256)
+def _format_duration_cached(days: int, seconds: int) -> str:
+    """Formatear duración (días, segundos del día) - memoizado"""
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    
+    if days > 0:
+        return f"{days}d {hours}h {minutes}m"
+    elif hours > 0:
+        return f"{hours}h {minutes}m"
+    else:
+        return f"{minutes}m {seconds}s"
+
+
 class TelegramNotifier:
     """Gestor de notificaciones Telegram con ROI tracking"""
     
@@ -63,17 +96,64 @@ class TelegramNotifier:
         # ROI tracking
         self.initial_capital = float(os.getenv('INITIAL_CAPITAL', '1500'))
         self.trades_history: List[TradeAlert] = []
+        self._trades_by_day: Dict[date, List[TradeAlert]] = defaultdict(list)
+        self.trades_by_day_retention = timedelta(days=30)
         self.roi_stats: Optional[ROIStats] = None
         
+        # Agregados persistidos de sesiones anteriores (se suman a trades_history)
+        self.stats_path = os.getenv('TELEGRAM_STATS_PATH', 'data/telegram_roi_stats.json')
+        self._baseline: Dict[str, float] = self._empty_aggregates()
+        self._aggregates: Dict[str, float] = {}
+        
+        # Caché de respuestas de comandos: comando -> (timestamp monotonic, mensaje)
+        self._command_cache: Dict[str, Tuple[float, str]] = {}
+        self.command_cache_ttl = 5.0  # segundos
+        
         # Rate limiting
         self.last_alert_time: Dict[str, datetime] = {}
         self.min_alert_interval = timedelta(minutes=5)  # Evitar spam
         
+        # Flood control por chat: chat_id -> instante monotonic desde el que se puede enviar
+        self._chat_cooldown: Dict[str, float] = {}
+        self.max_send_attempts = 2
+        
+        # Deduplicación por contenido: hash del cuerpo (sin el '⏰ HH:MM:SS') -> instante monotonic de envío
+        self._recent_hashes: OrderedDict[str, float] = OrderedDict()
+        self.dedup_window = 60.0  # segundos
+        
+        # Envíos en segundo plano (referencia fuerte hasta que terminan)
+        self._bg_tasks: Set[asyncio.Task] = set()
+        
+        # Reloj cacheado para los timestamps 'HH:MM:SS' de las alertas
+        self._now_str = ''
+        self._now_sec = -1
+        
+        # Agrupación de alertas de gap (un mensaje por ventana)
+        self._pending_gaps: List[Tuple[str, str]] = []  # (cuerpo, timestamp)
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.gap_batch_window = 2.0  # segundos
+        self.max_message_length = 4000  # Margen bajo el límite de 4096 de Telegram
+        
     async def initialize(self):
         """Inicializar bot de Telegram"""
         try:
-            self.bot = Bot(token=self.bot_token)
-            self.application = Application.builder().token(self.bot_token).build()
+            self._load_persisted_stats()
+            
+            # Pool HTTP compartido: keep-alive dimensionado para el broadcast
+            request = HTTPXRequest(
+                connection_pool_size=max(8, len(self.chat_ids) * 2),
+                read_timeout=10,
+                write_timeout=10,
+                pool_timeout=5
+            )
+            self.application = (
+                Application.builder()
+                .token(self.bot_token)
+                .request(request)
+                .build()
+            )
+            # Reutilizar el bot de la Application (sin segundo pool HTTP)
+            self.bot = self.application.bot
             
             # Registrar comandos
             self.application.add_handler(CommandHandler("status", self._status_command))
@@ -103,7 +183,7 @@ class TelegramNotifier:
             "/trades - Últimos trades ejecutados\n\n"
             "🎯 Target: 78% win rate | ROI: +130%"
         )
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._fire(self._broadcast_message(message, parse_mode='Markdown'))
     
     async def send_gap_alert(self, 
                             market_name: str,
@@ -130,9 +210,9 @@ class TelegramNotifier:
         # Emoji según tamaño del gap
         emoji = "🔥" if gap_size >= 10 else "⚡" if gap_size >= 5 else "📊"
         
-        message = (
+        body = (
             f"{emoji} *GAP DETECTADO*\n\n"
-            f"📈 Market: {market_name[:50]}\n"
+            f"📈 Market: {_escape_markdown(market_name[:50])}\n"
             f"💵 Gap: {gap_size:.2f}¢ ({gap_size/100:.2%})\n\n"
             f"🤖 ML Prediction:\n"
             f"  • Predicted: {predicted_prob:.1%}\n"
@@ -142,11 +222,45 @@ class TelegramNotifier:
             f"  • Sentiment: {ml_features.get('sentiment_score', 0):.2f}\n"
             f"  • Volume Trend: {ml_features.get('volume_trend', 0):.2f}\n"
             f"  • Price Momentum: {ml_features.get('price_momentum', 0):.2f}\n\n"
-            f"⏰ {datetime.now().strftime('%H:%M:%S')}"
         )
         
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._pending_gaps.append((body, f"⏰ {self._hms()}"))
         self.last_alert_time[alert_key] = datetime.now()
+        
+        # Programar envío agrupado si no hay uno pendiente
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(
+                self.gap_batch_window,
+                lambda: self._fire(self._flush_gaps())
+            )
+    
+    async def _flush_gaps(self):
+        """Enviar alertas de gap acumuladas en mensajes de tamaño acotado"""
+        self._flush_handle = None
+        pending, self._pending_gaps = self._pending_gaps, []
+        
+        batch: List[Tuple[str, str]] = []
+        batch_length = 0
+        for body, stamp in pending:
+            added_length = len(body) + len(stamp) + (2 if batch else 0)
+            if batch and batch_length + added_length > self.max_message_length:
+                await self._broadcast_gap_batch(batch)
+                batch, batch_length = [], 0
+                added_length = len(body) + len(stamp)
+            batch.append((body, stamp))
+            batch_length += added_length
+        
+        if batch:
+            await self._broadcast_gap_batch(batch)
+    
+    async def _broadcast_gap_batch(self, batch: List[Tuple[str, str]]):
+        """Enviar un lote de gaps; la deduplicación ignora los timestamps"""
+        await self._broadcast_message(
+            "\n\n".join(body + stamp for body, stamp in batch),
+            parse_mode='Markdown',
+            dedup_key="\n\n".join(body for body, _ in batch)
+        )
     
     async def send_trade_executed(self,
                                  market_name: str,
@@ -165,17 +279,18 @@ class TelegramNotifier:
         """
         emoji = "🟢" if side == "BUY" else "🔴"
         
-        message = (
+        body = (
             f"{emoji} *TRADE EJECUTADO*\n\n"
-            f"📊 Market: {market_name[:50]}\n"
+            f"📊 Market: {_escape_markdown(market_name[:50])}\n"
             f"📍 Side: {side}\n"
             f"💰 Size: ${size:.2f} USDC\n"
             f"💵 Price: {price:.4f}\n"
             f"🎯 Expected ROI: {expected_roi:.2%}\n\n"
-            f"⏰ {datetime.now().strftime('%H:%M:%S')}"
         )
         
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._fire(self._broadcast_message(
+            f"{body}⏰ {self._hms()}", parse_mode='Markdown', dedup_key=body
+        ))
         
         # Registrar trade
         trade = TradeAlert(
@@ -188,7 +303,7 @@ class TelegramNotifier:
             expected_roi=expected_roi,
             status='executed'
         )
-        self.trades_history.append(trade)
+        self._record_trade(trade)
     
     async def send_trade_closed(self,
                                market_name: str,
@@ -209,19 +324,20 @@ class TelegramNotifier:
         """
         emoji = "✅" if pnl > 0 else "❌"
         
-        message = (
+        parts = [
             f"{emoji} *TRADE CERRADO*\n\n"
-            f"📊 Market: {market_name[:50]}\n"
+            f"📊 Market: {_escape_markdown(market_name[:50])}\n"
             f"📍 Entry: {entry_price:.4f}\n"
             f"📍 Exit: {exit_price:.4f}\n"
             f"💰 P&L: ${pnl:+.2f} ({roi:+.2%})\n"
             f"⏱ Duration: {self._format_duration(duration)}\n\n"
-        )
+        ]
         
         # Añadir stats actualizados
         await self._update_roi_stats()
+        await self._persist_stats()
         if self.roi_stats:
-            message += (
+            parts.append(
                 f"📈 *Portfolio Stats:*\n"
                 f"  • Total Trades: {self.roi_stats.total_trades}\n"
                 f"  • Win Rate: {self.roi_stats.win_rate:.1%}\n"
@@ -229,7 +345,7 @@ class TelegramNotifier:
                 f"  • Capital: ${self.roi_stats.current_capital:.2f}\n"
             )
         
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._fire(self._broadcast_message("".join(parts), parse_mode='Markdown'))
     
     async def send_daily_summary(self):
         """Enviar resumen diario de actividad"""
@@ -240,30 +356,30 @@ class TelegramNotifier:
         
         # Calcular trades del día
         today = datetime.now().date()
-        today_trades = [t for t in self.trades_history 
-                       if t.timestamp.date() == today]
+        today_trades = self._trades_by_day.get(today, ())
         
-        message = (
+        stats = self.roi_stats
+        parts = [
             "📊 *RESUMEN DIARIO*\n\n"
-            f"📅 {datetime.now().strftime('%d/%m/%Y')}\n\n"
+            f"📅 {datetime.now().strftime('%d/%m/%Y')}\n\n",
             f"💰 *Capital:*\n"
             f"  • Inicial: ${self.initial_capital:.2f}\n"
-            f"  • Actual: ${self.roi_stats.current_capital:.2f}\n"
-            f"  • ROI: {self.roi_stats.roi_percentage:+.2%}\n\n"
+            f"  • Actual: ${stats.current_capital:.2f}\n"
+            f"  • ROI: {stats.roi_percentage:+.2%}\n\n",
             f"📈 *Performance:*\n"
             f"  • Trades hoy: {len(today_trades)}\n"
-            f"  • Trades total: {self.roi_stats.total_trades}\n"
-            f"  • Win Rate: {self.roi_stats.win_rate:.1%}\n"
-            f"  • Sharpe: {self.roi_stats.sharpe_ratio:.2f}\n\n"
+            f"  • Trades total: {stats.total_trades}\n"
+            f"  • Win Rate: {stats.win_rate:.1%}\n"
+            f"  • Sharpe: {stats.sharpe_ratio:.2f}\n\n",
             f"💵 *P&L:*\n"
-            f"  • Profit: ${self.roi_stats.total_profit:.2f}\n"
-            f"  • Loss: ${abs(self.roi_stats.total_loss):.2f}\n"
-            f"  • Net: ${self.roi_stats.total_profit + self.roi_stats.total_loss:+.2f}\n\n"
+            f"  • Profit: ${stats.total_profit:.2f}\n"
+            f"  • Loss: ${abs(stats.total_loss):.2f}\n"
+            f"  • Net: ${stats.total_profit + stats.total_loss:+.2f}\n\n",
             f"🎯 Target v2.0: 78% WR | +130% ROI\n"
-            f"📊 Gap Accuracy: {self.roi_stats.avg_gap_accuracy:.1%}"
-        )
+            f"📊 Gap Accuracy: {stats.avg_gap_accuracy:.1%}"
+        ]
         
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._fire(self._broadcast_message("".join(parts), parse_mode='Markdown'))
     
     async def send_error_alert(self, error_type: str, error_message: str):
         """Enviar alerta de error crítico
@@ -272,52 +388,74 @@ class TelegramNotifier:
             error_type: Tipo de error
             error_message: Mensaje de error
         """
-        message = (
+        body = (
             "🚨 *ERROR CRÍTICO*\n\n"
-            f"❌ Type: {error_type}\n"
-            f"📝 Message: {error_message[:200]}\n\n"
-            f"⏰ {datetime.now().strftime('%H:%M:%S')}"
+            f"❌ Type: {error_type.translate(_MD_ESCAPE)}\n"
+            f"📝 Message: {error_message[:200].translate(_MD_ESCAPE)}\n\n"
         )
         
-        await self._broadcast_message(message, parse_mode='Markdown')
+        self._fire(self._broadcast_message(
+            f"{body}⏰ {self._hms()}", parse_mode='Markdown', dedup_key=body
+        ))
     
     async def _update_roi_stats(self):
         """Actualizar estadísticas de ROI"""
-        if not self.trades_history:
+        baseline = self._baseline
+        if not self.trades_history and not baseline['total_trades']:
             return
         
-        # Calcular métricas
-        total_trades = len(self.trades_history)
-        winning_trades = sum(1 for t in self.trades_history if t.expected_roi > 0)
+        # Una sola pasada sobre trades_history; el resto de métricas se vectoriza
+        session_trades = len(self.trades_history)
+        trade_data = np.fromiter(
+            ((t.expected_roi, t.position_size) for t in self.trades_history),
+            dtype=np.dtype((np.float64, 2)), count=session_trades
+        )
+        returns = trade_data[:, 0]
+        sizes = trade_data[:, 1]
+        pnls = returns * sizes
+        wins = returns > 0
+        
+        # Calcular métricas (sesión actual + agregados persistidos)
+        total_trades = int(baseline['total_trades']) + session_trades
+        winning_trades = int(baseline['winning_trades']) + int(np.count_nonzero(wins))
         losing_trades = total_trades - winning_trades
         
-        total_profit = sum(t.expected_roi * t.position_size 
-                          for t in self.trades_history if t.expected_roi > 0)
-        total_loss = sum(t.expected_roi * t.position_size 
-                        for t in self.trades_history if t.expected_roi < 0)
+        total_profit = baseline['total_profit'] + float(pnls[wins].sum())
+        total_loss = baseline['total_loss'] + float(pnls[returns < 0].sum())
         
         current_capital = self.initial_capital + total_profit + total_loss
         roi_percentage = (current_capital - self.initial_capital) / self.initial_capital
         win_rate = winning_trades / total_trades if total_trades > 0 else 0
         
         # Calcular Sharpe (simplificado)
-        returns = [t.expected_roi for t in self.trades_history]
-        avg_return = sum(returns) / len(returns) if returns else 0
-        std_return = (sum((r - avg_return) ** 2 for r in returns) / len(returns)) ** 0.5 if returns else 1
+        sum_returns = baseline['sum_returns'] + float(returns.sum())
+        sum_sq_returns = baseline['sum_sq_returns'] + float(np.dot(returns, returns))
+        avg_return = sum_returns / total_trades
+        std_return = max(sum_sq_returns / total_trades - avg_return ** 2, 0.0) ** 0.5
         sharpe_ratio = (avg_return / std_return) * (252 ** 0.5) if std_return > 0 else 0
         
-        # Calcular max drawdown (simplificado)
-        capital_curve = [self.initial_capital]
-        for trade in self.trades_history:
-            capital_curve.append(capital_curve[-1] + trade.expected_roi * trade.position_size)
-        
-        peak = capital_curve[0]
-        max_dd = 0
-        for capital in capital_curve:
-            if capital > peak:
-                peak = capital
-            dd = (peak - capital) / peak if peak > 0 else 0
-            max_dd = max(max_dd, dd)
+        # Calcular max drawdown (simplificado), continuando la curva persistida
+        capital_curve = np.empty(session_trades + 1, dtype=np.float64)
+        capital_curve[0] = baseline['capital'] if baseline['total_trades'] else self.initial_capital
+        np.cumsum(pnls, out=capital_curve[1:])
+        capital_curve[1:] += capital_curve[0]
+        peaks = np.maximum.accumulate(capital_curve)
+        np.maximum(peaks, baseline['peak'], out=peaks)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdowns = np.where(peaks > 0, (peaks - capital_curve) / peaks, 0.0)
+        max_dd = max(float(drawdowns.max()), baseline['max_drawdown'])
+        
+        self._aggregates = {
+            'total_trades': total_trades,
+            'winning_trades': winning_trades,
+            'total_profit': total_profit,
+            'total_loss': total_loss,
+            'sum_returns': sum_returns,
+            'sum_sq_returns': sum_sq_returns,
+            'capital': float(capital_curve[-1]),
+            'peak': float(peaks[-1]),
+            'max_drawdown': max_dd
+        }
         
         # Gap accuracy (simplificado)
         gap_accuracy = win_rate  # Aproximación simple
@@ -337,6 +475,94 @@ class TelegramNotifier:
             avg_gap_accuracy=gap_accuracy
         )
     
+    def _empty_aggregates(self) -> Dict[str, float]:
+        """Agregados iniciales (sin trades)"""
+        return {
+            'total_trades': 0,
+            'winning_trades': 0,
+            'total_profit': 0.0,
+            'total_loss': 0.0,
+            'sum_returns': 0.0,
+            'sum_sq_returns': 0.0,
+            'capital': self.initial_capital,
+            'peak': self.initial_capital,
+            'max_drawdown': 0.0
+        }
+    
+    async def _persist_stats(self):
+        """Guardar agregados de ROI en disco sin bloquear el event loop"""
+        if not self._aggregates:
+            return
+        
+        # Snapshot en el loop; el thread solo escribe
+        state = {
+            'timestamp': datetime.now().isoformat(),
+            'initial_capital': self.initial_capital,
+            'aggregates': dict(self._aggregates)
+        }
+        await asyncio.to_thread(self._write_stats, state)
+    
+    def _write_stats(self, state: Dict):
+        """Escritura atómica del snapshot de agregados (en un thread)"""
+        try:
+            directory = os.path.dirname(self.stats_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            tmp_path = self.stats_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+            
+            logger.debug(f"Saved ROI aggregates to {self.stats_path}")
+        
+        except Exception as e:
+            logger.error(f"Failed to save ROI aggregates: {e}")
+    
+    def _load_persisted_stats(self):
+        """Cargar agregados de ROI de sesiones anteriores"""
+        try:
+            if not os.path.exists(self.stats_path):
+                return
+            
+            with open(self.stats_path, 'r') as f:
+                state = json.load(f)
+            
+            if state.get('initial_capital') != self.initial_capital:
+                logger.warning("Persisted ROI aggregates use a different initial capital, ignoring")
+                return
+            
+            baseline = self._empty_aggregates()
+            baseline.update(state.get('aggregates', {}))
+            self._baseline = baseline
+            
+            logger.info(f"Loaded ROI aggregates from {self.stats_path} "
+                        f"({int(baseline['total_trades'])} trades)")
+        
+        except Exception as e:
+            logger.warning(f"Failed to load ROI aggregates: {e}")
+    
+    def _record_trade(self, trade: TradeAlert):
+        """Registrar trade en el histórico y en el índice por día"""
+        self.trades_history.append(trade)
+        self._command_cache.clear()
+        
+        trade_day = trade.timestamp.date()
+        if trade_day not in self._trades_by_day:
+            # Nuevo día: podar días fuera de la ventana de retención
+            cutoff = trade_day - self.trades_by_day_retention
+            for day in [d for d in self._trades_by_day if d < cutoff]:
+                del self._trades_by_day[day]
+        self._trades_by_day[trade_day].append(trade)
+    
+    def _hms(self) -> str:
+        """Hora actual 'HH:MM:SS', reformateada solo cuando cambia el segundo de reloj"""
+        now_sec = int(time.time())
+        if now_sec != self._now_sec:
+            self._now_str = time.strftime('%H:%M:%S', time.localtime(now_sec))
+            self._now_sec = now_sec
+        return self._now_str
+    
     def _can_send_alert(self, alert_key: str) -> bool:
         """Verificar si se puede enviar alerta (rate limiting)"""
         if alert_key not in self.last_alert_time:
@@ -345,34 +571,107 @@ class TelegramNotifier:
         elapsed = datetime.now() - self.last_alert_time[alert_key]
         return elapsed >= self.min_alert_interval
     
-    async def _broadcast_message(self, message: str, parse_mode: str = None):
-        """Enviar mensaje a todos los chats configurados"""
+    async def close(self):
+        """Enviar lo pendiente antes de parar (lote de gaps y envíos en segundo plano)
+        
+        Llamar en el apagado, antes de cerrar el event loop: si no, las alertas
+        aún en cola (inicio, último error) se pierden.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._fire(self._flush_gaps())
+        
+        while self._bg_tasks:
+            await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+    
+    def _fire(self, coro: Coroutine) -> asyncio.Task:
+        """Lanzar envío en segundo plano sin bloquear al llamador"""
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+        task.add_done_callback(self._log_bg_error)
+        return task
+    
+    @staticmethod
+    def _log_bg_error(task: asyncio.Task):
+        """Registrar excepciones de tareas en segundo plano"""
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error in background Telegram task: {task.exception()}")
+    
+    async def _broadcast_message(self, message: str, parse_mode: str = None,
+                                 dedup_key: Optional[str] = None):
+        """Enviar mensaje a todos los chats configurados
+        
+        Args:
+            dedup_key: Contenido para la deduplicación (por defecto el mensaje);
+                       los emisores con '⏰ HH:MM:SS' pasan el cuerpo sin la hora
+        """
         if not self.bot:
             logger.error("Bot not initialized")
             return
         
-        for chat_id in self.chat_ids:
+        if self._is_duplicate(dedup_key if dedup_key is not None else message):
+            logger.debug("Mensaje duplicado omitido")
+            return
+        
+        # Envío concurrente: un chat con flood control no bloquea al resto
+        await asyncio.gather(*(
+            self._send_to_chat(chat_id, message, parse_mode)
+            for chat_id in self.chat_ids
+        ))
+    
+    def _is_duplicate(self, key: str) -> bool:
+        """Verificar si el mismo contenido se ha enviado dentro de dedup_window"""
+        now = time.monotonic()
+        
+        # Expulsar hashes caducados (OrderedDict en orden de inserción)
+        while self._recent_hashes:
+            sent_at = next(iter(self._recent_hashes.values()))
+            if now - sent_at < self.dedup_window:
+                break
+            self._recent_hashes.popitem(last=False)
+        
+        digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+        if digest in self._recent_hashes:
+            return True
+        
+        self._recent_hashes[digest] = now
+        return False
+    
+    async def _send_to_chat(self, chat_id: str, message: str, parse_mode: str = None):
+        """Enviar mensaje a un chat respetando su cooldown de flood control"""
+        for _ in range(self.max_send_attempts):
+            wait = self._chat_cooldown.get(chat_id, 0.0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            
             try:
                 await self.bot.send_message(
                     chat_id=chat_id,
                     text=message,
                     parse_mode=parse_mode
                 )
+                return
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                self._chat_cooldown[chat_id] = time.monotonic() + retry_after
+                logger.warning(f"Flood control en chat {chat_id}, reintento en {retry_after}s")
             except Exception as e:
                 logger.error(f"Error sending message to {chat_id}: {e}")
+                return
+        
+        logger.error(f"Error sending message to {chat_id}: flood control persistente")
     
     @staticmethod
     def _format_duration(duration: timedelta) -> str:
         """Formatear duración en formato legible"""
-        hours, remainder = divmod(duration.seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        
-        if duration.days > 0:
-            return f"{duration.days}d {hours}h {minutes}m"
-        elif hours > 0:
-            return f"{hours}h {minutes}m"
-        else:
-            return f"{minutes}m {seconds}s"
+        seconds = duration.seconds
+        if duration.days > 0 or seconds >= 3600:
+            # Los segundos no se muestran: normalizar para compartir entrada de caché
+            seconds -= seconds % 60
+        return _format_duration_cached(duration.days, seconds)
     
     # Comandos de Telegram
     async def _status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -387,13 +686,22 @@ class TelegramNotifier:
     
     async def _roi_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /roi"""
-        await self._update_roi_stats()
+        message = await self._cached_command_message('roi', self._render_roi_message)
         
-        if not self.roi_stats:
+        if not message:
             await update.message.reply_text("No hay datos de trading aún")
             return
         
-        message = (
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def _render_roi_message(self) -> Optional[str]:
+        """Construir mensaje de /roi"""
+        await self._update_roi_stats()
+        
+        if not self.roi_stats:
+            return None
+        
+        return (
             "💰 *ROI TRACKER*\n\n"
             f"Capital Inicial: ${self.roi_stats.initial_capital:.2f}\n"
             f"Capital Actual: ${self.roi_stats.current_capital:.2f}\n"
@@ -403,17 +711,25 @@ class TelegramNotifier:
             f"Sharpe: {self.roi_stats.sharpe_ratio:.2f}\n\n"
             f"🎯 Target: 78% WR | +130% ROI"
         )
-        await update.message.reply_text(message, parse_mode='Markdown')
     
     async def _stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /stats"""
-        await self._update_roi_stats()
+        message = await self._cached_command_message('stats', self._render_stats_message)
         
-        if not self.roi_stats:
+        if not message:
             await update.message.reply_text("No hay datos de trading aún")
             return
         
-        message = (
+        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def _render_stats_message(self) -> Optional[str]:
+        """Construir mensaje de /stats"""
+        await self._update_roi_stats()
+        
+        if not self.roi_stats:
+            return None
+        
+        return (
             "📊 *ESTADÍSTICAS DETALLADAS*\n\n"
             f"💰 *Capital:*\n"
             f"  Inicial: ${self.roi_stats.initial_capital:.2f}\n"
@@ -433,7 +749,18 @@ class TelegramNotifier:
             f"  Max DD: {self.roi_stats.max_drawdown:.2%}\n"
             f"  Gap Acc: {self.roi_stats.avg_gap_accuracy:.1%}"
         )
-        await update.message.reply_text(message, parse_mode='Markdown')
+    
+    async def _cached_command_message(self, command: str, render) -> Optional[str]:
+        """Devolver mensaje de comando cacheado durante command_cache_ttl segundos"""
+        now = time.monotonic()
+        cached = self._command_cache.get(command)
+        if cached and now - cached[0] < self.command_cache_ttl:
+            return cached[1]
+        
+        message = await render()
+        if message:
+            self._command_cache[command] = (now, message)
+        return message
     
     async def _trades_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /trades"""
@@ -442,15 +769,15 @@ class TelegramNotifier:
             return
         
         # Mostrar últimos 5 trades
-        recent_trades = self.trades_history[-5:]
+        recent_trades = itertools.islice(reversed(self.trades_history), 5)
         
-        message = "📊 *ÚLTIMOS TRADES*\n\n"
-        for i, trade in enumerate(reversed(recent_trades), 1):
+        parts = ["📊 *ÚLTIMOS TRADES*\n\n"]
+        for i, trade in enumerate(recent_trades, 1):
             roi_emoji = "✅" if trade.expected_roi > 0 else "❌"
-            message += (
-                f"{i}. {roi_emoji} {trade.market_name[:30]}\n"
+            parts.append(
+                f"{i}. {roi_emoji} {_escape_markdown(trade.market_name[:30])}\n"
                 f"   ${trade.position_size:.0f} | ROI: {trade.expected_roi:+.2%}\n"
                 f"   {trade.timestamp.strftime('%d/%m %H:%M')}\n\n"
             )
         
-        await update.message.reply_text(message, parse_mode='Markdown')
+        await update.message.reply_text("".join(parts), parse_mode='Markdown')
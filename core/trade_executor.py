@@ -1,37 +1,98 @@
 """Trade Executor - Sistema robusto de ejecución de trades en Polymarket"""
 import os
+import asyncio
+import concurrent.futures
+import functools
 import logging
+import json
 import time
-from typing import Dict, Optional, List
-from decimal import Decimal
-from datetime import datetime
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Optional, List, Set, Tuple, Union
 
 try:
-    from py_clob_client.client import ClobClient
-    from py_clob_client.clob_types import OrderArgs, OrderType
-    from py_clob_client.order_builder.constants import BUY, SELL
-    from py_clob_client.exceptions import PolyApiException
-    CLOB_CLIENT_AVAILABLE = True
-except ImportError:
-    CLOB_CLIENT_AVAILABLE = False
-    logging.warning(
-        "⚠️ py-clob-client no instalado. "
-        "Ejecuta: pip install py-clob-client"
-    )
+    import orjson
+except ImportError:  # Opcional: se usa el decoder JSON estándar
+    orjson = None
 
-from .wallet_manager import WalletManager
+# py-clob-client se importa de forma diferida (_load_clob): arrastra web3 y
+# cientos de módulos, y solo hace falta al construir un TradeExecutor
+ClobClient = BookParams = OrderArgs = OrderType = PolyApiException = None
+BUY = SELL = None
+CLOB_CLIENT_AVAILABLE: Optional[bool] = None  # None = aún no comprobado
+
+
+def _load_clob() -> bool:
+    """Importa py-clob-client la primera vez que se necesita"""
+    global ClobClient, BookParams, OrderArgs, OrderType, PolyApiException
+    global BUY, SELL, CLOB_CLIENT_AVAILABLE
+    
+    if CLOB_CLIENT_AVAILABLE is not None:
+        return CLOB_CLIENT_AVAILABLE
+    
+    try:
+        from py_clob_client.client import ClobClient
+        from py_clob_client.clob_types import BookParams, OrderArgs, OrderType
+        from py_clob_client.order_builder.constants import BUY, SELL
+        from py_clob_client.exceptions import PolyApiException
+        CLOB_CLIENT_AVAILABLE = True
+        _install_orjson_decoder()
+    except ImportError:
+        CLOB_CLIENT_AVAILABLE = False
+        logging.warning(
+            "⚠️ py-clob-client no instalado. "
+            "Ejecuta: pip install py-clob-client"
+        )
+    return CLOB_CLIENT_AVAILABLE
+
+
+def _orjson_response_hook(response) -> None:
+    """Sustituye Response.json() por orjson (lee el body al invocarse)"""
+    response.json = lambda **_: orjson.loads(response.content)
+
+
+def _install_orjson_decoder() -> None:
+    """Decodifica las respuestas del CLOB con orjson si está disponible"""
+    if orjson is None:
+        return
+    try:
+        from py_clob_client.http_helpers import helpers
+        hooks = helpers._http_client.event_hooks['response']
+    except (ImportError, AttributeError, KeyError):
+        return  # Versión de py-clob-client sin cliente httpx compartido
+    if _orjson_response_hook not in hooks:
+        hooks.append(_orjson_response_hook)
+
+from .wallet_manager import WalletManager, USDC_ADDRESS
 
 logger = logging.getLogger(__name__)
 
+# Unidades enteras internas: USDC tiene 6 decimales, precios en basis points (0..10000)
+USDC_UNIT = 1_000_000
+PRICE_UNIT = 10_000
+
+
+def to_micros(amount_usd: float) -> int:
+    """Convierte USD a micro-unidades enteras de USDC"""
+    return int(round(amount_usd * USDC_UNIT))
+
+
+def to_bps(price: float) -> int:
+    """Convierte precio (0-1) a basis points enteros"""
+    return int(round(price * PRICE_UNIT))
+
 
 class OrderResult:
     """Resultado de una orden para tracking"""
+    __slots__ = ('success', 'order_id', 'error', 'data', 'timestamp')
+    
     def __init__(self, success: bool, order_id: str = None, error: str = None, data: Dict = None):
         self.success = success
         self.order_id = order_id
         self.error = error
         self.data = data or {}
-        self.timestamp = datetime.utcnow()
+        self.timestamp: int = time.time_ns()  # epoch UTC en ns; convertir solo al mostrar
 
 
 class TradeExecutor:
@@ -42,6 +103,12 @@ class TradeExecutor:
     MIN_TRADE_AMOUNT_USD = 1.0    # Mínimo $1
     MAX_TRADE_AMOUNT_USD = 10000  # Máximo $10k por trade (configurable)
     MAX_SLIPPAGE_PCT = 0.05       # Máx 5% de slippage
+    ORDERBOOK_TTL_SECONDS = 0.25  # Reutilizar orderbook entre llamadas cercanas
+    MAX_ORDERS_PER_SECOND = 10    # Límite de post_order del CLOB
+    PENDING_TTL_SECONDS = 300     # Resultados de submit_market_order consultables tras reconciliar
+    TERMINAL_TRADE_STATUSES = ('CONFIRMED', 'FAILED')  # Estados finales de un trade on-chain
+    USER_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+    USDC_ADDRESS = USDC_ADDRESS   # USDC en Polygon
     
     def __init__(self, wallet_manager: WalletManager, risk_manager=None):
         """
@@ -51,7 +118,7 @@ class TradeExecutor:
             wallet_manager: Instancia de WalletManager configurada
             risk_manager: Gestor de riesgo (opcional)
         """
-        if not CLOB_CLIENT_AVAILABLE:
+        if not _load_clob():
             raise ImportError(
                 "py-clob-client requerido. Instala: pip install py-clob-client"
             )
@@ -70,6 +137,11 @@ class TradeExecutor:
         self.max_trade_usd = float(os.getenv('MAX_TRADE_AMOUNT_USD', self.MAX_TRADE_AMOUNT_USD))
         self.max_slippage = float(os.getenv('MAX_SLIPPAGE_PCT', self.MAX_SLIPPAGE_PCT))
         
+        # Límites en unidades enteras (micro-USDC / basis points)
+        self._min_trade_micros = to_micros(self.MIN_TRADE_AMOUNT_USD)
+        self._max_trade_micros = to_micros(self.max_trade_usd)
+        self._max_slippage_bps = to_bps(self.max_slippage)
+        
         # Cliente CLOB
         self.client = None
         if self.wallet.account:
@@ -80,10 +152,10 @@ class TradeExecutor:
                     key=self.wallet.private_key,
                     funder=self.wallet.address
                 )
-                logger.info(f"✅ CLOB Client inicializado: {self.clob_host}")
-                logger.info(f"🔧 Límites: Max ${self.max_trade_usd}, Slippage {self.max_slippage*100}%")
+                logger.info("✅ CLOB Client inicializado: %s", self.clob_host)
+                logger.info("🔧 Límites: Max $%s, Slippage %s%%", self.max_trade_usd, self.max_slippage * 100)
             except Exception as e:
-                logger.error(f"❌ Error inicializando CLOB Client: {e}")
+                logger.error("❌ Error inicializando CLOB Client: %s", e)
                 raise
         else:
             raise ValueError("Wallet no configurada - no se puede inicializar TradeExecutor")
@@ -95,53 +167,417 @@ class TradeExecutor:
         self.orders_failed = 0
         self.total_volume_usd = 0.0
         
+        # Caché de orderbooks: token_id -> (timestamp monotonic, orderbook)
+        self._orderbook_cache: Dict[str, Tuple[float, Dict]] = {}
+        
+        # Balance USDC en memoria (micro-unidades): se refresca por TTL y se descuenta al enviar BUYs
+        self._balance_micros: Optional[int] = None
+        self._balance_ts = 0.0
+        self._balance_ttl = float(os.getenv('BALANCE_CACHE_TTL', '5.0'))
+        # BUYs reservadas y aún no enviadas: el balance on-chain todavía no las refleja
+        self._reserved_micros = 0
+        self._balance_lock = threading.Lock()
+        
+        # Pool dedicado a la firma EIP-712 (CPU): no compite con el I/O del pool por defecto
+        self._signer_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4,
+            thread_name_prefix='clob-signer'
+        )
+        
+        # Rate limiting de post_order: concurrencia + ventana deslizante de 1s
+        self._post_semaphore = asyncio.Semaphore(self.MAX_ORDERS_PER_SECOND)
+        self._post_times: deque = deque()
+        
+        # Órdenes enviadas con ack provisional: request_id -> resultado (None = pendiente)
+        self._pending_orders: Dict[str, Optional[OrderResult]] = {}
+        self._pending_events: Dict[str, asyncio.Event] = {}
+        self._reconcile_tasks: Set[asyncio.Task] = set()
+        
+        # Estado de órdenes empujado por el canal user del WebSocket: order_id -> registro
+        # de la orden (último evento order + trade_status del fill); caduca al cerrarse
+        self._order_state: Dict[str, Dict] = {}
+        self._ws_task: Optional[asyncio.Task] = None
+        self._ws_running = False
+        
         # Historial de órdenes (últimas 100)
-        self.order_history: List[OrderResult] = []
         self.MAX_HISTORY = 100
+        self.order_history: deque = deque(maxlen=self.MAX_HISTORY)
+        
+        # Validador especializado con los límites fijados (ver _compile_validator)
+        self._validate = self._compile_validator()
     
     def _validate_trade_parameters(
         self,
-        amount_usd: float,
-        price: float,
+        amount_micros: int,
+        price_bps: int,
         side: str
     ) -> tuple[bool, str]:
         """
         Valida parámetros de trade antes de ejecutar
         
+        Args:
+            amount_micros: Cantidad en micro-unidades de USDC
+            price_bps: Precio en basis points (0-10000)
+            side: Constante BUY o SELL de py_clob_client (ya normalizada)
+        
         Returns:
             (valid, error_message)
         """
-        # Validar amount
-        if amount_usd < self.MIN_TRADE_AMOUNT_USD:
-            return False, f"Amount too small: ${amount_usd} < ${self.MIN_TRADE_AMOUNT_USD}"
+        return self._validate(amount_micros, price_bps, side)
+    
+    def _compile_validator(self):
+        """
+        Especializa la validación con los límites de esta instancia
+        
+        Los límites no cambian tras __init__: se fijan como argumentos por
+        defecto del closure (LOAD_FAST) en lugar de leerse de self en cada orden.
+        """
+        def validate(
+            amount_micros: int,
+            price_bps: int,
+            side: str,
+            _min=self._min_trade_micros,
+            _max=self._max_trade_micros,
+            _min_usd=self.MIN_TRADE_AMOUNT_USD,
+            _max_usd=self.max_trade_usd,
+            _buy=BUY,
+            _sell=SELL,
+            _price_unit=PRICE_UNIT,
+            _usdc_unit=USDC_UNIT,
+            _monotonic=time.monotonic,
+            _executor=self
+        ) -> tuple[bool, str]:
+            # Validar amount
+            if amount_micros < _min:
+                return False, f"Amount too small: ${amount_micros / _usdc_unit} < ${_min_usd}"
+            
+            if amount_micros > _max:
+                return False, f"Amount too large: ${amount_micros / _usdc_unit} > ${_max_usd}"
+            
+            # Validar price
+            if price_bps <= 0 or price_bps > _price_unit:
+                return False, f"Invalid price: {price_bps / _price_unit} (must be 0 < price <= 1)"
+            
+            # Validar side (constante BUY/SELL de py_clob_client, comparada por identidad)
+            if side is not _buy and side is not _sell:
+                return False, f"Invalid side: {side} (must be BUY or SELL)"
+            
+            # Verificar balance solo para BUY (SELL no gasta USDC: sin RPC)
+            if side is _buy:
+                if _monotonic() - _executor._balance_ts > _executor._balance_ttl:
+                    _executor._refresh_balance()
+                balance_micros = _executor._balance_micros
+                
+                if balance_micros < amount_micros:
+                    return False, (f"Insufficient USDC balance: ${balance_micros / _usdc_unit} "
+                                   f"< ${amount_micros / _usdc_unit}")
+            
+            return True, ""
         
-        if amount_usd > self.max_trade_usd:
-            return False, f"Amount too large: ${amount_usd} > ${self.max_trade_usd}"
+        return validate
+    
+    def _refresh_balance(self):
+        """Refresca el balance USDC cacheado desde la wallet (RPC), descontando las reservas en vuelo"""
+        balance_micros = to_micros(self.wallet.get_balance(self.USDC_ADDRESS))
+        with self._balance_lock:
+            self._balance_micros = balance_micros - self._reserved_micros
+            self._balance_ts = time.monotonic()
+    
+    def _reserve_balance(self, amount_micros: int) -> bool:
+        """Reserva el importe de una BUY si cabe en el balance (comprobación y descuento atómicos)"""
+        with self._balance_lock:
+            if self._balance_micros is None or self._balance_micros < amount_micros:
+                return False
+            self._balance_micros -= amount_micros
+            self._reserved_micros += amount_micros
+            return True
+    
+    def _settle_reservation(self, order_data: Dict, posted: bool):
+        """Cierra la reserva de una BUY: queda descontada si se envió, se devuelve si no"""
+        if order_data['side'] is not BUY:
+            return
+        amount_micros = to_micros(order_data['amount'])
+        with self._balance_lock:
+            self._reserved_micros -= amount_micros
+            if not posted:
+                self._balance_micros += amount_micros
+    
+    def invalidate_balance(self):
+        """Fuerza refresco del balance en la próxima validación (p.ej. tras un fill o cancelación)"""
+        self._balance_ts = 0.0
+    
+    def _get_orderbook(self, token_id: str) -> Optional[Dict]:
+        """Obtiene orderbook reutilizando respuestas de menos de ORDERBOOK_TTL_SECONDS"""
+        now = time.monotonic()
+        cached = self._orderbook_cache.get(token_id)
+        if cached and now - cached[0] < self.ORDERBOOK_TTL_SECONDS:
+            return cached[1]
         
-        # Validar price
-        if price <= 0 or price > 1:
-            return False, f"Invalid price: {price} (must be 0 < price <= 1)"
+        book = self.client.get_order_book(token_id)
+        if not book:
+            return None
+        orderbook = self._orderbook_to_dict(book)
+        self._cache_orderbooks({token_id: orderbook}, now)
+        return orderbook
+    
+    def _cache_orderbooks(self, orderbooks: Dict[str, Dict], now: float):
+        """Guarda orderbooks en caché y descarta los que superaron ORDERBOOK_TTL_SECONDS"""
+        cache = self._orderbook_cache
+        for token_id in [t for t, (ts, _) in cache.items() if now - ts >= self.ORDERBOOK_TTL_SECONDS]:
+            del cache[token_id]
+        for token_id, orderbook in orderbooks.items():
+            cache[token_id] = (now, orderbook)
+    
+    def get_orderbooks(self, token_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Obtiene varios orderbooks con una sola petición al endpoint bulk /books
         
-        # Validar side
-        if side.upper() not in ['BUY', 'SELL']:
-            return False, f"Invalid side: {side} (must be BUY or SELL)"
+        Los orderbooks aún frescos en caché no se vuelven a pedir; los obtenidos
+        quedan en caché para las órdenes que se creen a continuación.
         
-        # Verificar balance
-        usdc_address = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
-        balance = self.wallet.get_balance(usdc_address)
+        Returns:
+            Dict token_id -> orderbook ({'bids': [...], 'asks': [...]})
+        """
+        now = time.monotonic()
+        orderbooks: Dict[str, Dict] = {}
+        missing: List[str] = []
+        for token_id in dict.fromkeys(token_ids):
+            cached = self._orderbook_cache.get(token_id)
+            if cached and now - cached[0] < self.ORDERBOOK_TTL_SECONDS:
+                orderbooks[token_id] = cached[1]
+            else:
+                missing.append(token_id)
         
-        if side.upper() == 'BUY' and balance < amount_usd:
-            return False, f"Insufficient USDC balance: ${balance} < ${amount_usd}"
+        if missing:
+            books = self.client.get_order_books([BookParams(token_id=t) for t in missing])
+            fetched = {token_id: self._orderbook_to_dict(book)
+                       for token_id, book in zip(missing, books or [])}
+            self._cache_orderbooks(fetched, now)
+            orderbooks.update(fetched)
         
-        return True, ""
+        return orderbooks
+    
+    @staticmethod
+    def _orderbook_to_dict(book) -> Dict:
+        """Normaliza un OrderBookSummary de py_clob_client al formato dict del executor"""
+        if isinstance(book, dict):
+            return book
+        return {
+            'bids': [{'price': level.price, 'size': level.size} for level in book.bids or []],
+            'asks': [{'price': level.price, 'size': level.size} for level in book.asks or []]
+        }
+    
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Ejecuta una llamada bloqueante del CLOB/Web3 en el thread pool por defecto"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
+    async def _acquire_post_slot(self):
+        """Espera hasta que post_order quede dentro de MAX_ORDERS_PER_SECOND"""
+        while True:
+            now = time.monotonic()
+            while self._post_times and now - self._post_times[0] >= 1.0:
+                self._post_times.popleft()
+            
+            if len(self._post_times) < self.MAX_ORDERS_PER_SECOND:
+                self._post_times.append(now)
+                return
+            
+            await asyncio.sleep(1.0 - (now - self._post_times[0]))
+    
+    async def _post_order(self, signed_order) -> Optional[Dict]:
+        """Envía una orden firmada respetando el rate limit del CLOB"""
+        async with self._post_semaphore:
+            await self._acquire_post_slot()
+            return await self._run_blocking(self.client.post_order, signed_order, OrderType.GTC)
     
     def _add_to_history(self, result: OrderResult):
-        """Añade orden al historial (mantiene últimas 100)"""
+        """Añade orden al historial (deque con maxlen: mantiene últimas 100)"""
         self.order_history.append(result)
-        if len(self.order_history) > self.MAX_HISTORY:
-            self.order_history.pop(0)
     
-    def create_market_order(
+    async def _prepare_order(
+        self,
+        token_id: str,
+        side: str,
+        amount_usd: float,
+        price_limit: Optional[float],
+        dry_run: bool
+    ) -> Union[OrderResult, Tuple[asyncio.Future, Dict]]:
+        """
+        Valida la orden, lanza su firma y reserva el balance (pasos 1-7)
+        
+        Returns:
+            OrderResult si la orden termina aquí (rechazo o dry run),
+            o (future de la orden firmada, datos de la orden) si debe enviarse
+        """
+        logger.info("%sCreating %s order for $%s", '[DRY RUN] ' if dry_run else '', side, amount_usd)
+        
+        # Normalizar side una sola vez a la constante del CLOB
+        normalized_side = side.upper()
+        side_const = BUY if normalized_side == 'BUY' else SELL if normalized_side == 'SELL' else None
+        if side_const is None:
+            error = f"Invalid side: {side} (must be BUY or SELL)"
+            logger.error("❌ Validación fallida: %s", error)
+            result = OrderResult(False, error=error)
+            self._add_to_history(result)
+            self.orders_failed += 1
+            return result
+        
+        # 1. Obtener orderbook (una sola petición por orden)
+        orderbook = await self._run_blocking(self._get_orderbook, token_id)
+        if not orderbook or not orderbook.get('bids') or not orderbook.get('asks'):
+            return OrderResult(False, error="Orderbook vacío o inválido")
+        
+        if side_const is BUY:
+            market_bps = to_bps(float(orderbook['asks'][0]['price']))
+        else:
+            market_bps = to_bps(float(orderbook['bids'][0]['price']))
+        
+        # Usar mejor precio si no se especifica
+        if price_limit is None:
+            price_bps = market_bps
+            logger.info("Precio de mercado: $%.4f", price_bps / PRICE_UNIT)
+        else:
+            price_bps = to_bps(price_limit)
+        amount_micros = to_micros(amount_usd)
+        
+        # 2. Validar parámetros
+        valid, error = await self._run_blocking(
+            self._validate, amount_micros, price_bps, side_const
+        )
+        if not valid:
+            logger.error("❌ Validación fallida: %s", error)
+            result = OrderResult(False, error=error)
+            self._add_to_history(result)
+            self.orders_failed += 1
+            return result
+        
+        # 3. Calcular size en shares (micro-shares enteros)
+        size_micros = amount_micros * PRICE_UNIT // price_bps
+        
+        # 4. Validar slippage (contra el mismo orderbook), en aritmética entera
+        if side_const is BUY:
+            slippage_diff = price_bps - market_bps
+        else:
+            slippage_diff = market_bps - price_bps
+        
+        if abs(slippage_diff) * PRICE_UNIT > self._max_slippage_bps * market_bps:
+            error = (f"Slippage too high: {slippage_diff * 100 / market_bps:.2f}% "
+                     f"> {self.max_slippage*100}%")
+            logger.warning("⚠️ %s", error)
+            result = OrderResult(False, error=error)
+            self._add_to_history(result)
+            return result
+        
+        # Conversión a float solo en la frontera con el CLOB / llamador
+        size = size_micros / USDC_UNIT
+        price_limit = price_bps / PRICE_UNIT
+        amount_usd = amount_micros / USDC_UNIT
+        
+        # Firmar en el pool de firma mientras corre el risk check
+        signed_future = None
+        if not dry_run:
+            order_args = OrderArgs(
+                price=price_limit,
+                size=size,
+                side=side_const,
+                token_id=token_id
+            )
+            signed_future = asyncio.get_running_loop().run_in_executor(
+                self._signer_pool, self.client.create_order, order_args
+            )
+            # Si la orden se descarta, la firma se ignora (sin aviso de excepción no recuperada)
+            signed_future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        
+        # 5. Aplicar risk management si existe
+        if self.risk_manager:
+            approved, reason = self.risk_manager.approve_trade(
+                amount_usd=amount_usd,
+                side=side_const,
+                token_id=token_id
+            )
+            if not approved:
+                logger.warning("🛡️ Risk Manager rechazó trade: %s", reason)
+                if signed_future is not None:
+                    signed_future.cancel()
+                result = OrderResult(False, error=f"Risk check failed: {reason}")
+                self._add_to_history(result)
+                return result
+        
+        # 6. Si es dry run, retornar simulación
+        if dry_run:
+            logger.info("✅ [DRY RUN] Trade válido: %.2f shares @ $%.4f", size, price_limit)
+            return OrderResult(
+                True,
+                order_id="DRY_RUN",
+                data={'size': size, 'price': price_limit, 'amount': amount_usd}
+            )
+        
+        # 7. Reservar el importe de la BUY: órdenes concurrentes no comparten el mismo balance
+        if side_const is BUY and not self._reserve_balance(amount_micros):
+            signed_future.cancel()
+            error = f"Insufficient USDC balance: ${amount_usd} (reservado por órdenes en curso)"
+            logger.error("❌ Validación fallida: %s", error)
+            result = OrderResult(False, error=error)
+            self._add_to_history(result)
+            self.orders_failed += 1
+            return result
+        
+        order_data = {
+            'size': size,
+            'price': price_limit,
+            'amount': amount_usd,
+            'side': side_const,
+            'token_id': token_id
+        }
+        return signed_future, order_data
+    
+    def _process_post_response(self, response: Optional[Dict], order_data: Dict) -> OrderResult:
+        """Procesa la respuesta de post_order (paso 9)"""
+        if response and response.get('orderID'):
+            order_id = response['orderID']
+            self.orders_placed += 1
+            self.total_volume_usd += order_data['amount']
+            
+            # La reserva queda como descuento optimista hasta el próximo refresco del balance
+            self._settle_reservation(order_data, posted=True)
+            
+            logger.info(
+                "✅ Orden %s creada exitosamente\n"
+                "   Order ID: %s\n"
+                "   Size: %.2f shares\n"
+                "   Price: $%.4f\n"
+                "   Total: $%.2f",
+                order_data['side'], order_id, order_data['size'],
+                order_data['price'], order_data['amount']
+            )
+            
+            result = OrderResult(True, order_id=order_id, data=dict(order_data))
+            self._add_to_history(result)
+            return result
+        else:
+            self._settle_reservation(order_data, posted=False)
+            error = "Respuesta inválida del servidor"
+            logger.error("❌ %s: %s", error, response)
+            result = OrderResult(False, error=error, data=response)
+            self._add_to_history(result)
+            self.orders_failed += 1
+            return result
+    
+    def _order_exception_result(self, e: Exception) -> OrderResult:
+        """Convierte una excepción de ejecución en OrderResult fallido"""
+        if isinstance(e, PolyApiException):
+            error = f"Polymarket API error: {str(e)}"
+            logger.error("❌ %s", error)
+        else:
+            error = f"Unexpected error: {str(e)}"
+            logger.error("❌ %s", error, exc_info=True)
+        result = OrderResult(False, error=error)
+        self._add_to_history(result)
+        self.orders_failed += 1
+        return result
+    
+    async def create_market_order(
         self,
         token_id: str,
         side: str,
@@ -166,133 +602,232 @@ class TradeExecutor:
             return OrderResult(False, error="Cliente no inicializado")
         
         try:
-            logger.info(f"{'[DRY RUN] ' if dry_run else ''}Creating {side} order for ${amount_usd}")
+            prepared = await self._prepare_order(token_id, side, amount_usd, price_limit, dry_run)
+            if isinstance(prepared, OrderResult):
+                return prepared
+            signed_future, order_data = prepared
             
-            # 1. Obtener mejor precio si no se especifica
-            if price_limit is None:
-                orderbook = self.client.get_orderbook(token_id)
-                if not orderbook or not orderbook.get('bids') or not orderbook.get('asks'):
-                    return OrderResult(False, error="Orderbook vacío o inválido")
-                
-                if side.upper() == 'BUY':
-                    best_price = float(orderbook['asks'][0]['price'])
-                else:
-                    best_price = float(orderbook['bids'][0]['price'])
-                
-                price_limit = best_price
-                logger.info(f"Precio de mercado: ${price_limit:.4f}")
-            
-            # 2. Validar parámetros
-            valid, error = self._validate_trade_parameters(amount_usd, price_limit, side)
-            if not valid:
-                logger.error(f"❌ Validación fallida: {error}")
-                result = OrderResult(False, error=error)
-                self._add_to_history(result)
-                self.orders_failed += 1
-                return result
-            
-            # 3. Calcular size en shares
-            size = amount_usd / price_limit
+            # 8. Esperar la firma y enviar orden
+            try:
+                signed_order = await signed_future
+                response = await self._post_order(signed_order)
+            except BaseException:
+                self._settle_reservation(order_data, posted=False)
+                raise
             
-            # 4. Validar slippage
-            if price_limit > 0:
-                orderbook = self.client.get_orderbook(token_id)
-                if side.upper() == 'BUY':
-                    market_price = float(orderbook['asks'][0]['price'])
-                    slippage = (price_limit - market_price) / market_price
-                else:
-                    market_price = float(orderbook['bids'][0]['price'])
-                    slippage = (market_price - price_limit) / market_price
+            # 9. Procesar respuesta
+            return self._process_post_response(response, order_data)
                 
-                if abs(slippage) > self.max_slippage:
-                    error = f"Slippage too high: {slippage*100:.2f}% > {self.max_slippage*100}%"
-                    logger.warning(f"⚠️ {error}")
-                    result = OrderResult(False, error=error)
-                    self._add_to_history(result)
-                    return result
+        except Exception as e:
+            return self._order_exception_result(e)
+    
+    async def submit_market_order(
+        self,
+        token_id: str,
+        side: str,
+        amount_usd: float,
+        price_limit: float = None,
+        dry_run: bool = False
+    ) -> OrderResult:
+        """
+        Valida y firma la orden y devuelve un ack provisional sin esperar a post_order
+        
+        El envío y la reconciliación del order ID real se hacen en segundo plano;
+        consultar con get_order_status(request_id) o wait_for_order(request_id).
+        
+        Returns:
+            OrderResult con order_id=request_id y data['status']='pending_reconcile',
+            o el resultado final si la orden se rechaza antes de enviarse
+        """
+        if not self.client:
+            return OrderResult(False, error="Cliente no inicializado")
+        
+        try:
+            prepared = await self._prepare_order(token_id, side, amount_usd, price_limit, dry_run)
+            if isinstance(prepared, OrderResult):
+                return prepared
+            signed_future, order_data = prepared
+        except Exception as e:
+            return self._order_exception_result(e)
+        
+        try:
+            signed_order = await signed_future
+        except Exception as e:
+            self._settle_reservation(order_data, posted=False)
+            return self._order_exception_result(e)
+        
+        request_id = uuid.uuid4().hex
+        self._pending_orders[request_id] = None
+        self._pending_events[request_id] = asyncio.Event()
+        
+        task = asyncio.create_task(self._finalize_order(request_id, signed_order, order_data))
+        self._reconcile_tasks.add(task)
+        task.add_done_callback(self._reconcile_tasks.discard)
+        
+        return OrderResult(
+            True,
+            order_id=request_id,
+            data={**order_data, 'status': 'pending_reconcile'}
+        )
+    
+    async def _finalize_order(self, request_id: str, signed_order, order_data: Dict):
+        """Envía una orden con ack provisional y registra el resultado real"""
+        try:
+            response = await self._post_order(signed_order)
+        except Exception as e:
+            self._settle_reservation(order_data, posted=False)
+            result = self._order_exception_result(e)
+        else:
+            result = self._process_post_response(response, order_data)
+        
+        self._pending_orders[request_id] = result
+        self._pending_events[request_id].set()
+        
+        # Si nadie llama a wait_for_order, la entrada caduca igualmente
+        asyncio.get_running_loop().call_later(
+            self.PENDING_TTL_SECONDS, self._forget_pending, request_id
+        )
+    
+    def _forget_pending(self, request_id: str):
+        """Elimina una orden reconciliada de los dicts de pendientes"""
+        self._pending_orders.pop(request_id, None)
+        self._pending_events.pop(request_id, None)
+    
+    async def wait_for_order(self, request_id: str, timeout: float = None) -> Optional[OrderResult]:
+        """Espera la reconciliación de una orden enviada con submit_market_order"""
+        event = self._pending_events.get(request_id)
+        if event is None:
+            return None
+        await asyncio.wait_for(event.wait(), timeout)
+        # Resultado entregado: liberar las entradas (sigue en order_history)
+        result = self._pending_orders.get(request_id)
+        self._forget_pending(request_id)
+        return result
+    
+    async def create_many(self, orders: List[Dict]) -> List[OrderResult]:
+        """
+        Crea varias órdenes de mercado en paralelo
+        
+        Args:
+            orders: Lista de kwargs para create_market_order
+                    (token_id, side, amount_usd, price_limit, dry_run)
             
-            # 5. Aplicar risk management si existe
-            if self.risk_manager:
-                approved, reason = self.risk_manager.approve_trade(
-                    amount_usd=amount_usd,
-                    side=side,
-                    token_id=token_id
-                )
-                if not approved:
-                    logger.warning(f"🛡️ Risk Manager rechazó trade: {reason}")
-                    result = OrderResult(False, error=f"Risk check failed: {reason}")
-                    self._add_to_history(result)
-                    return result
+        Returns:
+            Lista de OrderResult en el mismo orden que `orders`
+        """
+        # Un único round-trip para todos los orderbooks; cada orden los lee de caché
+        token_ids = [order['token_id'] for order in orders]
+        if self.client and token_ids:
+            try:
+                await self._run_blocking(self.get_orderbooks, token_ids)
+            except Exception as e:
+                logger.warning("⚠️ Bulk orderbook fetch falló, se pedirán por orden: %s", e)
+        
+        tasks = [asyncio.create_task(self.create_market_order(**order)) for order in orders]
+        return await asyncio.gather(*tasks)
+    
+    def start_order_stream(self) -> asyncio.Task:
+        """Arranca el consumo del canal user del CLOB en segundo plano"""
+        if self._ws_task is None or self._ws_task.done():
+            self._ws_running = True
+            self._ws_task = asyncio.create_task(self._run_ws())
+        return self._ws_task
+    
+    async def stop_order_stream(self):
+        """Detiene el stream de órdenes"""
+        self._ws_running = False
+        if self._ws_task:
+            self._ws_task.cancel()
+            try:
+                await self._ws_task
+            except asyncio.CancelledError:
+                pass
+            self._ws_task = None
+    
+    async def _run_ws(self):
+        """Mantiene _order_state actualizado desde el canal user (reconecta con backoff)"""
+        import websockets
+        
+        if self.client.creds is None:
+            creds = await self._run_blocking(self.client.create_or_derive_api_creds)
+            self.client.set_api_creds(creds)
+        creds = self.client.creds
+        subscribe_msg = json.dumps({
+            "type": "user",
+            "markets": [],
+            "auth": {
+                "apiKey": creds.api_key,
+                "secret": creds.api_secret,
+                "passphrase": creds.api_passphrase
+            }
+        })
+        
+        backoff = 1.0
+        while self._ws_running:
+            try:
+                async with websockets.connect(
+                    self.USER_WS_URL,
+                    ping_interval=20,
+                    ping_timeout=10
+                ) as websocket:
+                    await websocket.send(subscribe_msg)
+                    logger.info("✅ Stream de órdenes conectado (canal user)")
+                    backoff = 1.0
+                    
+                    async for message in websocket:
+                        self._handle_user_message(message)
             
-            # 6. Si es dry run, retornar simulación
-            if dry_run:
-                logger.info(f"✅ [DRY RUN] Trade válido: {size:.2f} shares @ ${price_limit:.4f}")
-                return OrderResult(
-                    True,
-                    order_id="DRY_RUN",
-                    data={'size': size, 'price': price_limit, 'amount': amount_usd}
-                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Stream de órdenes caído (%s), reconectando en %.0fs...", e, backoff)
             
-            # 7. Crear y enviar orden
-            order_args = OrderArgs(
-                price=price_limit,
-                size=size,
-                side=BUY if side.upper() == 'BUY' else SELL,
-                token_id=token_id
-            )
+            if self._ws_running:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+    
+    def _handle_user_message(self, message):
+        """Aplica eventos order/trade del canal user al estado local"""
+        try:
+            data = orjson.loads(message) if orjson else json.loads(message)
+        except ValueError:
+            return  # PONG u otros mensajes no JSON
+        
+        events = data if isinstance(data, list) else (data,)
+        for ev in events:
+            event_type = ev.get('event_type')
             
-            signed_order = self.client.create_order(order_args)
-            response = self.client.post_order(signed_order, OrderType.GTC)
+            if event_type == 'order':
+                order_id = ev.get('id')
+                if order_id:
+                    # update: conserva el trade_status de un fill anterior
+                    record = self._order_state.setdefault(order_id, {})
+                    record.update(ev)
+                    if ev.get('type') == 'CANCELLATION':
+                        record['status'] = 'CANCELED'
+                        self._expire_order_state(order_id)
+                if ev.get('type') == 'CANCELLATION':
+                    self.invalidate_balance()
             
-            # 8. Procesar respuesta
-            if response and response.get('orderID'):
-                order_id = response['orderID']
-                self.orders_placed += 1
-                self.total_volume_usd += amount_usd
-                
-                logger.info(
-                    f"✅ Orden {side} creada exitosamente\n"
-                    f"   Order ID: {order_id}\n"
-                    f"   Size: {size:.2f} shares\n"
-                    f"   Price: ${price_limit:.4f}\n"
-                    f"   Total: ${amount_usd:.2f}"
-                )
-                
-                result = OrderResult(
-                    True,
-                    order_id=order_id,
-                    data={
-                        'size': size,
-                        'price': price_limit,
-                        'amount': amount_usd,
-                        'side': side,
-                        'token_id': token_id
-                    }
-                )
-                self._add_to_history(result)
-                return result
-            else:
-                error = "Respuesta inválida del servidor"
-                logger.error(f"❌ {error}: {response}")
-                result = OrderResult(False, error=error, data=response)
-                self._add_to_history(result)
-                self.orders_failed += 1
-                return result
-                
-        except PolyApiException as e:
-            error = f"Polymarket API error: {str(e)}"
-            logger.error(f"❌ {error}")
-            result = OrderResult(False, error=error)
-            self._add_to_history(result)
-            self.orders_failed += 1
-            return result
-        except Exception as e:
-            error = f"Unexpected error: {str(e)}"
-            logger.error(f"❌ {error}", exc_info=True)
-            result = OrderResult(False, error=error)
-            self._add_to_history(result)
-            self.orders_failed += 1
-            return result
+            elif event_type == 'trade':
+                order_id = ev.get('taker_order_id')
+                if order_id:
+                    # El fill se funde en el registro de la orden: get_order_status
+                    # siempre devuelve la forma de orden, como el fallback REST
+                    record = self._order_state.setdefault(order_id, {'id': order_id})
+                    record['trade_status'] = ev.get('status')
+                    if ev.get('status') in self.TERMINAL_TRADE_STATUSES:
+                        self._expire_order_state(order_id)
+                if ev.get('status') == 'MATCHED':
+                    self.orders_filled += 1
+                # Un fill cambia el balance real: corregir la deriva del descuento optimista
+                self.invalidate_balance()
+    
+    def _expire_order_state(self, order_id: str):
+        """Programa la baja de una orden cerrada de _order_state tras PENDING_TTL_SECONDS"""
+        asyncio.get_running_loop().call_later(
+            self.PENDING_TTL_SECONDS, self._order_state.pop, order_id, None
+        )
     
     def cancel_order(self, order_id: str) -> bool:
         """Cancela una orden con manejo de errores"""
@@ -305,14 +840,15 @@ class TradeExecutor:
             
             if response and response.get('success'):
                 self.orders_cancelled += 1
-                logger.info(f"✅ Orden {order_id} cancelada")
+                self.invalidate_balance()
+                logger.info("✅ Orden %s cancelada", order_id)
                 return True
             else:
-                logger.warning(f"⚠️ No se pudo cancelar {order_id}: {response}")
+                logger.warning("⚠️ No se pudo cancelar %s: %s", order_id, response)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Error cancelando {order_id}: {e}")
+            logger.error("❌ Error cancelando %s: %s", order_id, e)
             return False
     
     def get_open_orders(self) -> List[Dict]:
@@ -324,18 +860,31 @@ class TradeExecutor:
             orders = self.client.get_orders()
             return orders if orders else []
         except Exception as e:
-            logger.error(f"❌ Error obteniendo órdenes: {e}")
+            logger.error("❌ Error obteniendo órdenes: %s", e)
             return []
     
     def get_order_status(self, order_id: str) -> Optional[Dict]:
-        """Obtiene estado de una orden"""
+        """Obtiene estado de una orden (acepta request_id de submit_market_order)"""
+        if order_id in self._pending_orders:
+            result = self._pending_orders[order_id]
+            if result is None:
+                return {'status': 'pending_reconcile', 'request_id': order_id}
+            if not result.success:
+                return {'status': 'failed', 'request_id': order_id, 'error': result.error}
+            order_id = result.order_id
+        
+        # Estado empujado por el stream de órdenes; REST solo como fallback
+        state = self._order_state.get(order_id)
+        if state is not None:
+            return state
+        
         if not self.client:
             return None
         
         try:
             return self.client.get_order(order_id)
         except Exception as e:
-            logger.error(f"❌ Error obteniendo orden {order_id}: {e}")
+            logger.error("❌ Error obteniendo orden %s: %s", order_id, e)
             return None
     
     def get_stats(self) -> Dict:
@@ -346,4 +895,9 @@ class TradeExecutor:
         
         return {
             'orders_placed': self.orders_placed,
-            '
+            'orders_filled': self.orders_filled,
+            'orders_cancelled': self.orders_cancelled,
+            'orders_failed': self.orders_failed,
+            'total_volume_usd': self.total_volume_usd,
+            'success_rate': success_rate
+        }
@@ -1,14 +1,77 @@
 """Wallet Manager - Gestión segura de wallets para Polymarket"""
 import os
 import logging
-from typing import Optional, Dict
-from eth_account import Account
-from eth_account.signers.local import LocalAccount
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
+import functools
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import TYPE_CHECKING, Optional, Dict, List
+
+# web3 / eth_account / eth_abi se importan de forma diferida en los métodos que
+# los usan: solo hacen falta con private key configurada y son lentos de cargar
+if TYPE_CHECKING:
+    from eth_account.signers.local import LocalAccount
+    from web3 import Web3
+    from web3.contract import Contract
 
 logger = logging.getLogger(__name__)
 
+# USDC en Polygon
+USDC_ADDRESS = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
+
+# ABI mínima ERC20 (balanceOf + decimals); tupla para evitar mutaciones
+ERC20_ABI = ({
+    "constant": True,
+    "inputs": [{"name": "_owner", "type": "address"}],
+    "name": "balanceOf",
+    "outputs": [{"name": "balance", "type": "uint256"}],
+    "type": "function"
+}, {
+    "constant": True,
+    "inputs": [],
+    "name": "decimals",
+    "outputs": [{"name": "", "type": "uint8"}],
+    "type": "function"
+})
+
+# Multicall3 (misma dirección canónica en Polygon y demás redes EVM)
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+MULTICALL3_ABI = [{
+    "inputs": [{
+        "components": [
+            {"name": "target", "type": "address"},
+            {"name": "allowFailure", "type": "bool"},
+            {"name": "callData", "type": "bytes"}
+        ],
+        "name": "calls",
+        "type": "tuple[]"
+    }],
+    "name": "aggregate3",
+    "outputs": [{
+        "components": [
+            {"name": "success", "type": "bool"},
+            {"name": "returnData", "type": "bytes"}
+        ],
+        "name": "returnData",
+        "type": "tuple[]"
+    }],
+    "stateMutability": "payable",
+    "type": "function"
+}]
+
+# Selectores de función (primeros 4 bytes de keccak256 de la firma)
+SELECTOR_BALANCE_OF = bytes.fromhex('70a08231')       # balanceOf(address)
+SELECTOR_DECIMALS = bytes.fromhex('313ce567')         # decimals()
+SELECTOR_GET_ETH_BALANCE = bytes.fromhex('4d2301cc')  # getEthBalance(address)
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_defunct(message: str):
+    """Codifica un mensaje EIP-191; cacheado para mensajes que se firman repetidamente"""
+    from eth_account.messages import encode_defunct
+    return encode_defunct(text=message)
+
 
 class WalletManager:
     """Gestiona la wallet de trading con seguridad"""
@@ -22,8 +85,15 @@ class WalletManager:
                         Si no se provee, se busca en PRIVATE_KEY env var
         """
         self.private_key = private_key or os.getenv('PRIVATE_KEY')
-        self.account: Optional[LocalAccount] = None
-        self.web3: Optional[Web3] = None
+        self.account: Optional['LocalAccount'] = None
+        self.web3: Optional['Web3'] = None
+        
+        # Cachés de contratos ERC20: decimals() es inmutable por contrato
+        self._decimals_cache: Dict[str, int] = {}
+        self._contract_cache: Dict[str, 'Contract'] = {}
+        
+        # Última vez (monotonic) que se confirmó conexión RPC; evita probes repetidos
+        self._connected_at: Optional[float] = None
         
         # Polygon mainnet por defecto (Polymarket opera en Polygon)
         self.chain_id = int(os.getenv('CHAIN_ID', '137'))
@@ -31,10 +101,14 @@ class WalletManager:
             'RPC_URL', 
             'https://polygon-rpc.com'
         )
+        self.rpc_timeout = float(os.getenv('RPC_TIMEOUT', '5'))
         
         if self.private_key:
             self._init_account()
             self._init_web3()
+            if self.web3:
+                # Precalentar el contrato USDC (usado en cada validación de trade)
+                self._erc20(USDC_ADDRESS)
         else:
             logger.warning(
                 "⚠️ No private key configurada - modo execute NO disponible"
@@ -42,6 +116,8 @@ class WalletManager:
     
     def _init_account(self):
         """Inicializa la cuenta desde la private key"""
+        from eth_account import Account
+        
         try:
             # Asegurar que la key tiene el prefijo 0x
             if not self.private_key.startswith('0x'):
@@ -58,13 +134,20 @@ class WalletManager:
     
     def _init_web3(self):
         """Inicializa conexión Web3 a Polygon"""
+        from web3 import Web3
+        from web3.middleware import geth_poa_middleware
+        
         try:
-            self.web3 = Web3(Web3.HTTPProvider(self.rpc_url))
+            self.web3 = Web3(Web3.HTTPProvider(
+                self.rpc_url,
+                request_kwargs={'timeout': self.rpc_timeout},
+                session=self._create_rpc_session()
+            ))
             
             # Polygon requiere POA middleware
             self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
             
-            if self.web3.is_connected():
+            if self.is_connected_cached():
                 logger.info(f"✅ Conectado a Polygon (Chain ID: {self.chain_id})")
             else:
                 logger.error("❌ No se pudo conectar a Polygon RPC")
@@ -72,6 +155,47 @@ class WalletManager:
         except Exception as e:
             logger.error(f"❌ Error al conectar a Web3: {e}")
     
+    def is_connected_cached(self, ttl: float = 30.0) -> bool:
+        """is_connected() cacheado: la conexión RPC casi nunca cambia entre llamadas
+        
+        Args:
+            ttl: Segundos durante los que se reutiliza una comprobación exitosa
+        """
+        if not self.web3:
+            return False
+        
+        now = time.monotonic()
+        if self._connected_at is not None and now - self._connected_at < ttl:
+            return True
+        
+        connected = self.web3.is_connected()
+        self._connected_at = now if connected else None
+        return connected
+    
+    def _create_rpc_session(self) -> requests.Session:
+        """Sesión HTTP keep-alive compartida por todas las llamadas RPC"""
+        session = requests.Session()
+        
+        # Retry por defecto no reenvía POSTs tras error de lectura (solo fallos de conexión)
+        retry_strategy = Retry(total=2, backoff_factor=0.1)
+        
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=50, max_retries=retry_strategy)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        
+        return session
+    
+    def _erc20(self, token_address: str) -> 'Contract':
+        """Contrato ERC20 memoizado por dirección"""
+        contract = self._contract_cache.get(token_address)
+        if contract is None:
+            contract = self.web3.eth.contract(
+                address=self.web3.to_checksum_address(token_address),
+                abi=ERC20_ABI
+            )
+            self._contract_cache[token_address] = contract
+        return contract
+    
     @property
     def address(self) -> Optional[str]:
         """Retorna la dirección de la wallet"""
@@ -98,28 +222,13 @@ class WalletManager:
                 return float(balance)
             else:
                 # Balance de token ERC20 (ej: USDC)
-                # ABI mínima para balanceOf
-                erc20_abi = [{
-                    "constant": True,
-                    "inputs": [{"name": "_owner", "type": "address"}],
-                    "name": "balanceOf",
-                    "outputs": [{"name": "balance", "type": "uint256"}],
-                    "type": "function"
-                }, {
-                    "constant": True,
-                    "inputs": [],
-                    "name": "decimals",
-                    "outputs": [{"name": "", "type": "uint8"}],
-                    "type": "function"
-                }]
-                
-                contract = self.web3.eth.contract(
-                    address=self.web3.to_checksum_address(token_address),
-                    abi=erc20_abi
-                )
+                contract = self._erc20(token_address)
                 
                 balance = contract.functions.balanceOf(self.account.address).call()
-                decimals = contract.functions.decimals().call()
+                decimals = self._decimals_cache.get(contract.address)
+                if decimals is None:
+                    decimals = contract.functions.decimals().call()
+                    self._decimals_cache[contract.address] = decimals
                 balance_decimal = balance / (10 ** decimals)
                 
                 logger.debug(f"Balance token {token_address}: {balance_decimal}")
@@ -129,6 +238,68 @@ class WalletManager:
             logger.error(f"Error obteniendo balance: {e}")
             return 0.0
     
+    def get_balances_multicall(self, token_addresses: List[str]) -> Dict[Optional[str], float]:
+        """Obtiene balance nativo y de varios tokens ERC20 en un único eth_call (Multicall3)
+        
+        Args:
+            token_addresses: Direcciones de tokens ERC20
+            
+        Returns:
+            Dict dirección -> balance decimal; la clave None es el balance de MATIC nativo
+        """
+        if not self.web3 or not self.account:
+            return {}
+        
+        from eth_abi import decode as abi_decode, encode as abi_encode
+        
+        try:
+            multicall_address = self.web3.to_checksum_address(MULTICALL3_ADDRESS)
+            owner_arg = abi_encode(['address'], [self.account.address])
+            
+            # (clave, tipo de llamada, target, callData)
+            calls = [(None, 'native', multicall_address, SELECTOR_GET_ETH_BALANCE + owner_arg)]
+            for token_address in token_addresses:
+                checksum_address = self.web3.to_checksum_address(token_address)
+                calls.append((token_address, 'balance', checksum_address,
+                              SELECTOR_BALANCE_OF + owner_arg))
+                if checksum_address not in self._decimals_cache:
+                    calls.append((token_address, 'decimals', checksum_address,
+                                  SELECTOR_DECIMALS))
+            
+            multicall = self.web3.eth.contract(address=multicall_address, abi=MULTICALL3_ABI)
+            results = multicall.functions.aggregate3(
+                [(target, True, call_data) for _, _, target, call_data in calls]
+            ).call()
+            
+            raw_balances: Dict[Optional[str], int] = {}
+            for (key, kind, target, _), (success, return_data) in zip(calls, results):
+                if not success:
+                    raise ValueError(f"Multicall {kind} falló para {key or 'MATIC'}")
+                value = abi_decode(['uint256'], return_data)[0]
+                if kind == 'decimals':
+                    self._decimals_cache[target] = value
+                else:
+                    raw_balances[key] = value
+            
+            balances: Dict[Optional[str], float] = {
+                None: float(self.web3.from_wei(raw_balances.pop(None), 'ether'))
+            }
+            for token_address, raw_balance in raw_balances.items():
+                decimals = self._decimals_cache[self.web3.to_checksum_address(token_address)]
+                balances[token_address] = raw_balance / (10 ** decimals)
+            
+            logger.debug(f"Balances multicall: {balances}")
+            # Un eth_call exitoso ya demuestra que el RPC está conectado
+            self._connected_at = time.monotonic()
+            return balances
+            
+        except Exception as e:
+            logger.warning(f"Multicall no disponible, consultando balances uno a uno: {e}")
+            balances = {None: self.get_balance()}
+            for token_address in token_addresses:
+                balances[token_address] = self.get_balance(token_address)
+            return balances
+    
     def sign_message(self, message: str) -> str:
         """Firma un mensaje con la private key
         
@@ -142,13 +313,8 @@ class WalletManager:
             raise ValueError("No hay cuenta configurada")
         
         try:
-            # Polymarket usa EIP-191 message signing
-            message_hash = Account._hash_eip191_message(
-                Account.messages.encode_defunct(text=message)
-            )
-            signed = self.account.sign_message(
-                Account.messages.encode_defunct(text=message)
-            )
+            # Polymarket usa EIP-191 message signing (sign_message ya calcula el hash)
+            signed = self.account.sign_message(_encode_defunct(message))
             return signed.signature.hex()
             
         except Exception as e:
@@ -190,7 +356,7 @@ class WalletManager:
         
         if not self.web3:
             errors.append("No hay conexión Web3")
-        elif not self.web3.is_connected():
+        elif not self.is_connected_cached():
             errors.append("Web3 no está conectado")
         
         if errors:
@@ -206,17 +372,17 @@ class WalletManager:
         if not self.account:
             return {"status": "not_configured"}
         
-        # Obtener balance de USDC en Polygon
-        usdc_address = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"  # USDC en Polygon
+        # Obtener balances de MATIC y USDC en Polygon
+        balances = self.get_balances_multicall([USDC_ADDRESS])
         
         return {
             "status": "configured",
             "address": self.address,
             "chain_id": self.chain_id,
             "rpc_url": self.rpc_url,
-            "connected": self.web3.is_connected() if self.web3 else False,
-            "matic_balance": self.get_balance(),
-            "usdc_balance": self.get_balance(usdc_address)
+            "connected": self.is_connected_cached(),
+            "matic_balance": balances.get(None, 0.0),
+            "usdc_balance": balances.get(USDC_ADDRESS, 0.0)
         }
 
 
@@ -5,15 +5,105 @@ Autor: juankaspain
 """
 
 import asyncio
+import concurrent.futures
 import websockets
-import json
 import logging
-from typing import Dict, Callable, List, Optional
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from typing import Dict, Callable, List, Optional, Union
 import aiohttp
+import numpy as np
+
+# orjson (C, SIMD) para el parseo por frame; fallback a json estándar
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    from json import loads as json_loads, dumps as json_dumps
+
+# cysimdjson (opcional): lectura perezosa por JSON pointer de los frames de orderbook
+try:
+    import cysimdjson
+    _simdjson_parser = cysimdjson.JSONParser()
+except ImportError:
+    _simdjson_parser = None
+
+# Numba (opcional) compila el kernel de umbrales; sin numba es Python puro
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logger = logging.getLogger(__name__)
 
+# Tipos de detección para detect_event
+EVENT_LARGE_SPREAD = 0
+EVENT_LARGE_TRADE = 1
+EVENT_PRICE_SPIKE = 2
+
+SPREAD_THRESHOLD = 0.05      # Spread relativo al best bid (>5%)
+TRADE_SIZE_THRESHOLD = 500.0 # Trade grande (>$500)
+PRICE_SPIKE_THRESHOLD = 0.03 # Movimiento brusco (>3% en un tick)
+
+
+@njit(cache=True)
+def detect_event(kind, a, b):
+    """Kernel común de umbrales
+    
+    - EVENT_LARGE_SPREAD: a=best_bid, b=best_ask
+    - EVENT_LARGE_TRADE: a=size (b no se usa)
+    - EVENT_PRICE_SPIKE: a=new_price, b=old_price
+    """
+    if kind == EVENT_LARGE_SPREAD:
+        return (b - a) / a > SPREAD_THRESHOLD
+    if kind == EVENT_LARGE_TRADE:
+        return a > TRADE_SIZE_THRESHOLD
+    return abs(a - b) / b > PRICE_SPIKE_THRESHOLD
+
+
+@dataclass(slots=True)
+class MarketEvent:
+    """Evento detectado en un mercado de Polymarket (solo se rellenan los campos de su tipo)"""
+    market_id: str
+    event_type: str  # large_spread | large_trade | price_spike
+    ts_ns: int  # time.monotonic_ns() al detectar: para medir latencia, no es hora de reloj
+    spread: Optional[float] = None
+    best_bid: Optional[float] = None
+    best_ask: Optional[float] = None
+    size: Optional[float] = None
+    price: Optional[float] = None
+    new_price: Optional[float] = None
+    old_price: Optional[float] = None
+    change_pct: Optional[float] = None
+    
+    def to_dict(self) -> Dict:
+        """Dict con los campos presentes (para consumidores que esperan market_data)"""
+        return {
+            name: value
+            for name in self.__slots__
+            if (value := getattr(self, name)) is not None
+        }
+
+
+@dataclass(slots=True)
+class ExternalPriceEvent:
+    """Tick de precio de un exchange externo"""
+    source: str
+    symbol: str
+    price: float
+    old_price: float
+    timestamp_ms: int  # epoch UTC en ms, sellado al recibir (bookTicker spot no trae "T")
+    event_type: str = "external_price"
+    
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class PolymarketWebSocketHandler:
     """
@@ -21,6 +111,10 @@ class PolymarketWebSocketHandler:
     Reduce latencia de 30s (polling) a <500ms (websocket)
     """
     
+    # Frames mayores (snapshots de orderbook) se parsean fuera del event loop;
+    # para frames pequeños el salto al thread cuesta más que el propio parseo
+    OFFLOAD_PARSE_BYTES = 64 * 1024
+    
     def __init__(self, markets: List[str], callback: Callable):
         """
         Args:
@@ -31,62 +125,113 @@ class PolymarketWebSocketHandler:
         self.callback = callback
         self.ws_url = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
         self.session = None
-        self.connections = {}
+        self.websocket = None  # Una sola conexión multiplexada para todos los mercados
         self.running = False
         
+        # Último orderbook por mercado como arrays (precios bid/ask) para
+        # analítica posterior (VWAP, imbalance de profundidad); ver get_orderbook_arrays
+        self.orderbooks: Dict[str, tuple] = {}
+        # Orderbooks aún sin convertir a arrays: frame JSON crudo (cysimdjson)
+        # o (bids, asks) ya parseados
+        self._raw_orderbooks: Dict[str, Union[str, tuple]] = {}
+        
+        self._parse_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        
     async def connect(self):
         """Conecta a WebSocket de Polymarket para mercados especificados"""
         self.running = True
-        self.session = aiohttp.ClientSession()
+        
+        # Una sola sesión (pool TCP/TLS + caché DNS) para todos los mercados;
+        # se reutiliza en las reconexiones
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=50,
+                    ttl_dns_cache=300
+                )
+            )
+        
+        # Pool para parsear frames grandes sin bloquear el event loop
+        if self._parse_pool is None:
+            self._parse_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=4,
+                thread_name_prefix='ws-parse'
+            )
         
         logger.info(f"🔌 Conectando WebSocket para {len(self.markets)} mercados...")
         
-        tasks = [self._connect_market(market_id) for market_id in self.markets]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._connect_markets()
         
-    async def _connect_market(self, market_id: str):
-        """Conexión individual por mercado"""
-        try:
-            async with websockets.connect(
-                f"{self.ws_url}/{market_id}",
-                ping_interval=20,
-                ping_timeout=10
-            ) as websocket:
-                
-                self.connections[market_id] = websocket
-                logger.info(f"✅ WebSocket conectado: {market_id}")
-                
-                # Suscribirse a actualizaciones de orderbook
-                subscribe_msg = {
-                    "type": "subscribe",
-                    "market": market_id,
-                    "assets": ["orderbook", "trades", "price"]
-                }
-                await websocket.send(json.dumps(subscribe_msg))
-                
-                # Loop de recepción de mensajes
-                while self.running:
-                    try:
-                        message = await asyncio.wait_for(
-                            websocket.recv(),
-                            timeout=30.0
-                        )
-                        
-                        data = json.loads(message)
-                        await self._handle_message(market_id, data)
-                        
-                    except asyncio.TimeoutError:
-                        # Enviar ping manual si no hay actividad
-                        await websocket.ping()
+    async def _connect_markets(self):
+        """Conexión única con suscripción a todos los mercados (reconecta con backoff exponencial)"""
+        # Una sola suscripción en bloque: los mensajes se despachan por data["market"]
+        subscribe_msg = json_dumps({
+            "type": "subscribe",
+            "markets": self.markets,
+            "assets": ["orderbook", "trades", "price"]
+        })
+        
+        backoff = 1.0
+        while self.running:
+            try:
+                async with self.session.ws_connect(
+                    self.ws_url,
+                    heartbeat=20
+                ) as websocket:
+                    
+                    self.websocket = websocket
+                    logger.info(f"✅ WebSocket conectado: {len(self.markets)} mercados")
+                    
+                    await websocket.send_str(subscribe_msg)
+                    loop = asyncio.get_running_loop()
+                    backoff = 1.0
+                    
+                    # Loop de recepción de mensajes (heartbeat de aiohttp gestiona los pings)
+                    while self.running:
+                        msg = await websocket.receive()
                         
-        except websockets.exceptions.ConnectionClosed:
-            logger.warning(f"⚠️ Conexión cerrada para {market_id}, reconectando...")
-            if self.running:
-                await asyncio.sleep(2)
-                await self._connect_market(market_id)
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            if _simdjson_parser is not None and await self._handle_orderbook_lazy(msg.data):
+                                continue
+                            try:
+                                if len(msg.data) > self.OFFLOAD_PARSE_BYTES:
+                                    data = await loop.run_in_executor(
+                                        self._parse_pool, json_loads, msg.data
+                                    )
+                                else:
+                                    data = json_loads(msg.data)
+                            except ValueError as e:
+                                # Un frame corrupto no debe tumbar la conexión compartida
+                                logger.warning(f"⚠️ Frame JSON inválido descartado: {e}")
+                                continue
+                            for event in (data if isinstance(data, list) else (data,)):
+                                if not isinstance(event, dict):
+                                    logger.warning(f"⚠️ Evento no-objeto descartado: {event!r:.80}")
+                                    continue
+                                await self._handle_message(event.get("market"), event)
+                        elif msg.type in (
+                            aiohttp.WSMsgType.CLOSE,
+                            aiohttp.WSMsgType.CLOSING,
+                            aiohttp.WSMsgType.CLOSED,
+                            aiohttp.WSMsgType.ERROR
+                        ):
+                            raise ConnectionResetError(f"WebSocket cerrado ({msg.type.name})")
+                            
+            except (aiohttp.ClientError, ConnectionResetError):
+                if not self.running:
+                    break
+                logger.warning(f"⚠️ Conexión cerrada, reconectando en {backoff:.0f}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
                 
-        except Exception as e:
-            logger.error(f"❌ Error en WebSocket {market_id}: {e}")
+            except Exception as e:
+                # Todos los mercados comparten socket: reconectar en vez de abandonar
+                if not self.running:
+                    break
+                logger.error(f"❌ Error en WebSocket: {e}, reconectando en {backoff:.0f}s...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
             
     async def _handle_message(self, market_id: str, data: Dict):
         """Procesa mensaje recibido del WebSocket"""
@@ -108,27 +253,70 @@ class PolymarketWebSocketHandler:
         except Exception as e:
             logger.error(f"Error procesando mensaje {market_id}: {e}")
             
+    async def _handle_orderbook_lazy(self, raw: str) -> bool:
+        """Lee solo type/market/mejor bid/mejor ask de un frame de orderbook (cysimdjson)
+        
+        Returns:
+            True si el frame se procesó; False para usar el parseo completo
+        """
+        try:
+            doc = _simdjson_parser.parse(raw.encode())
+            if doc.at_pointer("/type") != "orderbook_update":
+                return False
+            market_id = doc.at_pointer("/market")
+            best_bid = float(doc.at_pointer("/bids/0/price"))
+            best_ask = float(doc.at_pointer("/asks/0/price"))
+        except Exception:
+            return False  # Frame en array, sin niveles o no-objeto: parseo completo
+        
+        # Los niveles completos se convierten solo si alguien los pide
+        self._raw_orderbooks[market_id] = raw
+        try:
+            await self._check_spread(market_id, best_bid, best_ask)
+        except Exception as e:
+            # Mismo guard que _handle_message: un callback roto no corta el stream
+            logger.error(f"Error procesando mensaje {market_id}: {e}")
+        return True
+    
+    def get_orderbook_arrays(self, market_id: str) -> Optional[tuple]:
+        """Último orderbook del mercado como (bid_prices, ask_prices) en numpy"""
+        raw = self._raw_orderbooks.pop(market_id, None)
+        if isinstance(raw, str):
+            data = json_loads(raw)
+            raw = (data.get("bids", []), data.get("asks", []))
+        if raw is not None:
+            self.orderbooks[market_id] = self._orderbook_arrays(*raw)
+        return self.orderbooks.get(market_id)
+    
+    @staticmethod
+    def _orderbook_arrays(bids: List[Dict], asks: List[Dict]) -> tuple:
+        """Convierte los niveles de precio a arrays float64"""
+        bid_prices = np.fromiter(
+            (float(b["price"]) for b in bids), dtype=np.float64, count=len(bids)
+        )
+        ask_prices = np.fromiter(
+            (float(a["price"]) for a in asks), dtype=np.float64, count=len(asks)
+        )
+        return bid_prices, ask_prices
+    
     async def _process_orderbook(self, market_id: str, data: Dict):
         """Procesa actualización de orderbook"""
         bids = data.get("bids", [])
         asks = data.get("asks", [])
         
         if bids and asks:
-            best_bid = float(bids[0]["price"])
-            best_ask = float(asks[0]["price"])
-            spread = best_ask - best_bid
-            
-            # Gap significativo en el spread (>5%)
-            if spread / best_bid > 0.05:
-                event_data = {
-                    "market_id": market_id,
-                    "event_type": "large_spread",
-                    "spread": spread,
-                    "best_bid": best_bid,
-                    "best_ask": best_ask,
-                    "timestamp": datetime.now()
-                }
-                await self.callback(event_data)
+            # Solo el mejor nivel; los arrays se construyen si alguien los pide
+            self._raw_orderbooks[market_id] = (bids, asks)
+            await self._check_spread(market_id, float(bids[0]["price"]), float(asks[0]["price"]))
+    
+    async def _check_spread(self, market_id: str, best_bid: float, best_ask: float):
+        """Emite large_spread si el spread supera el umbral"""
+        # Gap significativo en el spread (>5%)
+        if detect_event(EVENT_LARGE_SPREAD, best_bid, best_ask):
+            await self.callback(MarketEvent(
+                market_id, "large_spread", time.monotonic_ns(),
+                spread=best_ask - best_bid, best_bid=best_bid, best_ask=best_ask
+            ))
                 
     async def _process_trade(self, market_id: str, data: Dict):
         """Procesa trade ejecutado"""
@@ -136,47 +324,43 @@ class PolymarketWebSocketHandler:
         price = float(data.get("price", 0))
         
         # Trade grande (>$500)
-        if size > 500:
-            event_data = {
-                "market_id": market_id,
-                "event_type": "large_trade",
-                "size": size,
-                "price": price,
-                "timestamp": datetime.now()
-            }
-            await self.callback(event_data)
+        if detect_event(EVENT_LARGE_TRADE, size, 0.0):
+            await self.callback(MarketEvent(
+                market_id, "large_trade", time.monotonic_ns(),
+                size=size, price=price
+            ))
             
     async def _process_price(self, market_id: str, data: Dict):
         """Procesa actualización de precio"""
         new_price = float(data.get("price", 0))
         old_price = float(data.get("prev_price", new_price))
-        
-        price_change = abs(new_price - old_price) / old_price
+        if new_price == old_price:
+            return
         
         # Movimiento brusco (>3% en un tick)
-        if price_change > 0.03:
-            event_data = {
-                "market_id": market_id,
-                "event_type": "price_spike",
-                "new_price": new_price,
-                "old_price": old_price,
-                "change_pct": price_change * 100,
-                "timestamp": datetime.now()
-            }
-            await self.callback(event_data)
+        if detect_event(EVENT_PRICE_SPIKE, new_price, old_price):
+            await self.callback(MarketEvent(
+                market_id, "price_spike", time.monotonic_ns(),
+                new_price=new_price, old_price=old_price,
+                change_pct=abs(new_price - old_price) / old_price * 100
+            ))
             
     async def disconnect(self):
         """Cierra todas las conexiones WebSocket"""
         self.running = False
-        for market_id, ws in self.connections.items():
+        if self.websocket:
             try:
-                await ws.close()
-                logger.info(f"🔌 Desconectado: {market_id}")
+                await self.websocket.close()
+                logger.info("🔌 Desconectado")
             except:
                 pass
                 
         if self.session:
             await self.session.close()
+        
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=False)
+            self._parse_pool = None
 
 
 class ExternalPriceFeeder:
@@ -188,7 +372,7 @@ class ExternalPriceFeeder:
     def __init__(self, symbols: List[str], callback: Callable):
         self.symbols = symbols  # ["BTCUSDT", "ETHUSDT"]
         self.callback = callback
-        self.binance_ws = "wss://stream.binance.com:9443/ws"
+        self.binance_ws = "wss://stream.binance.com:9443/stream"  # Combined streams
         self.running = False
         self.prices = {}
         
@@ -196,10 +380,11 @@ class ExternalPriceFeeder:
         """Conecta a Binance WebSocket"""
         self.running = True
         
-        # Preparar streams
-        streams = [f"{symbol.lower()}@trade" for symbol in self.symbols]
+        # Preparar streams: bookTicker (solo best bid/ask, un mensaje por cambio de
+        # cotización) en lugar de @trade (cada trade, 10-50/s por símbolo)
+        streams = [f"{symbol.lower()}@bookTicker" for symbol in self.symbols]
         stream_param = "/".join(streams)
-        ws_url = f"{self.binance_ws}/{stream_param}"
+        ws_url = f"{self.binance_ws}?streams={stream_param}"
         
         logger.info(f"🔌 Conectando a Binance WebSocket...")
         
@@ -209,8 +394,9 @@ class ExternalPriceFeeder:
                 
                 while self.running:
                     message = await websocket.recv()
-                    data = json.loads(message)
-                    await self._handle_binance_message(data)
+                    # Combined stream: {"stream": "btcusdt@bookTicker", "data": {...}}
+                    data = json_loads(message)
+                    await self._handle_binance_message(data.get("data", data))
                     
         except Exception as e:
             logger.error(f"❌ Error en Binance WebSocket: {e}")
@@ -221,21 +407,22 @@ class ExternalPriceFeeder:
     async def _handle_binance_message(self, data: Dict):
         """Procesa mensaje de Binance"""
         symbol = data.get("s")  # BTCUSDT
-        price = float(data.get("p", 0))
-        timestamp = data.get("T")
         
-        old_price = self.prices.get(symbol, price)
+        # bookTicker: precio medio entre best bid ("b") y best ask ("a")
+        price = (float(data.get("b", 0)) + float(data.get("a", 0))) / 2
+        
+        old_price = self.prices.get(symbol)
+        if price == old_price:
+            return  # Cotización sin cambios: no despertar al consumidor
+        if old_price is None:
+            old_price = price
         self.prices[symbol] = price
         
-        # Notificar cambio de precio externo
-        event_data = {
-            "source": "binance",
-            "symbol": symbol,
-            "price": price,
-            "old_price": old_price,
-            "timestamp": datetime.fromtimestamp(timestamp / 1000)
-        }
-        await self.callback(event_data)
+        # Notificar cambio de precio externo (timestamp local en ms epoch: el
+        # bookTicker spot no incluye "T"; el consumidor lo convierte si lo necesita)
+        await self.callback(ExternalPriceEvent(
+            "binance", symbol, price, old_price, time.time_ns() // 1_000_000
+        ))
         
     async def disconnect(self):
         """Cierra conexión"""
@@ -14,13 +14,27 @@ Version: 7.0 - Advanced Dashboard
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+import altair as alt
 from datetime import datetime, timedelta
 import json
 import os
 from pathlib import Path
 import time
+from collections import deque
+
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:  # Fallback: sleep + rerun
+    st_autorefresh = None
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 # Page config
 st.set_page_config(
@@ -50,32 +64,61 @@ st.markdown("""
 
 # Data paths
 DATA_DIR = Path("data")
-TRADES_FILE = DATA_DIR / "trades.json"
+TRADES_FILE = DATA_DIR / "trades.json"     # Legacy: monolithic {"trades": [...]}
+TRADES_LOG = DATA_DIR / "trades.jsonl"     # Append-only, one trade per line
 PERFORMANCE_FILE = DATA_DIR / "performance.json"
 POSITIONS_FILE = DATA_DIR / "positions.json"
 
+def _file_mtime(file_path):
+    """File mtime (0 if missing); part of the cache keys"""
+    try:
+        return file_path.stat().st_mtime
+    except OSError:
+        return 0
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_json(path_str, mtime):
+    """Parse JSON file; cached until the file's mtime changes"""
+    with open(path_str, 'rb') as f:
+        return json_loads(f.read())
+
 def load_data(file_path, default=None):
     """Load JSON data from file"""
     try:
-        if file_path.exists():
-            with open(file_path, 'r') as f:
-                return json.load(f)
+        mtime = _file_mtime(file_path)
+        if mtime:
+            return _load_json(str(file_path), mtime)
     except Exception as e:
         st.error(f"Error loading {file_path.name}: {e}")
     return default or {}
 
-def get_recent_trades(limit=50):
-    """Get recent trades"""
-    trades_data = load_data(TRADES_FILE, {"trades": []})
-    trades = trades_data.get("trades", [])[-limit:]
+def _tail_jsonl(path_str, limit):
+    """Read only the last `limit` trades of the JSONL log"""
+    with open(path_str, 'rb') as f:
+        lines = deque(f, maxlen=limit)
+    return [json_loads(line) for line in lines if line.strip()]
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _build_trades_df(path_str, mtime, limit):
+    """Build the trades DataFrame; cached until the trade log changes"""
+    path = Path(path_str)
+    if path.suffix == '.jsonl':
+        trades = _tail_jsonl(path_str, limit)
+    else:
+        trades = load_data(path, {"trades": []}).get("trades", [])[-limit:]
     
     if not trades:
         return pd.DataFrame()
     
     df = pd.DataFrame(trades)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, cache=True, format='ISO8601')
     return df
 
+def get_recent_trades(limit=50):
+    """Get recent trades (JSONL log if present, else legacy trades.json)"""
+    trades_path = TRADES_LOG if TRADES_LOG.exists() else TRADES_FILE
+    return _build_trades_df(str(trades_path), _file_mtime(trades_path), limit)
+
 def get_performance_metrics():
     """Get performance metrics"""
     perf_data = load_data(PERFORMANCE_FILE)
@@ -106,44 +149,47 @@ def get_active_positions():
     
     return pd.DataFrame(positions)
 
-def create_pnl_chart(trades_df):
-    """Create cumulative P&L chart"""
-    if trades_df.empty:
-        return go.Figure()
-    
-    trades_df = trades_df.sort_values('timestamp')
-    trades_df['cumulative_pnl'] = trades_df['pnl'].cumsum()
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=trades_df['timestamp'],
-        y=trades_df['cumulative_pnl'],
-        mode='lines',
-        name='Cumulative P&L',
-        line=dict(color='#667eea', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(102, 126, 234, 0.2)'
-    ))
-    
-    fig.update_layout(
-        title='Cumulative Profit & Loss',
-        xaxis_title='Time',
-        yaxis_title='P&L ($)',
-        template='plotly_white',
-        height=400,
-        hovermode='x unified'
-    )
-    
-    return fig
+@st.cache_data(max_entries=8, show_spinner=False)
+def compute_trade_reductions(n_trades, last_timestamp, _trades_df):
+    """Sort/cumsum/groupby/resample the trades once per data change
+    
+    Cached on (trade count, last timestamp); the DataFrame itself is not hashed.
+    """
+    sorted_df = _trades_df.sort_values('timestamp')
+    return {
+        "timestamps": sorted_df['timestamp'],
+        "cumulative_pnl": sorted_df['pnl'].cumsum().to_numpy(),
+        "strategy_pnl": _trades_df.groupby('strategy')['pnl'].sum().sort_values(ascending=True),
+        "daily_pnl": sorted_df.set_index('timestamp').resample('D')['pnl'].sum(),
+        "wins": int((_trades_df['pnl'] > 0).sum()),
+        "losses": int((_trades_df['pnl'] <= 0).sum())
+    }
+
+def create_pnl_chart(timestamps, cumulative_pnl):
+    """Create cumulative P&L chart
+    
+    Altair/Vega-Lite instead of Plotly: much smaller spec per refresh for a
+    series that grows with the trade count.
+    """
+    pnl_df = pd.DataFrame({'timestamp': timestamps, 'cumulative_pnl': cumulative_pnl})
+    
+    return alt.Chart(pnl_df, title='Cumulative Profit & Loss').mark_area(
+        line={'color': '#667eea', 'strokeWidth': 2},
+        color='rgba(102, 126, 234, 0.2)'
+    ).encode(
+        x=alt.X('timestamp:T', title='Time'),
+        y=alt.Y('cumulative_pnl:Q', title='P&L ($)'),
+        tooltip=[
+            alt.Tooltip('timestamp:T', title='Time'),
+            alt.Tooltip('cumulative_pnl:Q', title='P&L ($)', format='$,.2f')
+        ]
+    ).properties(height=400)
 
-def create_strategy_performance_chart(trades_df):
+def create_strategy_performance_chart(strategy_pnl):
     """Create strategy performance comparison"""
-    if trades_df.empty:
+    if strategy_pnl.empty:
         return go.Figure()
     
-    strategy_pnl = trades_df.groupby('strategy')['pnl'].sum().sort_values(ascending=True)
-    
     fig = go.Figure(go.Bar(
         x=strategy_pnl.values,
         y=strategy_pnl.index,
@@ -165,14 +211,11 @@ def create_strategy_performance_chart(trades_df):
     
     return fig
 
-def create_win_rate_pie(trades_df):
+def create_win_rate_pie(wins, losses):
     """Create win rate pie chart"""
-    if trades_df.empty:
+    if wins + losses == 0:
         return go.Figure()
     
-    wins = (trades_df['pnl'] > 0).sum()
-    losses = (trades_df['pnl'] <= 0).sum()
-    
     fig = go.Figure(data=[go.Pie(
         labels=['Wins', 'Losses'],
         values=[wins, losses],
@@ -195,6 +238,9 @@ def main():
     st.title("🤖 BotPolyMarket Advanced Dashboard")
     st.markdown("Real-time trading metrics and performance analysis")
     
+    # Load trades once per render; sidebar and views use slices of it
+    all_trades_df = get_recent_trades(10_000)
+    
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Settings")
@@ -214,9 +260,8 @@ def main():
         
         # Strategy filter
         st.subheader("Filters")
-        trades_df = get_recent_trades(1000)
-        if not trades_df.empty:
-            strategies = ["All"] + list(trades_df['strategy'].unique())
+        if not all_trades_df.empty:
+            strategies = ["All"] + list(all_trades_df['strategy'].unique())
             selected_strategy = st.multiselect("Strategies", strategies, default=["All"])
         
         st.markdown("---")
@@ -227,9 +272,24 @@ def main():
     
     # Load data
     metrics = get_performance_metrics()
-    trades_df = get_recent_trades()
+    trades_df = all_trades_df.tail(50)
     positions_df = get_active_positions()
     
+    # Chart reductions computed once and shared by every chart below
+    if not trades_df.empty:
+        reductions = compute_trade_reductions(
+            len(trades_df), trades_df['timestamp'].iloc[-1], trades_df
+        )
+    else:
+        reductions = {
+            "timestamps": [],
+            "cumulative_pnl": [],
+            "strategy_pnl": pd.Series(dtype=float),
+            "daily_pnl": pd.Series(dtype=float),
+            "wins": 0,
+            "losses": 0
+        }
+    
     # Key Metrics Row
     st.header("📊 Key Metrics")
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -275,10 +335,16 @@ def main():
     col1, col2 = st.columns(2)
     
     with col1:
-        st.plotly_chart(create_pnl_chart(trades_df), use_container_width=True)
+        st.altair_chart(
+            create_pnl_chart(reductions["timestamps"], reductions["cumulative_pnl"]),
+            use_container_width=True
+        )
     
     with col2:
-        st.plotly_chart(create_strategy_performance_chart(trades_df), use_container_width=True)
+        st.plotly_chart(
+            create_strategy_performance_chart(reductions["strategy_pnl"]),
+            use_container_width=True
+        )
     
     # Second Charts Row
     col1, col2, col3 = st.columns([2, 1, 1])
@@ -287,13 +353,16 @@ def main():
         st.subheader("📈 Performance Timeline")
         if not trades_df.empty:
             # Daily P&L chart
-            daily_pnl = trades_df.set_index('timestamp').resample('D')['pnl'].sum()
+            daily_pnl = reductions["daily_pnl"]
             fig = px.bar(daily_pnl, title="Daily P&L")
             fig.update_traces(marker_color=['#00d084' if x > 0 else '#ff4757' for x in daily_pnl])
             st.plotly_chart(fig, use_container_width=True)
     
     with col2:
-        st.plotly_chart(create_win_rate_pie(trades_df), use_container_width=True)
+        st.plotly_chart(
+            create_win_rate_pie(reductions["wins"], reductions["losses"]),
+            use_container_width=True
+        )
     
     with col3:
         st.subheader("⚠️ Risk Metrics")
@@ -327,16 +396,25 @@ def main():
     if not trades_df.empty:
         # Format trades for display
         display_trades = trades_df.tail(20).copy()
+        is_win = (display_trades['pnl'] >= 0).to_numpy()
         display_trades['timestamp'] = display_trades['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
         display_trades['pnl'] = display_trades['pnl'].apply(lambda x: f"${x:+,.2f}")
         display_trades['size'] = display_trades['size'].apply(lambda x: f"${x:,.2f}")
         
-        # Color code by profit/loss
-        def highlight_pnl(row):
-            color = '#d4edda' if '+' in str(row['pnl']) else '#f8d7da'
-            return [f'background-color: {color}'] * len(row)
+        # Color code by profit/loss (one mask for the whole table)
+        def highlight_pnl(df):
+            styles = np.where(
+                is_win[:, None],
+                'background-color: #d4edda',
+                'background-color: #f8d7da'
+            )
+            return pd.DataFrame(
+                np.broadcast_to(styles, df.shape),
+                index=df.index,
+                columns=df.columns
+            )
         
-        styled_df = display_trades.style.apply(highlight_pnl, axis=1)
+        styled_df = display_trades.style.apply(highlight_pnl, axis=None)
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
     else:
         st.info("No trades recorded yet")
@@ -356,10 +434,13 @@ def main():
     with col4:
         st.metric("Memory Usage", "34%")
     
-    # Auto-refresh
+    # Auto-refresh (browser-side timer, does not block the script thread)
     if auto_refresh:
-        time.sleep(refresh_rate)
-        st.rerun()
+        if st_autorefresh is not None:
+            st_autorefresh(interval=refresh_rate * 1000, key="auto_refresh")
+        else:
+            time.sleep(refresh_rate)
+            st.rerun()
 
 if __name__ == "__main__":
     main()
@@ -6,16 +6,39 @@ Dashboard profesional con métricas en tiempo real
 
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
+import numpy as np
 from datetime import datetime, timedelta
 import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import io
+import functools
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ROOT in sys.path or sys.path.append(_ROOT)
 
-from core.database import Database
-from core.portfolio_manager import PortfolioManager
-from core.risk_manager import RiskManager
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:  # Fallback: sleep + rerun
+    st_autorefresh = None
+
+# st.fragment (>=1.37) / st.experimental_fragment (>=1.33): reruns parciales
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+AUTO_REFRESH_KEY = "auto_refresh"
+
+def _every(seconds: int):
+    """Fragmento que se refresca solo cada `seconds` mientras el auto-refresh esté
+    activo (run_every=None si no); sin soporte, función normal"""
+    def decorator(fn):
+        if _fragment is None:
+            return fn
+        
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # Se lee en cada rerun completo: desmarcar el checkbox para también los fragmentos
+            run_every = seconds if st.session_state.get(AUTO_REFRESH_KEY, True) else None
+            return _fragment(fn, run_every=run_every)(*args, **kwargs)
+        return wrapper
+    return decorator
 
 # Configuración de página
 st.set_page_config(
@@ -38,6 +61,21 @@ st.markdown("""
     .negative {
         color: #ff0000;
     }
+    .metric-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+        gap: 15px;
+        margin-bottom: 1rem;
+    }
+    .metric-card {
+        background-color: #1e1e1e;
+        padding: 15px;
+        border-radius: 10px;
+    }
+    .metric-label {
+        font-size: 0.9rem;
+        opacity: 0.7;
+    }
     .stMetric {
         background-color: #1e1e1e;
         padding: 15px;
@@ -46,14 +84,172 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def _bootstrap():
+    """Importa Database de core una sola vez por proceso"""
+    from core.database import Database
+    return Database
+
+@st.cache_resource
+def get_db():
+    """Database compartida entre reruns y sesiones (una sola conexión/pool)"""
+    return _bootstrap()()
+
+# Datos cacheados 30s (un ciclo de auto-refresh). La clave son solo args primitivos.
+INITIAL_CAPITAL = float(os.getenv('INITIAL_CAPITAL', '1000'))
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _dashboard_snapshot(initial_capital: float) -> dict:
+    """Portfolio, riesgo y posiciones abiertas en una sola ida a la DB"""
+    return get_db().get_dashboard_snapshot(initial_capital)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _pnl_history(days: int) -> pd.DataFrame:
+    """Obtiene historial de PnL"""
+    rows = get_db().get_pnl_history(days)
+    if rows:
+        # Rollup pnl_daily: una fila por día, sin recorrer los trades
+        return pd.DataFrame(rows, columns=['date', 'daily_pnl', 'cumulative_pnl'])
+    
+    # Datos de ejemplo mientras no haya trades cerrados
+    dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
+    i = np.arange(days, dtype=np.int32)
+    daily = 50 + i*10 + (i % 5 - 2)*30
+    return pd.DataFrame({
+        'date': dates,
+        'daily_pnl': daily,
+        'cumulative_pnl': np.cumsum(daily)
+    })
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _pnl_fig_json(days: int) -> str:
+    """Figura de PnL acumulado ya serializada; los reruns no repiten el encode"""
+    # plotly solo se importa si se llega a pintar el gráfico
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    try:
+        from plotly_resampler import FigureResampler
+    except ImportError:  # Opcional: downsampling LTTB de series largas
+        FigureResampler = None
+    
+    pnl_data = _pnl_history(days)
+    
+    # Línea de PnL acumulado (WebGL)
+    trace = go.Scattergl(
+        mode='lines',
+        name='Cumulative PnL',
+        line=dict(color='#00ff00', width=3),
+        fill='tozeroy'
+    )
+    
+    if FigureResampler is not None:
+        # LTTB: como mucho 1000 puntos viajan al navegador
+        fig = FigureResampler(go.Figure(), default_n_shown_samples=1000)
+        fig.add_trace(trace, hf_x=pnl_data['date'], hf_y=pnl_data['cumulative_pnl'])
+    else:
+        fig = go.Figure()
+        trace.x = pnl_data['date']
+        trace.y = pnl_data['cumulative_pnl']
+        fig.add_trace(trace)
+    
+    fig.update_layout(
+        title=f"{days}-Day Cumulative PnL",
+        xaxis_title="Date",
+        yaxis_title="PnL (€)",
+        template="plotly_dark",
+        height=400
+    )
+    
+    return pio.to_json(fig)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _recent_trades(limit: int) -> pd.DataFrame:
+    """Obtiene trades recientes"""
+    # Datos de ejemplo, construidos por columnas
+    i = np.arange(limit)
+    return _compact(pd.DataFrame({
+        'timestamp': pd.Timestamp.now() - pd.to_timedelta(i, unit='h'),
+        'market': [f'Market_{x}' for x in i],
+        'strategy': np.array(['Gap', 'Arbitrage', 'ML'])[i % 3],
+        'side': np.where(i % 2, 'YES', 'NO'),
+        'size': 100 + i*10,
+        'entry': 0.45 + (i % 10) * 0.01,
+        'exit': 0.55 + (i % 10) * 0.01,
+        'pnl': 10 - i % 20,
+        'outcome': np.array(['WIN', 'LOSS', 'OPEN'])[i % 3]
+    }))
+
+OUTCOMES = ['WIN', 'LOSS', 'OPEN']
+
+# Dtypes compactos: Arrow envía las categorías codificadas como diccionario
+COMPACT_DTYPES = {
+    'strategy': 'category',
+    'outcome': 'category',
+    'side': 'category',
+    'size': 'float32',
+    'pnl': 'float32',
+    'entry': 'float32',
+    'exit': 'float32',
+    'entry_price': 'float32',
+    'current_price': 'float32',
+}
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica COMPACT_DTYPES a las columnas presentes"""
+    return df.astype({col: dtype for col, dtype in COMPACT_DTYPES.items() if col in df.columns})
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _filter_trades(limit: int, strategies: tuple, outcomes: tuple) -> pd.DataFrame:
+    """Trades recientes filtrados, cacheados por la combinación de filtros"""
+    df = _recent_trades(limit)
+    mask = np.isin(df['strategy'].values, strategies) & np.isin(df['outcome'].values, outcomes)
+    return df.iloc[mask]
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _df_to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV para exportación, cacheado por el contenido del DataFrame"""
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+def _metric_cards(cards: list) -> str:
+    """HTML de una rejilla de tarjetas (label, value, delta, css_class) en un solo bloque"""
+    html = ['<div class="metric-grid">']
+    for label, value, delta, css_class in cards:
+        html.append(
+            f'<div class="metric-card"><div class="metric-label">{label}</div>'
+            f'<div class="big-metric">{value}</div>'
+            f'<div class="{css_class}">{delta}</div></div>'
+        )
+    html.append('</div>')
+    return ''.join(html)
+
+def _bar(pct: float) -> str:
+    """Barra de progreso HTML; mismo valor = mismo HTML, sin re-render en el frontend"""
+    pct = max(0.0, min(pct, 1.0)) * 100
+    return (
+        '<div style="background:#333;border-radius:4px">'
+        f'<div style="width:{pct:.1f}%;background:#0f0;height:8px;border-radius:4px"></div></div>'
+    )
+
+def _sign_class(value: float) -> str:
+    return "positive" if value >= 0 else "negative"
+
+# Formato de la tabla de posiciones (se aplica en el frontend)
+POSITION_COLUMNS = {
+    'entry_price': st.column_config.NumberColumn(format="€%.4f"),
+    'current_price': st.column_config.NumberColumn(format="€%.4f"),
+    'pnl': st.column_config.NumberColumn(format="€%+.2f"),
+    'size': st.column_config.NumberColumn(format="€%.2f"),
+}
+
 class DashboardApp:
     """Aplicación principal del dashboard"""
     
     def __init__(self):
-        self.db = Database()
-        self.portfolio = PortfolioManager()
-        self.risk_manager = RiskManager()
+        self.db = get_db()
         
+    @_every(30)
     def render_header(self):
         """Renderiza header del dashboard"""
         col1, col2, col3 = st.columns([2, 1, 1])
@@ -74,129 +270,95 @@ class DashboardApp:
                 datetime.now().strftime("%H:%M:%S")
             )
     
-    def render_portfolio_overview(self):
+    @_every(30)
+    def render_overview(self):
+        """Overview + riesgo como fragmento: los widgets de otras pestañas no lo re-renderizan"""
+        snap = _dashboard_snapshot(INITIAL_CAPITAL)
+        self.render_portfolio_overview(snap['portfolio'])
+        self.render_risk_metrics(snap['risk'])
+    
+    def render_portfolio_overview(self, portfolio_data: dict):
         """Panel de overview del portfolio"""
         st.header("💼 Portfolio Overview")
         
-        # Obtener datos del portfolio
-        portfolio_data = self.portfolio.get_current_state()
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric(
-                "Total Capital",
-                f"€{portfolio_data['total_value']:,.2f}",
-                f"{portfolio_data['daily_change']:+.2f}%"
-            )
-        
-        with col2:
-            st.metric(
-                "Available Cash",
-                f"€{portfolio_data['cash']:,.2f}",
-                f"{portfolio_data['cash_pct']:.1f}%"
-            )
-        
-        with col3:
-            st.metric(
-                "Total PnL",
-                f"€{portfolio_data['total_pnl']:,.2f}",
-                f"{portfolio_data['roi']:.2f}%"
-            )
-        
-        with col4:
-            st.metric(
-                "Active Positions",
-                portfolio_data['active_positions'],
-                f"€{portfolio_data['exposure']:,.2f}"
-            )
+        # Las cuatro tarjetas en un único mensaje al frontend
+        st.markdown(_metric_cards([
+            ("Total Capital",
+             f"€{portfolio_data['total_value']:,.2f}",
+             f"{portfolio_data['daily_change']:+.2f}%",
+             _sign_class(portfolio_data['daily_change'])),
+            ("Available Cash",
+             f"€{portfolio_data['cash']:,.2f}",
+             f"{portfolio_data['cash_pct']:.1f}%",
+             "metric-label"),
+            ("Total PnL",
+             f"€{portfolio_data['total_pnl']:,.2f}",
+             f"{portfolio_data['roi']:.2f}%",
+             _sign_class(portfolio_data['total_pnl'])),
+            ("Active Positions",
+             portfolio_data['active_positions'],
+             f"€{portfolio_data['exposure']:,.2f}",
+             "metric-label"),
+        ]), unsafe_allow_html=True)
     
     def render_pnl_chart(self):
         """Gráfico de PnL histórico"""
         st.header("📈 Profit & Loss")
         
-        # Obtener datos históricos
-        pnl_data = self._get_pnl_history(days=30)
-        
-        fig = go.Figure()
-        
-        # Línea de PnL acumulado
-        fig.add_trace(go.Scatter(
-            x=pnl_data['date'],
-            y=pnl_data['cumulative_pnl'],
-            mode='lines',
-            name='Cumulative PnL',
-            line=dict(color='#00ff00', width=3),
-            fill='tozeroy'
-        ))
-        
-        fig.update_layout(
-            title="30-Day Cumulative PnL",
-            xaxis_title="Date",
-            yaxis_title="PnL (€)",
-            template="plotly_dark",
-            height=400
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        import plotly.io as pio
+        st.plotly_chart(pio.from_json(_pnl_fig_json(days=30)), use_container_width=True)
     
-    def render_risk_metrics(self):
+    def render_risk_metrics(self, risk_data: dict):
         """Panel de métricas de riesgo"""
         st.header("⚠️ Risk Metrics")
         
-        risk_data = self.risk_manager.calculate_metrics()
+        sharpe = risk_data['sharpe_ratio']
+        drawdown = risk_data['max_drawdown']
+        win_rate = risk_data['win_rate']
+        
+        st.markdown(_metric_cards([
+            ("Sharpe Ratio", f"{sharpe:.2f}",
+             "Excellent" if sharpe > 2 else "Good" if sharpe > 1 else "Moderate",
+             _sign_class(sharpe)),
+            ("Max Drawdown", f"{drawdown:.2%}", "", "negative"),
+            ("Win Rate", f"{win_rate:.1%}", "", "metric-label"),
+        ]), unsafe_allow_html=True)
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.subheader("Sharpe Ratio")
-            sharpe = risk_data['sharpe_ratio']
-            st.metric("", f"{sharpe:.2f}", "Excellent" if sharpe > 2 else "Good" if sharpe > 1 else "Moderate")
-            st.progress(min(sharpe / 3, 1.0))
+            st.markdown(_bar(sharpe / 3), unsafe_allow_html=True)
         
         with col2:
-            st.subheader("Max Drawdown")
-            drawdown = risk_data['max_drawdown']
-            st.metric("", f"{drawdown:.2%}", delta_color="inverse")
-            st.progress(abs(drawdown))
+            st.markdown(_bar(abs(drawdown)), unsafe_allow_html=True)
         
         with col3:
-            st.subheader("Win Rate")
-            win_rate = risk_data['win_rate']
-            st.metric("", f"{win_rate:.1%}")
-            st.progress(win_rate)
+            st.markdown(_bar(win_rate), unsafe_allow_html=True)
     
-    def render_active_positions(self):
+    def render_active_positions(self, positions: list):
         """Tabla de posiciones activas"""
         st.header("🎯 Active Positions")
         
-        positions = self.portfolio.get_active_positions()
-        
         if not positions:
             st.info("No active positions")
             return
         
-        df = pd.DataFrame(positions)
-        
-        # Formatear columnas
-        df['entry_price'] = df['entry_price'].apply(lambda x: f"€{x:.4f}")
-        df['current_price'] = df['current_price'].apply(lambda x: f"€{x:.4f}")
-        df['pnl'] = df['pnl'].apply(lambda x: f"€{x:+.2f}")
-        df['size'] = df['size'].apply(lambda x: f"€{x:.2f}")
+        df = _compact(pd.DataFrame(positions))
         
+        # Formato en el cliente: las columnas siguen siendo numéricas
         st.dataframe(
             df,
             use_container_width=True,
-            hide_index=True
+            hide_index=True,
+            column_config=POSITION_COLUMNS
         )
     
     def render_trade_history(self):
         """Historial de trades recientes"""
         st.header("📜 Recent Trades")
         
-        trades = self._get_recent_trades(limit=50)
-        
-        df = pd.DataFrame(trades)
+        df = _recent_trades(limit=50)
+        strategies = df['strategy'].unique().tolist()
         
         # Filtros
         col1, col2, col3 = st.columns(3)
@@ -204,15 +366,15 @@ class DashboardApp:
         with col1:
             strategy_filter = st.multiselect(
                 "Strategy",
-                options=df['strategy'].unique(),
-                default=df['strategy'].unique()
+                options=strategies,
+                default=strategies
             )
         
         with col2:
             outcome_filter = st.multiselect(
                 "Outcome",
-                options=['WIN', 'LOSS', 'OPEN'],
-                default=['WIN', 'LOSS', 'OPEN']
+                options=OUTCOMES,
+                default=OUTCOMES
             )
         
         with col3:
@@ -222,10 +384,7 @@ class DashboardApp:
             )
         
         # Aplicar filtros
-        filtered_df = df[
-            (df['strategy'].isin(strategy_filter)) &
-            (df['outcome'].isin(outcome_filter))
-        ]
+        filtered_df = _filter_trades(50, tuple(strategy_filter), tuple(outcome_filter))
         
         st.dataframe(
             filtered_df,
@@ -234,10 +393,9 @@ class DashboardApp:
         )
         
         # Botón de exportación
-        csv = filtered_df.to_csv(index=False)
         st.download_button(
             label="📥 Export CSV",
-            data=csv,
+            data=_df_to_csv_bytes(filtered_df),
             file_name=f"trades_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
@@ -294,38 +452,14 @@ class DashboardApp:
         # Implementación simplificada
         return True
     
-    def _get_pnl_history(self, days: int) -> pd.DataFrame:
-        """Obtiene historial de PnL"""
-        # Datos de ejemplo - en producción vendría de DB
-        dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
-        pnl = pd.DataFrame({
-            'date': dates,
-            'daily_pnl': [50 + i*10 + (i % 5 - 2)*30 for i in range(days)]
-        })
-        pnl['cumulative_pnl'] = pnl['daily_pnl'].cumsum()
-        return pnl
-    
-    def _get_recent_trades(self, limit: int) -> list:
-        """Obtiene trades recientes"""
-        # Datos de ejemplo
-        return [
-            {
-                'timestamp': datetime.now() - timedelta(hours=i),
-                'market': f'Market_{i}',
-                'strategy': ['Gap', 'Arbitrage', 'ML'][i % 3],
-                'side': 'YES' if i % 2 else 'NO',
-                'size': 100 + i*10,
-                'entry': 0.45 + (i % 10) * 0.01,
-                'exit': 0.55 + (i % 10) * 0.01,
-                'pnl': (10 - i % 20),
-                'outcome': ['WIN', 'LOSS', 'OPEN'][i % 3]
-            }
-            for i in range(limit)
-        ]
-    
     def run(self):
         """Ejecuta la aplicación principal"""
         self.render_settings()
+        
+        # Auto-refresh: se lee antes de los fragmentos, que dependen de él
+        st.sidebar.markdown("---")
+        auto_refresh = st.sidebar.checkbox("Auto-refresh (30s)", value=True, key=AUTO_REFRESH_KEY)
+        
         self.render_header()
         
         # Tabs principales
@@ -337,26 +471,25 @@ class DashboardApp:
         ])
         
         with tab1:
-            self.render_portfolio_overview()
-            self.render_risk_metrics()
+            self.render_overview()
         
         with tab2:
             self.render_pnl_chart()
         
         with tab3:
-            self.render_active_positions()
+            self.render_active_positions(_dashboard_snapshot(INITIAL_CAPITAL)['positions'])
         
         with tab4:
             self.render_trade_history()
         
-        # Auto-refresh
-        st.sidebar.markdown("---")
-        auto_refresh = st.sidebar.checkbox("Auto-refresh (30s)", value=True)
-        
+        # El temporizador vive en el navegador: no bloquea el hilo del script
         if auto_refresh:
-            import time
-            time.sleep(30)
-            st.rerun()
+            if st_autorefresh is not None:
+                st_autorefresh(interval=30_000, key="dashtick")
+            else:
+                import time
+                time.sleep(30)
+                st.rerun()
 
 if __name__ == "__main__":
     app = DashboardApp()
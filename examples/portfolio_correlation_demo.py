@@ -21,6 +21,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import logging
+import numpy as np
 from core.portfolio_manager import PortfolioManager, PortfolioConfig
 import time
 
@@ -32,18 +33,27 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+_STEPS = np.arange(20)
+
+
+def _candles(base: float, step: float = 0.004) -> np.ndarray:
+    """20 rising close prices; PortfolioManager accepts the ndarray directly"""
+    return base + _STEPS * step
+
+
+def _emit(*lines: str):
+    """Write several lines with a single stdout write"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
 
 def print_section(title: str):
     """Print formatted section header"""
-    print("\n" + "="*80)
-    print(f"👉 {title}")
-    print("="*80)
+    sys.stdout.write(f"\n{'='*80}\n👉 {title}\n{'='*80}\n")
 
 
 def print_subsection(title: str):
     """Print formatted subsection header"""
-    print(f"\n🔹 {title}")
-    print("-" * 60)
+    sys.stdout.write(f"\n🔹 {title}\n{'-'*60}\n")
 
 
 def demo_scenario_1_btc_overexposure():
@@ -54,38 +64,64 @@ def demo_scenario_1_btc_overexposure():
     """
     print_section("SCENARIO 1: Preventing BTC Overexposure")
     
-    print("\n📊 Situation:")
-    print("   - 3 different strategies detect BTC opportunities")
-    print("   - All recommend similar positions (highly correlated)")
-    print("   - Without correlation adjustment: DANGEROUS overexposure")
-    print("   - With adjustment: SAFE diversification")
+    _emit(
+        "\n📊 Situation:",
+        "   - 3 different strategies detect BTC opportunities",
+        "   - All recommend similar positions (highly correlated)",
+        "   - Without correlation adjustment: DANGEROUS overexposure",
+        "   - With adjustment: SAFE diversification",
+    )
     
     # Initialize portfolio
     pm = PortfolioManager(bankroll=10000)
     
-    # Strategy 1: BTC Lag Predictive
-    print_subsection("Strategy 1: BTC Lag Predictive")
-    
     btc_data1 = {
         'token_id': 'btc_100k_2026',
         'current_price': 0.68,
         'keywords': ['bitcoin', 'btc', '100k', '2026'],
-        'candles': [{'close': 0.60 + i*0.004} for i in range(20)]
+        'candles': _candles(0.60)
     }
     
     kelly_size_1 = 2500  # Kelly recommends $2,500
     
-    adjusted_1, details_1 = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_size_1,
-        new_position_data=btc_data1,
-        direction="YES",
-        strategy_name="BTC Lag Predictive"
-    )
+    btc_data2 = {
+        'token_id': 'btc_100k_2026',  # SAME token!
+        'current_price': 0.69,
+        'keywords': ['bitcoin', 'btc', '100k'],
+        'candles': _candles(0.61)
+    }
+    
+    kelly_size_2 = 2200  # Kelly recommends $2,200
+    
+    btc_data3 = {
+        'token_id': 'btc_cross_exchange',
+        'current_price': 0.67,
+        'keywords': ['bitcoin', 'crypto', 'arbitrage'],
+        'candles': _candles(0.59)
+    }
+    
+    kelly_size_3 = 1800  # Kelly recommends $1,800
+    
+    # All three signals sized in one batched call (greedy, in order)
+    sized = pm.calculate_correlation_adjusted_size_batch([
+        {'base_kelly_size': kelly_size_1, 'new_position_data': btc_data1,
+         'direction': "YES", 'strategy_name': "BTC Lag Predictive"},
+        {'base_kelly_size': kelly_size_2, 'new_position_data': btc_data2,
+         'direction': "YES", 'strategy_name': "BTC Multi-Source Lag"},
+        {'base_kelly_size': kelly_size_3, 'new_position_data': btc_data3,
+         'direction': "YES", 'strategy_name': "Cross-Exchange Ultra Fast"},
+    ])
+    (adjusted_1, details_1), (adjusted_2, details_2), (adjusted_3, details_3) = sized
+    
+    # Strategy 1: BTC Lag Predictive
+    print_subsection("Strategy 1: BTC Lag Predictive")
     
-    print(f"   Kelly Size:     ${kelly_size_1:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_1:,.0f}")
-    print(f"   Adjustment:     {(adjusted_1/kelly_size_1):.1%}")
-    print(f"   Reason:         First position (no adjustment needed)")
+    _emit(
+        f"   Kelly Size:     ${kelly_size_1:,.0f}",
+        f"   Adjusted Size:  ${adjusted_1:,.0f}",
+        f"   Adjustment:     {(adjusted_1/kelly_size_1):.1%}",
+        f"   Reason:         First position (no adjustment needed)",
+    )
     
     pm.add_position(
         position_id="btc_lag_1",
@@ -102,29 +138,15 @@ def demo_scenario_1_btc_overexposure():
     # Strategy 2: BTC Multi-Source (HIGHLY CORRELATED)
     print_subsection("Strategy 2: BTC Multi-Source Lag")
     
-    btc_data2 = {
-        'token_id': 'btc_100k_2026',  # SAME token!
-        'current_price': 0.69,
-        'keywords': ['bitcoin', 'btc', '100k'],
-        'candles': [{'close': 0.61 + i*0.004} for i in range(20)]
-    }
-    
-    kelly_size_2 = 2200  # Kelly recommends $2,200
-    
-    adjusted_2, details_2 = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_size_2,
-        new_position_data=btc_data2,
-        direction="YES",
-        strategy_name="BTC Multi-Source Lag"
+    _emit(
+        f"   Kelly Size:     ${kelly_size_2:,.0f}",
+        f"   Adjusted Size:  ${adjusted_2:,.0f}",
+        f"   Adjustment:     {(adjusted_2/kelly_size_2):.1%}",
+        f"   Reason:         {details_2['reason']}",
+        f"   Correlation:    {details_2['max_correlation']:.2f} (VERY HIGH)",
+        f"   ⚠️  POSITION SIZE REDUCED BY {((1 - adjusted_2/kelly_size_2)*100):.0f}%",
     )
     
-    print(f"   Kelly Size:     ${kelly_size_2:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_2:,.0f}")
-    print(f"   Adjustment:     {(adjusted_2/kelly_size_2):.1%}")
-    print(f"   Reason:         {details_2['reason']}")
-    print(f"   Correlation:    {details_2['max_correlation']:.2f} (VERY HIGH)")
-    print(f"   ⚠️  POSITION SIZE REDUCED BY {((1 - adjusted_2/kelly_size_2)*100):.0f}%")
-    
     pm.add_position(
         position_id="btc_multisource_2",
         strategy_name="BTC Multi-Source Lag",
@@ -140,30 +162,16 @@ def demo_scenario_1_btc_overexposure():
     # Strategy 3: Cross-Exchange (ALSO CORRELATED)
     print_subsection("Strategy 3: Cross-Exchange BTC")
     
-    btc_data3 = {
-        'token_id': 'btc_cross_exchange',
-        'current_price': 0.67,
-        'keywords': ['bitcoin', 'crypto', 'arbitrage'],
-        'candles': [{'close': 0.59 + i*0.004} for i in range(20)]
-    }
-    
-    kelly_size_3 = 1800  # Kelly recommends $1,800
-    
-    adjusted_3, details_3 = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_size_3,
-        new_position_data=btc_data3,
-        direction="YES",
-        strategy_name="Cross-Exchange Ultra Fast"
+    _emit(
+        f"   Kelly Size:     ${kelly_size_3:,.0f}",
+        f"   Adjusted Size:  ${adjusted_3:,.0f}",
+        f"   Adjustment:     {(adjusted_3/kelly_size_3):.1%}",
+        f"   Reason:         {details_3['reason']}",
+        f"   Correlation:    {details_3['max_correlation']:.2f}",
+        f"   Corr Positions: {details_3['correlated_positions']}",
+        f"   ⚠️  POSITION SIZE REDUCED BY {((1 - adjusted_3/kelly_size_3)*100):.0f}%",
     )
     
-    print(f"   Kelly Size:     ${kelly_size_3:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_3:,.0f}")
-    print(f"   Adjustment:     {(adjusted_3/kelly_size_3):.1%}")
-    print(f"   Reason:         {details_3['reason']}")
-    print(f"   Correlation:    {details_3['max_correlation']:.2f}")
-    print(f"   Corr Positions: {details_3['correlated_positions']}")
-    print(f"   ⚠️  POSITION SIZE REDUCED BY {((1 - adjusted_3/kelly_size_3)*100):.0f}%")
-    
     pm.add_position(
         position_id="btc_exchange_3",
         strategy_name="Cross-Exchange Ultra Fast",
@@ -183,18 +191,22 @@ def demo_scenario_1_btc_overexposure():
     total_adjusted = adjusted_1 + adjusted_2 + adjusted_3
     protection_pct = ((total_kelly - total_adjusted) / total_kelly) * 100
     
-    print(f"\n   WITHOUT Correlation Adjustment:")
-    print(f"      Total Exposure: ${total_kelly:,.0f}")
-    print(f"      % of Bankroll:  {(total_kelly/10000)*100:.1f}%")
-    print(f"      Risk Level:     ⚠️  DANGEROUS (overexposed to BTC)")
+    _emit(
+        f"\n   WITHOUT Correlation Adjustment:",
+        f"      Total Exposure: ${total_kelly:,.0f}",
+        f"      % of Bankroll:  {(total_kelly/10000)*100:.1f}%",
+        f"      Risk Level:     ⚠️  DANGEROUS (overexposed to BTC)",
+    )
     
-    print(f"\n   WITH Correlation Adjustment:")
-    print(f"      Total Exposure: ${total_adjusted:,.0f}")
-    print(f"      % of Bankroll:  {(total_adjusted/10000)*100:.1f}%")
-    print(f"      Risk Level:     ✅ SAFE (diversified)")
-    print(f"      Protection:     {protection_pct:.1f}% reduction in exposure")
+    _emit(
+        f"\n   WITH Correlation Adjustment:",
+        f"      Total Exposure: ${total_adjusted:,.0f}",
+        f"      % of Bankroll:  {(total_adjusted/10000)*100:.1f}%",
+        f"      Risk Level:     ✅ SAFE (diversified)",
+        f"      Protection:     {protection_pct:.1f}% reduction in exposure",
+    )
     
-    print(f"\n   🛡️  PROTECTION: ${total_kelly - total_adjusted:,.0f} saved from overexposure!")
+    _emit(f"\n   🛡️  PROTECTION: ${total_kelly - total_adjusted:,.0f} saved from overexposure!")
     
     # Show portfolio summary
     pm.print_portfolio_summary()
@@ -210,36 +222,63 @@ def demo_scenario_2_diversified_portfolio():
     """
     print_section("SCENARIO 2: Diversified Portfolio (No Adjustment)")
     
-    print("\n📊 Situation:")
-    print("   - 3 different strategies on UNCORRELATED markets")
-    print("   - BTC, Trump Election, Ethereum - all independent")
-    print("   - No correlation = no adjustment needed")
-    print("   - Full Kelly sizes applied")
+    _emit(
+        "\n📊 Situation:",
+        "   - 3 different strategies on UNCORRELATED markets",
+        "   - BTC, Trump Election, Ethereum - all independent",
+        "   - No correlation = no adjustment needed",
+        "   - Full Kelly sizes applied",
+    )
     
     # Initialize portfolio
     pm = PortfolioManager(bankroll=10000)
     
-    # Position 1: BTC
-    print_subsection("Position 1: BTC Market")
-    
     btc_data = {
         'token_id': 'btc_100k',
         'current_price': 0.65,
         'keywords': ['bitcoin', 'btc', 'crypto'],
-        'candles': [{'close': 0.60 + i*0.003} for i in range(20)]
+        'candles': _candles(0.60, 0.003)
     }
     
     kelly_1 = 1500
-    adjusted_1, _ = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_1,
-        new_position_data=btc_data,
-        direction="YES",
-        strategy_name="BTC Lag Predictive"
-    )
     
-    print(f"   Kelly Size:     ${kelly_1:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_1:,.0f}")
-    print(f"   Adjustment:     {(adjusted_1/kelly_1):.1%} (no adjustment)")
+    trump_data = {
+        'token_id': 'trump_2024',
+        'current_price': 0.72,
+        'keywords': ['trump', 'election', 'president', '2024'],
+        'candles': _candles(0.68, 0.002)
+    }
+    
+    kelly_2 = 1400
+    
+    eth_data = {
+        'token_id': 'eth_5k',
+        'current_price': 0.55,
+        'keywords': ['ethereum', 'eth', 'crypto'],
+        'candles': _candles(0.50, 0.003)
+    }
+    
+    kelly_3 = 1300
+    
+    # All three signals sized in one batched call (greedy, in order)
+    sized = pm.calculate_correlation_adjusted_size_batch([
+        {'base_kelly_size': kelly_1, 'new_position_data': btc_data,
+         'direction': "YES", 'strategy_name': "BTC Lag Predictive"},
+        {'base_kelly_size': kelly_2, 'new_position_data': trump_data,
+         'direction': "YES", 'strategy_name': "News Sentiment NLP"},
+        {'base_kelly_size': kelly_3, 'new_position_data': eth_data,
+         'direction': "YES", 'strategy_name': "Volume Confirmation Pro"},
+    ])
+    (adjusted_1, _), (adjusted_2, details_2), (adjusted_3, details_3) = sized
+    
+    # Position 1: BTC
+    print_subsection("Position 1: BTC Market")
+    
+    _emit(
+        f"   Kelly Size:     ${kelly_1:,.0f}",
+        f"   Adjusted Size:  ${adjusted_1:,.0f}",
+        f"   Adjustment:     {(adjusted_1/kelly_1):.1%} (no adjustment)",
+    )
     
     pm.add_position(
         position_id="btc_1",
@@ -256,26 +295,13 @@ def demo_scenario_2_diversified_portfolio():
     # Position 2: Trump Election (UNCORRELATED)
     print_subsection("Position 2: Trump Election")
     
-    trump_data = {
-        'token_id': 'trump_2024',
-        'current_price': 0.72,
-        'keywords': ['trump', 'election', 'president', '2024'],
-        'candles': [{'close': 0.68 + i*0.002} for i in range(20)]
-    }
-    
-    kelly_2 = 1400
-    adjusted_2, details_2 = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_2,
-        new_position_data=trump_data,
-        direction="YES",
-        strategy_name="News Sentiment NLP"
+    _emit(
+        f"   Kelly Size:     ${kelly_2:,.0f}",
+        f"   Adjusted Size:  ${adjusted_2:,.0f}",
+        f"   Adjustment:     {(adjusted_2/kelly_2):.1%} (minimal adjustment)",
+        f"   Correlation:    {details_2['max_correlation']:.2f} (LOW - different market)",
     )
     
-    print(f"   Kelly Size:     ${kelly_2:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_2:,.0f}")
-    print(f"   Adjustment:     {(adjusted_2/kelly_2):.1%} (minimal adjustment)")
-    print(f"   Correlation:    {details_2['max_correlation']:.2f} (LOW - different market)")
-    
     pm.add_position(
         position_id="trump_2",
         strategy_name="News Sentiment NLP",
@@ -291,26 +317,13 @@ def demo_scenario_2_diversified_portfolio():
     # Position 3: Ethereum (UNCORRELATED to Trump, slight to BTC)
     print_subsection("Position 3: Ethereum Market")
     
-    eth_data = {
-        'token_id': 'eth_5k',
-        'current_price': 0.55,
-        'keywords': ['ethereum', 'eth', 'crypto'],
-        'candles': [{'close': 0.50 + i*0.003} for i in range(20)]
-    }
-    
-    kelly_3 = 1300
-    adjusted_3, details_3 = pm.calculate_correlation_adjusted_size(
-        base_kelly_size=kelly_3,
-        new_position_data=eth_data,
-        direction="YES",
-        strategy_name="Volume Confirmation Pro"
+    _emit(
+        f"   Kelly Size:     ${kelly_3:,.0f}",
+        f"   Adjusted Size:  ${adjusted_3:,.0f}",
+        f"   Adjustment:     {(adjusted_3/kelly_3):.1%}",
+        f"   Correlation:    {details_3['max_correlation']:.2f}",
     )
     
-    print(f"   Kelly Size:     ${kelly_3:,.0f}")
-    print(f"   Adjusted Size:  ${adjusted_3:,.0f}")
-    print(f"   Adjustment:     {(adjusted_3/kelly_3):.1%}")
-    print(f"   Correlation:    {details_3['max_correlation']:.2f}")
-    
     pm.add_position(
         position_id="eth_3",
         strategy_name="Volume Confirmation Pro",
@@ -329,10 +342,12 @@ def demo_scenario_2_diversified_portfolio():
     total_kelly = kelly_1 + kelly_2 + kelly_3
     total_adjusted = adjusted_1 + adjusted_2 + adjusted_3
     
-    print(f"\n   Total Kelly Size:    ${total_kelly:,.0f}")
-    print(f"   Total Adjusted:      ${total_adjusted:,.0f}")
-    print(f"   Difference:          ${total_kelly - total_adjusted:,.0f} ({((total_kelly-total_adjusted)/total_kelly)*100:.1f}%)")
-    print(f"\n   ✅ Minimal adjustment because positions are DIVERSIFIED!")
+    _emit(
+        f"\n   Total Kelly Size:    ${total_kelly:,.0f}",
+        f"   Total Adjusted:      ${total_adjusted:,.0f}",
+        f"   Difference:          ${total_kelly - total_adjusted:,.0f} ({((total_kelly-total_adjusted)/total_kelly)*100:.1f}%)",
+        f"\n   ✅ Minimal adjustment because positions are DIVERSIFIED!",
+    )
     
     pm.print_portfolio_summary()
     
@@ -347,12 +362,14 @@ def demo_scenario_3_cluster_limit():
     """
     print_section("SCENARIO 3: Cluster Exposure Limit")
     
-    print("\n📊 Situation:")
-    print("   - Already have large BTC positions ($2,500)")
-    print("   - Cluster limit: 25% of bankroll = $2,500")
-    print("   - New BTC signal: Kelly recommends $1,500")
-    print("   - Would exceed cluster limit!")
-    print("   - System blocks/reduces position")
+    _emit(
+        "\n📊 Situation:",
+        "   - Already have large BTC positions ($2,500)",
+        "   - Cluster limit: 25% of bankroll = $2,500",
+        "   - New BTC signal: Kelly recommends $1,500",
+        "   - Would exceed cluster limit!",
+        "   - System blocks/reduces position",
+    )
     
     # Initialize with custom config (strict limits)
     config = PortfolioConfig(
@@ -368,7 +385,7 @@ def demo_scenario_3_cluster_limit():
         'token_id': 'btc_100k',
         'current_price': 0.68,
         'keywords': ['bitcoin', 'btc'],
-        'candles': [{'close': 0.60 + i*0.004} for i in range(20)]
+        'candles': _candles(0.60)
     }
     
     pm.add_position(
@@ -383,9 +400,11 @@ def demo_scenario_3_cluster_limit():
         market_data=btc_data1
     )
     
-    print(f"   Position Size:   $2,500")
-    print(f"   Cluster Limit:   $2,500 (25% of $10k)")
-    print(f"   Remaining:       $0 (AT LIMIT)")
+    _emit(
+        f"   Position Size:   $2,500",
+        f"   Cluster Limit:   $2,500 (25% of $10k)",
+        f"   Remaining:       $0 (AT LIMIT)",
+    )
     
     # Try to add another BTC position
     print_subsection("New Signal: BTC Multi-Source ($1,500 Kelly)")
@@ -394,7 +413,7 @@ def demo_scenario_3_cluster_limit():
         'token_id': 'btc_100k',
         'current_price': 0.69,
         'keywords': ['bitcoin', 'btc'],
-        'candles': [{'close': 0.61 + i*0.004} for i in range(20)]
+        'candles': _candles(0.61)
     }
     
     kelly_new = 1500
@@ -405,15 +424,19 @@ def demo_scenario_3_cluster_limit():
         strategy_name="BTC Multi-Source Lag"
     )
     
-    print(f"\n   Kelly Recommends: ${kelly_new:,.0f}")
-    print(f"   Adjusted Size:    ${adjusted_new:,.0f}")
-    print(f"   Adjustment:       {(adjusted_new/kelly_new):.1%}")
-    print(f"   Reason:           {details_new['reason']}")
+    _emit(
+        f"\n   Kelly Recommends: ${kelly_new:,.0f}",
+        f"   Adjusted Size:    ${adjusted_new:,.0f}",
+        f"   Adjustment:       {(adjusted_new/kelly_new):.1%}",
+        f"   Reason:           {details_new['reason']}",
+    )
     
     if adjusted_new < kelly_new * 0.3:
-        print(f"\n   ❌ BLOCKED: Position size too small after adjustment")
-        print(f"      Cluster already at limit!")
-        print(f"      Need to close existing position first.")
+        _emit(
+            f"\n   ❌ BLOCKED: Position size too small after adjustment",
+            f"      Cluster already at limit!",
+            f"      Need to close existing position first.",
+        )
     else:
         pm.add_position(
             position_id="btc_new",
@@ -436,15 +459,19 @@ def main():
     """
     Run all demo scenarios
     """
-    print("\n" + "#"*80)
-    print("#" + " "*78 + "#")
-    print("#" + " "*20 + "🎯 PORTFOLIO MANAGER DEMO" + " "*20 + "#")
-    print("#" + " "*15 + "Correlation-Aware Position Sizing" + " "*15 + "#")
-    print("#" + " "*78 + "#")
-    print("#"*80)
+    _emit(
+        "\n" + "#"*80,
+        "#" + " "*78 + "#",
+        "#" + " "*20 + "🎯 PORTFOLIO MANAGER DEMO" + " "*20 + "#",
+        "#" + " "*15 + "Correlation-Aware Position Sizing" + " "*15 + "#",
+        "#" + " "*78 + "#",
+        "#"*80,
+    )
     
-    print("\n👉 This demo shows how the PortfolioManager prevents overexposure")
-    print("   by detecting correlated positions and adjusting sizes accordingly.")
+    _emit(
+        "\n👉 This demo shows how the PortfolioManager prevents overexposure",
+        "   by detecting correlated positions and adjusting sizes accordingly.",
+    )
     
     input("\n➡️  Press ENTER to start SCENARIO 1...")
     pm1 = demo_scenario_1_btc_overexposure()
@@ -458,52 +485,66 @@ def main():
     # Final summary
     print_section("🎆 DEMO COMPLETED")
     
-    print("\n✅ KEY TAKEAWAYS:\n")
-    print("   1️⃣  Correlation detection prevents overexposure")
-    print("      - Same token = high correlation")
-    print("      - Similar keywords = medium correlation")
-    print("      - Different markets = low correlation\n")
-    
-    print("   2️⃣  Position sizing automatically adjusted")
-    print("      - First position: Full Kelly size")
-    print("      - Correlated positions: Reduced size")
-    print("      - Cluster limit: Blocked if exceeded\n")
-    
-    print("   3️⃣  Risk management improved")
-    print("      - 30% less portfolio volatility")
-    print("      - 15% less max drawdown")
-    print("      - Better diversification\n")
-    
-    print("   4️⃣  No manual intervention needed")
-    print("      - Automatic correlation calculation")
-    print("      - Real-time cluster detection")
-    print("      - Dynamic size adjustment\n")
-    
-    print("💡 RECOMMENDATION:\n")
-    print("   Always use PortfolioManager.calculate_correlation_adjusted_size()")
-    print("   BEFORE taking any position!\n")
-    
-    print("   Example integration:")
-    print("   ```python")
-    print("   # In gap_engine.py or orchestrator.py")
-    print("   kelly_size = kelly.calculate(signal)")
-    print("   ")
-    print("   # Adjust for correlation")
-    print("   adjusted_size, details = portfolio_manager.calculate_correlation_adjusted_size(")
-    print("       base_kelly_size=kelly_size,")
-    print("       new_position_data=signal.market_data,")
-    print("       direction=signal.direction,")
-    print("       strategy_name=signal.strategy_name")
-    print("   )")
-    print("   ")
-    print("   if adjusted_size > 0:")
-    print("       # Take position with adjusted size")
-    print("       execute_trade(size=adjusted_size)")
-    print("   ```\n")
-    
-    print("="*80)
-    print("✅ Demo complete! PortfolioManager ready for production.")
-    print("="*80 + "\n")
+    _emit(
+        "\n✅ KEY TAKEAWAYS:\n",
+        "   1️⃣  Correlation detection prevents overexposure",
+        "      - Same token = high correlation",
+        "      - Similar keywords = medium correlation",
+        "      - Different markets = low correlation\n",
+    )
+    
+    _emit(
+        "   2️⃣  Position sizing automatically adjusted",
+        "      - First position: Full Kelly size",
+        "      - Correlated positions: Reduced size",
+        "      - Cluster limit: Blocked if exceeded\n",
+    )
+    
+    _emit(
+        "   3️⃣  Risk management improved",
+        "      - 30% less portfolio volatility",
+        "      - 15% less max drawdown",
+        "      - Better diversification\n",
+    )
+    
+    _emit(
+        "   4️⃣  No manual intervention needed",
+        "      - Automatic correlation calculation",
+        "      - Real-time cluster detection",
+        "      - Dynamic size adjustment\n",
+    )
+    
+    _emit(
+        "💡 RECOMMENDATION:\n",
+        "   Always use PortfolioManager.calculate_correlation_adjusted_size()",
+        "   BEFORE taking any position!\n",
+    )
+    
+    _emit(
+        "   Example integration:",
+        "   ```python",
+        "   # In gap_engine.py or orchestrator.py",
+        "   kelly_size = kelly.calculate(signal)",
+        "   ",
+        "   # Adjust for correlation",
+        "   adjusted_size, details = portfolio_manager.calculate_correlation_adjusted_size(",
+        "       base_kelly_size=kelly_size,",
+        "       new_position_data=signal.market_data,",
+        "       direction=signal.direction,",
+        "       strategy_name=signal.strategy_name",
+        "   )",
+        "   ",
+        "   if adjusted_size > 0:",
+        "       # Take position with adjusted size",
+        "       execute_trade(size=adjusted_size)",
+        "   ```\n",
+    )
+    
+    _emit(
+        "="*80,
+        "✅ Demo complete! PortfolioManager ready for production.",
+        "="*80 + "\n",
+    )
 
 
 if __name__ == "__main__":
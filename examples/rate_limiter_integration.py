@@ -14,6 +14,7 @@ Version: 1.0
 
 import time
 import logging
+import numpy as np
 from core.adaptive_rate_limiter import (
     AdaptiveRateLimiter,
     RateLimitConfig,
@@ -26,40 +27,58 @@ from core.adaptive_rate_limiter import (
 
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s | %(levelname)s | %(message)s',
-    datefmt='%H:%M:%S'
+    format='%(relativeCreated)7dms | %(levelname)s | %(message)s'  # no strftime per record
 )
 logger = logging.getLogger(__name__)
 
 
+def reserve(limiter: AdaptiveRateLimiter, api_name: str, n: int, endpoint: str = "default",
+            priority: Priority = Priority.MEDIUM):
+    """Reserve n requests up front in burst-sized batches, sleeping on any shortfall"""
+    per_batch = limiter.batch_size(api_name, priority)  # capacity // cost
+    while n > 0:
+        chunk = min(n, per_batch)
+        success, wait_time = limiter.acquire_batch(api_name, chunk, endpoint, priority)
+        if success:
+            n -= chunk
+        else:
+            logger.warning("%s: batch of %d BLOCKED (wait %.2fs)", api_name, chunk, wait_time)
+            time.sleep(wait_time)
+
+
 class EnhancedAPIClient:
     """Example API client with integrated rate limiting"""
     
     def __init__(self, api_name: str, rate_limiter: AdaptiveRateLimiter):
         self.api_name = api_name
         self.rate_limiter = rate_limiter
-        logger.info(f"Initialized {api_name} client with rate limiter")
+        self._slots = {}  # endpoint -> limiter slot, resolved once
+        logger.info("Initialized %s client with rate limiter", api_name)
+    
+    def reserve(self, n: int, endpoint: str = "default", priority: Priority = Priority.MEDIUM):
+        """Reserve n requests at once; then call make_request(..., reserved=True)"""
+        reserve(self.rate_limiter, self.api_name, n, endpoint, priority)
     
-    def make_request(self, endpoint: str, priority: Priority = Priority.MEDIUM):
+    def make_request(self, endpoint: str, priority: Priority = Priority.MEDIUM,
+                     reserved: bool = False):
         """Make API request with rate limiting"""
         
-        # Wait for rate limit availability
-        if not self.rate_limiter.wait_if_needed(
-            self.api_name, 
-            endpoint, 
-            priority, 
-            timeout=30.0
-        ):
-            logger.error(f"Rate limit timeout: {endpoint}")
+        slot = self._slots.get(endpoint)
+        if slot is None:
+            slot = self._slots[endpoint] = self.rate_limiter.resolve_slot(self.api_name, endpoint)
+        
+        # Wait for rate limit availability (unless already reserved in a batch)
+        if not reserved and not self.rate_limiter.wait_by_slot(slot, priority, timeout=30.0):
+            logger.error("Rate limit timeout: %s", endpoint)
             return None
         
         # Simulate API request
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             # Your actual API call here
             time.sleep(0.05)  # Simulate network latency
             status_code = 200  # Simulate success
-            response_time = time.time() - start_time
+            response_time = time.perf_counter() - start_time
             
             # Record response for adaptive learning
             self.rate_limiter.record_response(
@@ -69,11 +88,11 @@ class EnhancedAPIClient:
                 endpoint
             )
             
-            logger.info(f"✅ {self.api_name}/{endpoint} - {response_time*1000:.0f}ms")
+            logger.info("✅ %s/%s - %.0fms", self.api_name, endpoint, response_time * 1000)
             return {'status': 'success', 'data': {}}
         
         except Exception as e:
-            logger.error(f"❌ {self.api_name}/{endpoint} failed: {e}")
+            logger.error("❌ %s/%s failed: %s", self.api_name, endpoint, e)
             return None
 
 
@@ -89,15 +108,11 @@ def example_basic_usage():
     # Register Polymarket API
     limiter.register_api(POLYMARKET_CONFIG)
     
-    # Make requests
+    # Reserve the 20 requests up front (burst-sized batches)
+    reserve(limiter, 'polymarket', 20, endpoint='/markets')
+    
     for i in range(20):
-        success, wait_time = limiter.acquire('polymarket', endpoint='/markets')
-        
-        if success:
-            logger.info(f"Request {i+1}: ALLOWED")
-        else:
-            logger.warning(f"Request {i+1}: BLOCKED (wait {wait_time:.2f}s)")
-            time.sleep(wait_time)
+        logger.info("Request %d: ALLOWED", i + 1)
     
     # Show statistics
     limiter.print_stats('polymarket')
@@ -124,10 +139,14 @@ def example_multi_api():
     # Make parallel requests
     logger.info("Making requests to multiple APIs...\n")
     
+    polymarket.reserve(10, '/markets')
+    binance.reserve(10, '/ticker/price')
+    coingecko.reserve(10, '/simple/price')
+    
     for i in range(10):
-        polymarket.make_request('/markets')
-        binance.make_request('/ticker/price')
-        coingecko.make_request('/simple/price')
+        polymarket.make_request('/markets', reserved=True)
+        binance.make_request('/ticker/price', reserved=True)
+        coingecko.make_request('/simple/price', reserved=True)
     
     # Show all stats
     logger.info("\n")
@@ -160,19 +179,19 @@ def example_priority_system():
     logger.info("\nCritical request (trading execution):")
     start = time.time()
     limiter.wait_if_needed('test_api', priority=Priority.CRITICAL)
-    logger.info(f"  Wait time: {time.time() - start:.3f}s")
+    logger.info("  Wait time: %.3fs", time.time() - start)
     
     # High priority request
     logger.info("\nHigh priority request (price update):")
     start = time.time()
     limiter.wait_if_needed('test_api', priority=Priority.HIGH)
-    logger.info(f"  Wait time: {time.time() - start:.3f}s")
+    logger.info("  Wait time: %.3fs", time.time() - start)
     
     # Low priority request
     logger.info("\nLow priority request (analytics):")
     start = time.time()
     limiter.wait_if_needed('test_api', priority=Priority.LOW, timeout=2.0)
-    logger.info(f"  Wait time: {time.time() - start:.3f}s")
+    logger.info("  Wait time: %.3fs", time.time() - start)
 
 
 def example_adaptive_learning():
@@ -195,15 +214,15 @@ def example_adaptive_learning():
     limiter.register_api(config)
     
     # Initial state
-    logger.info(f"Initial limit: {config.max_requests} req/min\n")
+    logger.info("Initial limit: %d req/min\n", config.max_requests)
     
     # Simulate 429 response
     logger.info("Simulating rate limit hit (429)...")
     limiter.record_response('adaptive_api', status_code=429, response_time=0.5)
     
     stats = limiter.get_stats('adaptive_api')
-    logger.info(f"  New limit: {stats['current_limit']} req/min")
-    logger.info(f"  Rate limit hits: {stats['rate_limit_hits']}\n")
+    logger.info("  New limit: %s req/min", stats['current_limit'])
+    logger.info("  Rate limit hits: %s\n", stats['rate_limit_hits'])
     
     # Simulate success streak
     logger.info("Simulating 150 successful requests...")
@@ -211,8 +230,8 @@ def example_adaptive_learning():
         limiter.record_response('adaptive_api', status_code=200, response_time=0.1)
     
     stats = limiter.get_stats('adaptive_api')
-    logger.info(f"  New limit: {stats['current_limit']} req/min")
-    logger.info(f"  Success streak: {stats['success_streak']}")
+    logger.info("  New limit: %s req/min", stats['current_limit'])
+    logger.info("  Success streak: %s", stats['success_streak'])
 
 
 def example_endpoint_specific_limits():
@@ -236,17 +255,17 @@ def example_endpoint_specific_limits():
     for i in range(15):
         success, wait = limiter.acquire('polymarket', endpoint='/markets')
         if success:
-            logger.info(f"  Request {i+1}: ✅")
+            logger.info("  Request %d: ✅", i + 1)
         else:
-            logger.warning(f"  Request {i+1}: ⏸️ (wait {wait:.1f}s)")
+            logger.warning("  Request %d: ⏸️ (wait %.1fs)", i + 1, wait)
     
     logger.info("\nExpensive endpoint (/heavy_analytics):")
     for i in range(10):
         success, wait = limiter.acquire('polymarket', endpoint='/heavy_analytics')
         if success:
-            logger.info(f"  Request {i+1}: ✅")
+            logger.info("  Request %d: ✅", i + 1)
         else:
-            logger.warning(f"  Request {i+1}: ⏸️ (wait {wait:.1f}s)")
+            logger.warning("  Request %d: ⏸️ (wait %.1fs)", i + 1, wait)
 
 
 def example_monitoring():
@@ -301,12 +320,19 @@ def example_production_integration():
     logger.info("Simulating production traffic...\n")
     
     apis = ['polymarket', 'kalshi', 'binance', 'coingecko']
+    
+    # Plan the 50 interleaved requests in one numpy pass; re-plan only the denied ones
+    slots = {api: limiter.resolve_slot(api) for api in apis}
+    slot_ids = np.array([slots[apis[i % len(apis)]] for i in range(50)])
+    allowed, waits = limiter.plan(slot_ids)
+    while not allowed.all():
+        logger.warning("%d requests BLOCKED (wait %.2fs)", (~allowed).sum(), waits.max())
+        time.sleep(waits.max())
+        pending = np.flatnonzero(~allowed)
+        allowed[pending], waits = limiter.plan(slot_ids[pending])
+    
     for i in range(50):
         api = apis[i % len(apis)]
-        success, wait = limiter.acquire(api)
-        
-        if not success:
-            time.sleep(wait)
         
         # Occasionally record 429
         if i % 25 == 0:
@@ -340,13 +366,13 @@ def main():
     for name, func in examples:
         try:
             func()
-            logger.info(f"\n✅ {name} completed\n")
+            logger.info("\n✅ %s completed\n", name)
             time.sleep(1)
         except KeyboardInterrupt:
             logger.info("\n⚠️ Interrupted by user")
             break
         except Exception as e:
-            logger.error(f"❌ {name} failed: {e}", exc_info=True)
+            logger.error("❌ %s failed: %s", name, e, exc_info=True)
     
     logger.info("\n" + "#"*70)
     logger.info("# ALL EXAMPLES COMPLETED")
@@ -123,7 +123,7 @@ def main():
         orchestrator.run()
         
     except ValueError as e:
-        logger.error(f"❌ Error de configuración: {e}")
+        logger.error("❌ Error de configuración: %s", e)
         print("\n💡 Solución:")
         print("  1. Copia .env.example a .env")
         print("  2. Configura YOUR_CAPITAL > 0")
@@ -131,7 +131,7 @@ def main():
         sys.exit(1)
         
     except ImportError as e:
-        logger.error(f"❌ Error importando: {e}")
+        logger.error("❌ Error importando: %s", e)
         print("\n💡 Instala: pip install -r requirements.txt\n")
         sys.exit(1)
         
@@ -141,7 +141,7 @@ def main():
         sys.exit(0)
         
     except Exception as e:
-        logger.critical(f"🚫 Error crítico: {e}", exc_info=True)
+        logger.critical("🚫 Error crítico: %s", e, exc_info=True)
         print(f"\n❌ Error crítico: {e}\n")
         sys.exit(1)
 
@@ -302,6 +302,14 @@ def main():
     bot.config['trading']['bankroll'] = args.bankroll
     bot.engine.kelly.update_bankroll(args.bankroll)
     
+    # Event loop libuv (uvloop) si está instalado: menos overhead por mensaje WebSocket
+    try:
+        import uvloop
+        uvloop.install()
+        logger.info("⚡ uvloop activado")
+    except ImportError:
+        pass
+    
     # Run
     asyncio.run(bot.run(scan_interval=args.interval))
 
@@ -206,7 +206,14 @@ class MLTrainingPipeline:
             await self.notifier.send_message(f"❌ Error en entrenamiento v2.0: {e}")
             raise
 
-if __name__ == "__main__":
+async def main():
     pipeline = MLTrainingPipeline()
-    results = asyncio.run(pipeline.execute_full_pipeline())
+    try:
+        return await pipeline.execute_full_pipeline()
+    finally:
+        # Entregar las alertas en cola antes de que asyncio.run cierre el loop
+        await pipeline.notifier.close()
+
+if __name__ == "__main__":
+    results = asyncio.run(main())
     print(f"\n✅ Entrenamiento completado. Resultados: {results}")
@@ -5,10 +5,12 @@ Author: juankaspain
 
 import pytest
 import time
+import numpy as np
 from core.adaptive_rate_limiter import (
     AdaptiveRateLimiter,
     RateLimitConfig,
     Priority,
+    PRIORITY_COSTS,
     TokenBucket,
     POLYMARKET_CONFIG
 )
@@ -79,9 +81,9 @@ class TestAdaptiveRateLimiter:
         )
         limiter.register_api(config)
         
-        # Should allow 10 requests (burst size)
+        # Should allow 10 one-token requests (burst size)
         for i in range(10):
-            success, wait_time = limiter.acquire('test_api')
+            success, wait_time = limiter.acquire('test_api', priority=Priority.CRITICAL)
             assert success is True
             assert wait_time == 0.0
     
@@ -169,10 +171,28 @@ class TestAdaptiveRateLimiter:
         
         # Should respect endpoint limit
         for i in range(5):
-            success, _ = limiter.acquire('test_api', endpoint='/heavy_endpoint')
+            success, _ = limiter.acquire('test_api', endpoint='/heavy_endpoint',
+                                         priority=Priority.CRITICAL)
             if i < 5:
                 assert success is True
     
+    def test_plan_ignores_requests_denied_by_endpoint(self, limiter):
+        config = RateLimitConfig(name='test_api', max_requests=60, window_seconds=60, burst_size=5)
+        limiter.register_api(config)
+        limiter.set_endpoint_limit('test_api', '/x', max_requests=2, window_seconds=60)
+        
+        x = limiter.resolve_slot('test_api', '/x')
+        default = limiter.resolve_slot('test_api')
+        
+        # The 3rd /x request is denied by its endpoint and must not use API tokens
+        allowed, waits = limiter.plan(np.array([x, x, x, default, default, default]),
+                                      priority=Priority.CRITICAL)
+        
+        assert allowed.tolist() == [True, True, False, True, True, True]
+        assert waits[2] > 0
+        assert waits[allowed].max() == 0
+        assert limiter.limiters['test_api'].tokens < 1
+    
     def test_wait_if_needed(self, limiter):
         config = RateLimitConfig(
             name='test_api',
@@ -236,6 +256,141 @@ class TestAdaptiveRateLimiter:
         assert limiter.metrics['test_api'].total_requests == 0
 
 
+class TestBatchAndSlots:
+    """Test batch acquisition, pre-resolved slots and plans"""
+    
+    @pytest.fixture
+    def limiter(self):
+        limiter = AdaptiveRateLimiter(save_state=False)
+        limiter.register_api(RateLimitConfig(
+            name='test_api',
+            max_requests=60,
+            window_seconds=60,
+            burst_size=10
+        ))
+        return limiter
+    
+    def test_acquire_batch_granted_then_denied(self, limiter):
+        success, wait_time = limiter.acquire_batch('test_api', 8, priority=Priority.CRITICAL)
+        assert success is True
+        assert wait_time == 0.0
+        
+        success, wait_time = limiter.acquire_batch('test_api', 5, priority=Priority.CRITICAL)
+        assert success is False
+        assert wait_time == pytest.approx(3.0, abs=0.1)  # 3 tokens short at 1 token/s
+        assert limiter.metrics['test_api'].allowed_requests == 8
+    
+    def test_acquire_batch_above_capacity_raises(self, limiter):
+        with pytest.raises(ValueError):
+            limiter.acquire_batch('test_api', 11, priority=Priority.CRITICAL)
+    
+    def test_acquire_batch_charges_priority_cost(self, limiter):
+        # MEDIUM costs 4: a batch of 3 needs 12 > 10 tokens
+        with pytest.raises(ValueError):
+            limiter.acquire_batch('test_api', 3)
+        assert limiter.batch_size('test_api') == 2
+        assert limiter.batch_size('test_api', Priority.CRITICAL) == 10
+    
+    @pytest.mark.parametrize('priority', list(Priority))
+    def test_batch_and_single_acquires_cost_the_same(self, limiter, priority):
+        other = AdaptiveRateLimiter(save_state=False)
+        other.register_api(RateLimitConfig(
+            name='test_api', max_requests=60, window_seconds=60, burst_size=10
+        ))
+        
+        n = limiter.batch_size('test_api', priority)
+        assert limiter.acquire_batch('test_api', n, priority=priority)[0] is True
+        singles = [other.acquire('test_api', priority=priority)[0] for _ in range(n + 1)]
+        assert singles == [True] * n + [False]
+        assert limiter.limiters['test_api'].tokens == pytest.approx(
+            other.limiters['test_api'].tokens, abs=0.05)
+    
+    def test_priority_costs(self, limiter):
+        assert [PRIORITY_COSTS[p] for p in Priority] == [1, 2, 4, 8]
+        
+        limiter.acquire('test_api', priority=Priority.HIGH)
+        assert limiter.limiters['test_api'].tokens == pytest.approx(8, abs=0.01)
+        
+        # LOW (8) fits in the remaining 8 tokens, CRITICAL then has to wait
+        assert limiter.acquire('test_api', priority=Priority.LOW)[0] is True
+        assert limiter.acquire('test_api', priority=Priority.CRITICAL)[0] is False
+    
+    def test_cost_capped_at_capacity(self):
+        limiter = AdaptiveRateLimiter(save_state=False)
+        limiter.register_api(RateLimitConfig(name='small', burst_size=5))
+        
+        success, _ = limiter.acquire('small', priority=Priority.LOW)
+        assert success is True
+    
+    def test_resolve_slot_is_stable(self, limiter):
+        slot = limiter.resolve_slot('test_api', '/markets')
+        assert limiter.resolve_slot('test_api', '/markets') == slot
+        assert limiter.resolve_slot('test_api', '/other') != slot
+        
+        with pytest.raises(ValueError):
+            limiter.resolve_slot('unknown_api')
+    
+    def test_acquire_by_slot_matches_acquire(self, limiter):
+        slot = limiter.resolve_slot('test_api')
+        for _ in range(10):
+            assert limiter.acquire_by_slot(slot, priority=Priority.CRITICAL)[0] is True
+        
+        success, wait_time = limiter.acquire_by_slot(slot, priority=Priority.CRITICAL)
+        assert success is False
+        assert wait_time > 0
+    
+    def test_slot_rebinds_after_set_endpoint_limit(self, limiter):
+        slot = limiter.resolve_slot('test_api', '/heavy')
+        limiter.set_endpoint_limit('test_api', '/heavy', max_requests=2, window_seconds=60)
+        
+        results = [limiter.acquire_by_slot(slot, priority=Priority.CRITICAL)[0] for _ in range(3)]
+        assert results == [True, True, False]
+    
+    def test_wait_by_slot(self, limiter):
+        slot = limiter.resolve_slot('test_api')
+        limiter.acquire_batch('test_api', 10, priority=Priority.CRITICAL)
+        
+        start = time.monotonic()
+        assert limiter.wait_by_slot(slot, priority=Priority.CRITICAL, timeout=2.0) is True
+        assert time.monotonic() - start > 0.5
+        
+        assert limiter.wait_by_slot(slot, priority=Priority.CRITICAL, timeout=0.1) is False
+    
+    def test_plan_masks_and_waits(self, limiter):
+        slot = limiter.resolve_slot('test_api')
+        allowed, waits = limiter.plan(np.full(12, slot), priority=Priority.CRITICAL)
+        
+        assert allowed.tolist() == [True] * 10 + [False] * 2
+        assert waits[:10].tolist() == [0.0] * 10
+        assert waits[10:] == pytest.approx([1.0, 2.0], abs=0.05)
+        
+        # Only the allowed requests were debited
+        assert limiter.limiters['test_api'].tokens < 1
+        assert limiter.metrics['test_api'].allowed_requests == 10
+        assert limiter.metrics['test_api'].blocked_requests == 2
+    
+    def test_wait_if_needed_wakes_waiters(self, limiter):
+        import threading
+        
+        limiter.acquire_batch('test_api', 10, priority=Priority.CRITICAL)
+        results = []
+        
+        def waiter():
+            results.append(limiter.wait_if_needed('test_api', priority=Priority.CRITICAL,
+                                                  timeout=5.0))
+        
+        threads = [threading.Thread(target=waiter) for _ in range(3)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        # 3 tokens at 1 token/s: every waiter is served within the refill bound
+        assert results == [True, True, True]
+        assert time.monotonic() - start < 4.5
+
+
 class TestPredefinedConfigs:
     """Test predefined API configurations"""
     
@@ -250,7 +405,7 @@ class TestPredefinedConfigs:
         
         # Should allow burst
         for i in range(POLYMARKET_CONFIG.burst_size):
-            success, _ = limiter.acquire('polymarket')
+            success, _ = limiter.acquire('polymarket', priority=Priority.CRITICAL)
             assert success is True
 
 
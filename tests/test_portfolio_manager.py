@@ -0,0 +1,67 @@
+"""Tests for PortfolioManager correlation-adjusted sizing
+
+Author: juankaspain
+"""
+
+import numpy as np
+import pytest
+from core.portfolio_manager import PortfolioManager, PortfolioConfig
+
+
+def _candles(n, seed):
+    rng = np.random.default_rng(seed)
+    closes = 0.5 + np.cumsum(rng.normal(0, 0.01, n))
+    return [{'close': float(c)} for c in closes]
+
+
+class TestBatchSizing:
+    """Batch sizing must match sequential sizing + add_position"""
+    
+    def _signals(self):
+        return [
+            {'base_kelly_size': 300.0, 'direction': 'YES', 'strategy_name': 's1',
+             'new_position_data': {'token_id': 'tok_a', 'current_price': 0.5, 'candles': _candles(20, 10)}},
+            {'base_kelly_size': 250.0, 'direction': 'NO', 'strategy_name': 's2',
+             'new_position_data': {'token_id': 'tok_b', 'current_price': 0.5, 'candles': _candles(15, 11)}},
+        ]
+    
+    def _manager(self):
+        pm = PortfolioManager(bankroll=10000, config=PortfolioConfig(correlation_threshold=0.3))
+        # Mixed candle lengths: 12 and 20
+        for pid, n, seed in (('p12', 12, 1), ('p20', 20, 2)):
+            pm.add_position(pid, 'base', f'tok_{pid}', 'YES', 0.5, 400.0, 0.4, 0.7,
+                            {'token_id': f'tok_{pid}', 'candles': _candles(n, seed)})
+        return pm
+    
+    def test_price_correlation_uses_pair_overlap(self):
+        pm = self._manager()
+        data = [p.market_data for p in pm.positions.values()] + \
+               [sig['new_position_data'] for sig in self._signals()]
+        matrix = pm._price_correlation_matrix(data)
+        for i in range(len(data)):
+            for j in range(len(data)):
+                if i == j:
+                    continue
+                c1, c2 = data[i]['candles'][-20:], data[j]['candles'][-20:]
+                m = min(len(c1), len(c2))
+                expected = np.corrcoef(pm._close_prices(c1[-m:]), pm._close_prices(c2[-m:]))[0, 1]
+                assert matrix[i, j] == pytest.approx(expected)
+    
+    def test_batch_matches_sequential_with_mixed_lengths(self):
+        batch = self._manager().calculate_correlation_adjusted_size_batch(self._signals())
+        
+        pm = self._manager()
+        sequential = []
+        for k, sig in enumerate(self._signals()):
+            size, details = pm.calculate_correlation_adjusted_size(
+                sig['base_kelly_size'], sig['new_position_data'], sig['direction'], sig['strategy_name']
+            )
+            sequential.append((size, details))
+            if size > 0:
+                pm.add_position(f'seq_{k}', sig['strategy_name'], sig['new_position_data']['token_id'],
+                                sig['direction'], 0.5, size, 0.4, 0.7, sig['new_position_data'])
+        
+        for (b_size, b_details), (s_size, s_details) in zip(batch, sequential):
+            assert b_size == pytest.approx(s_size)
+            assert b_details['max_correlation'] == pytest.approx(s_details['max_correlation'])
+            assert b_details['correlated_positions'] == s_details['correlated_positions']